@@ -1,20 +1,57 @@
 # api.py
-from fastapi import FastAPI, HTTPException
+import asyncio
+import functools
+import gzip
+import hashlib
+import io
+import json
+import os
+import uuid
+from fastapi import FastAPI, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
 from pydantic import BaseModel, Field
-from typing import Optional
+from typing import Any, Callable, Dict, Optional
 
+from pipeline.admission import AdmissionController
+from pipeline.events import EventBus
+from pipeline.fingerprint import FingerprintStore
+from pipeline.jobs import JobManager, JobQueueFull
 from pipeline.orchestrator import Orchestrator
-from pipeline.read.csvreader import CSVReader
-from pipeline.process.missing_value import MissingValuesProcessor
-from pipeline.process.conversion import ConversionProcessor
-from pipeline.process.state_abbreviation import StateAbbreviationProcessor
-from pipeline.process.normalization import NormalizationProcessor
-from pipeline.process.percentile import PercentileProcessor
-from pipeline.write.postgres_storage import PostgreSQLStorage
+from pipeline.singleflight import SingleFlight
+from pipeline.summary_cache import SummaryCache
+from pipeline.read.stream_buffer import StreamAborted, StreamBuffer
+
+# Readers, processors and writers pull in pandas, SQLAlchemy and `us`; they are imported inside build_pipeline
+# so a cold Lambda container answers /health (and queues jobs) without paying for them.
+# `python -m pipeline.importtime api` shows where startup time goes.
 
 
 app = FastAPI(title="DataPipeline API")
 
+# progress events of every run in this process, streamed to operators by the /events endpoints
+events = EventBus()
+
+# Background ingests: INGEST_MAX_WORKERS jobs run at once, each in its own process unless INGEST_EXECUTOR=thread
+jobs = JobManager(
+    max_workers=int(os.getenv("INGEST_MAX_WORKERS", "2")),
+    mode=os.getenv("INGEST_EXECUTOR", "process"),
+    max_pending=int(os.getenv("INGEST_MAX_PENDING", "0")),
+    bus=events,
+    max_finished=int(os.getenv("INGEST_MAX_FINISHED_JOBS", "1000")),
+    finished_ttl=float(os.getenv("INGEST_FINISHED_JOB_TTL", "3600")),
+)
+# identical /ingest requests arriving while one is running share its execution
+inflight = SingleFlight()
+# last successful load per target, so an unchanged replay is answered without reading or writing
+fingerprints = FingerprintStore(os.getenv("INGEST_FINGERPRINT_PATH", ".ingest_fingerprints.json"))
+# per-state / per-channel aggregates of the last completed load into each table, served by /aggregates
+summaries = SummaryCache()
+# loads reserve their estimated peak memory from this budget; a burst queues or falls back to chunked runs
+admission = AdmissionController(
+    budget_bytes=int(float(os.getenv("INGEST_MEMORY_BUDGET_MB", "1024")) * 2**20),
+    wait_timeout=float(os.getenv("INGEST_ADMISSION_TIMEOUT", "30")),
+)
+
 class IngestRequest(BaseModel):
     # CSV options
     path: Optional[str] = Field(default="data/dataset.csv")
@@ -27,6 +64,12 @@ class IngestRequest(BaseModel):
     if_exists: str = "replace"  # "append" | "replace" | "fail"
     chunksize: int = 5000
 
+    # "pyarrow" keeps the data in Arrow-backed dtypes from the reader to the writer (default: PIPELINE_DTYPE_BACKEND)
+    dtype_backend: Optional[str] = None
+
+    # run even if the same file and config were already loaded into this target
+    force: bool = False
+
 def build_pipeline(
     csv_path: str,
     sep: str,
@@ -35,9 +78,29 @@ def build_pipeline(
     table: str,
     if_exists: str,
     chunksize: int,
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    read_chunksize: Optional[int] = None,
+    measure_memory: bool = False,
+    memory_limit: Optional[int] = None,
+    dtype_backend: Optional[str] = None,
+    source_fingerprint: Optional[str] = None,
 ) -> Orchestrator:
-    # Reader
-    reader = CSVReader(name="CSV", config={"path": csv_path, "sep": sep})
+    from pipeline.read.csvreader import CSVReader
+    from pipeline.process.missing_value import MissingValuesProcessor
+    from pipeline.process.conversion import ConversionProcessor
+    from pipeline.process.state_abbreviation import StateAbbreviationProcessor
+    from pipeline.process.normalization import NormalizationProcessor
+    from pipeline.process.percentile import PercentileProcessor
+    from pipeline.write.postgres_storage import PostgreSQLStorage
+
+    # Reader (csv_path may also be a file-like stream; read_chunksize sets the frame size for run_chunked())
+    reader_config: Dict[str, Any] = {"path": csv_path, "sep": sep}
+    if read_chunksize:
+        reader_config["chunksize"] = read_chunksize
+    backend = dtype_backend or os.getenv("PIPELINE_DTYPE_BACKEND")
+    if backend:
+        reader_config["dtype_backend"] = backend
+    reader = CSVReader(name="CSV", config=reader_config)
 
     # Processors (order matters: fix missing values before conversions/normalization)
     processors = [
@@ -58,9 +121,167 @@ def build_pipeline(
             "if_exists": if_exists,  # use the request if_exists
             "chunksize": chunksize,
             "index": False,
+            # keep the engine (and its connection pool) for the next warm invocation
+            "reuse_engine": True,
+            # and what it learned about the target table, so repeat appends skip DDL and reflection
+            "cache_metadata": True,
+            # PIPELINE_BULK_LOAD=copy streams Arrow-rendered CSV through COPY instead of INSERTs
+            "bulk_load": os.getenv("PIPELINE_BULK_LOAD") or None,
+            # PIPELINE_TYPE_PLANNER=1 sizes each column from its values (SMALLINT, BOOLEAN, REAL, INET, ...)
+            "type_planner": os.getenv("PIPELINE_TYPE_PLANNER", "0").lower() in ("1", "true", "yes"),
+            # PIPELINE_WRITE_PARALLEL=N loads over N connections through a staging table
+            "parallel": int(os.getenv("PIPELINE_WRITE_PARALLEL", "1")),
+            # PIPELINE_PARTITION_BY=state_abbreviation list-partitions the table by that column
+            "partition_by": os.getenv("PIPELINE_PARTITION_BY") or None,
+            # with a source fingerprint (PIPELINE_RESUMABLE=1), a rerun continues after the last committed chunk
+            "resumable": bool(source_fingerprint),
+            "source_fingerprint": source_fingerprint,
         },
     )
-    return Orchestrator(reader=reader, processors=processors, writer=writer)
+    # PIPELINE_PARQUET_PATH: the same run also writes <path>/<table>/state_abbreviation=XX/*.parquet
+    parquet_path = os.getenv("PIPELINE_PARQUET_PATH")
+    if parquet_path:
+        from pipeline.write.fanout import FanOutWriter
+        from pipeline.write.parquet_dataset import ParquetDatasetWriter
+
+        parquet = ParquetDatasetWriter(
+            name="ParquetWriter",
+            config={
+                "path": os.path.join(parquet_path, table),
+                "partition_by": "state_abbreviation",
+                "if_exists": if_exists,
+                "compression": os.getenv("PIPELINE_PARQUET_COMPRESSION", "snappy"),
+            },
+        )
+        writer = FanOutWriter(
+            name="Writers", writers=[writer, parquet], config={"on_error": os.getenv("PIPELINE_FANOUT_ON_ERROR", "abort")}
+        )
+    # memory_limit: frames above it spill to PIPELINE_SPILL_DIR and finish with exact percentiles/medians
+    return Orchestrator(
+        reader=reader,
+        processors=processors,
+        writer=writer,
+        progress=progress,
+        measure_memory=measure_memory,
+        memory_limit=memory_limit,
+        spill_dir=os.getenv("PIPELINE_SPILL_DIR") or None,
+    )
+
+def _pipeline_kwargs(req: IngestRequest) -> Dict[str, Any]:
+    return {
+        "csv_path": req.path,
+        "sep": req.sep,
+        "dsn": req.dsn,
+        "schema": req.dbschema,
+        "table": req.table,
+        "if_exists": req.if_exists,
+        "chunksize": req.chunksize,
+        "dtype_backend": req.dtype_backend,
+    }
+
+def _target(params: Dict[str, Any]) -> str:
+    dsn_hash = hashlib.sha256((params["dsn"] or "").encode()).hexdigest()[:12]
+    return f"{params['schema']}.{params['table']}@{dsn_hash}"
+
+def run_ingest(
+    params: Dict[str, Any],
+    progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+    force: bool = False,
+) -> Dict[str, Any]:
+    """Run one load. Module level so process workers can unpickle it.
+    Skips the run when this exact file and config were the last successful load into the target.
+    read_chunksize / memory_limit in params (set by admission control) read the file in chunks and spill it
+    to disk once the frame passes memory_limit; PIPELINE_MEMORY_LIMIT_MB sets a limit for every load."""
+    params = dict(params)
+    read_chunksize = params.pop("read_chunksize", None)
+    memory_limit = params.pop("memory_limit", None) or int(float(os.getenv("PIPELINE_MEMORY_LIMIT_MB", "0")) * 2**20)
+    if not force and fingerprints.is_unchanged(_target(params), params["csv_path"], params):
+        return {"rows": 0, "stages": {}, "skipped": True}
+    extra = {k: v for k, v in (("read_chunksize", read_chunksize), ("memory_limit", memory_limit)) if v}
+    # the file as this run found it: what gets recorded, even if it is replaced while the load reads it
+    source = fingerprints.snapshot(params["csv_path"])
+    if os.getenv("PIPELINE_RESUMABLE", "0").lower() in ("1", "true", "yes"):
+        from pipeline.fingerprint import config_digest, file_digest
+
+        # chunk boundaries depend on the read chunk size, so it is part of what a checkpoint refers to
+        digest = source["sha256"] if source else file_digest(params["csv_path"])
+        extra["source_fingerprint"] = f"{digest[:32]}:{config_digest({**params, **extra})[:16]}"
+    orch = build_pipeline(**params, **extra, progress=progress, measure_memory=True)
+    try:
+        if read_chunksize and not memory_limit:
+            rows, mode = orch.run_chunked(), "chunked"
+        else:
+            rows = orch.run()
+            mode = "spilled" if getattr(orch, "spilled", False) else "full"
+    except BaseException:
+        # committed chunks of a resumable load stay in the table
+        fingerprints.invalidate(f"{params['schema']}.{params['table']}")
+        raise
+    if source is not None:
+        fingerprints.record(_target(params), params["csv_path"], params, snapshot=source)
+    else:
+        fingerprints.invalidate(f"{params['schema']}.{params['table']}")
+    return {
+        "rows": rows,
+        "stages": dict(getattr(orch, "stage_rows", {})),
+        "skipped": False,
+        "mode": mode,
+        "if_exists": params["if_exists"],
+        "table": f"{params['schema']}.{params['table']}",
+        "summary": _summary(orch),
+        "frame_bytes": getattr(orch, "frame_bytes", None),
+        "frame_rows": getattr(orch, "frame_rows", None),
+    }
+
+def _admit(params: Dict[str, Any]) -> Dict[str, Any]:
+    """Wait for memory for this load; returns the plan, whose params may switch the load to chunked mode"""
+    plan = admission.admit(params["csv_path"], params["sep"])
+    if plan["mode"] == "chunked":
+        print(f"[Admission] {params['csv_path']}: estimated {plan['estimate']} bytes, "
+              f"reading {plan['read_chunksize']} rows at a time and spilling to disk")
+        # the reservation covers the peak, the frame itself may use a peak_factor-th of it
+        memory_limit = max(1, int(plan["reserve"] / admission.peak_factor))
+        params = {**params, "read_chunksize": plan["read_chunksize"], "memory_limit": memory_limit}
+    return {**plan, "params": params}
+
+def _release(plan: Dict[str, Any], result: Optional[Dict[str, Any]]) -> None:
+    admission.release(plan)
+    if result and not result.get("skipped"):
+        admission.observe(plan, result.get("frame_bytes"), result.get("frame_rows"))
+
+def _admitted_ingest(params: Dict[str, Any], force: bool, run_id: str) -> Dict[str, Any]:
+    plan = _admit(params)
+    result = None
+    try:
+        # progress goes to GET /events tagged like a job's, so a synchronous load can be followed live too
+        result = run_ingest(
+            plan["params"], progress=lambda event: events.publish({**event, "job_id": run_id}), force=force
+        )
+        return {**result, "run_id": run_id}
+    finally:
+        _release(plan, result)
+
+def _admission_gate(params: Dict[str, Any]):
+    plan = _admit(params)
+    return plan["params"], functools.partial(_release, plan)
+
+def _summary(orch: Any) -> Dict[str, Any]:
+    found = getattr(orch, "summaries", None) or {}
+    return {"percentiles": found.get("Percentile"), "conversion": found.get("Conversion")}
+
+def _remember_summary(job_id: Optional[str], result: Dict[str, Any]) -> None:
+    """A completed load replaces the cached aggregates of its table (and with them the ETags). Only a replace
+    computed over the whole file describes the table: after an append, or a chunked run whose percentile cuts are
+    per chunk, the cached aggregates are dropped rather than replaced"""
+    if not result.get("summary") or not result.get("table"):
+        return
+    if result.get("if_exists") == "replace" and result.get("mode") != "chunked":
+        summaries.update(result["table"], result["summary"])
+    else:
+        summaries.invalidate(result["table"])
+
+jobs.on_success = _remember_summary
+jobs.gate = _admission_gate
 
 @app.get("/health")
 def health():
@@ -68,30 +289,196 @@ def health():
 
 @app.post("/ingest")
 def ingest(req: IngestRequest):
-    # default DSN
-    dsn = req.dsn
+    params = _pipeline_kwargs(req)
+    key = (tuple(sorted(params.items())), req.force)
+
+    run_id = f"ingest-{uuid.uuid4().hex}"
 
     try:
-        orch = build_pipeline(
-            csv_path=req.path,
-            sep=req.sep,
-            dsn=dsn,
-            schema=req.dbschema,
-            table=req.table,
-            if_exists=req.if_exists,
-            chunksize=req.chunksize,
-        )
-        orch.run()
+        # coalesced requests share the leading request's run, and with it its run_id
+        result, shared = inflight.do(key, lambda: _admitted_ingest(params, req.force, run_id))
     except Exception as e:
         print("INGEST ERROR:", repr(e))
         raise HTTPException(status_code=500, detail=str(e))
+    if not shared:
+        _remember_summary(None, result)
 
     return {
-        "status": "ok",
+        "status": "skipped" if result.get("skipped") else "ok",
         "written_to": f"{req.dbschema}.{req.table}",
         "source": req.path,
         "if_exists": req.if_exists,
+        "rows": result.get("rows"),
+        "mode": result.get("mode"),
+        "run_id": result.get("run_id"),
+        "coalesced": shared,
     }
 
+@app.post("/jobs", status_code=202)
+def submit_job(req: IngestRequest):
+    try:
+        job_id = jobs.submit(functools.partial(run_ingest, force=req.force), _pipeline_kwargs(req))
+    except JobQueueFull as e:
+        raise HTTPException(status_code=429, detail=str(e))
+    return {"job_id": job_id, "status": "queued", "status_url": f"/jobs/{job_id}"}
+
+@app.get("/jobs/{job_id}")
+def job_status(job_id: str):
+    job = jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    return job
+
+@app.post("/ingest/upload")
+async def ingest_upload(
+    request: Request,
+    dbschema: str = "public",
+    table: str = "marketing_data",
+    if_exists: str = "append",
+    sep: str = ",",
+    chunksize: int = 5000,
+    read_chunksize: int = 50_000,
+    gzipped: bool = False,
+    dtype_backend: Optional[str] = None,
+    exact_stats: bool = False,
+):
+    """Load a CSV sent as the request body (chunked transfer welcome, gzip via Content-Encoding or ?gzipped=true).
+    The body streams through a bounded buffer into a chunked pipeline run, so rows reach the database while the
+    upload is still arriving, and processors compute their statistics per chunk.
+    ?exact_stats=true trades the streaming for statistics of the whole upload: the frame is kept in memory up to
+    UPLOAD_MEMORY_LIMIT_MB and spilled to disk past it, and nothing is written before the body is fully read.
+    The DSN comes from the X-Pipeline-DSN header (or PIPELINE_DSN), never from the URL, which ends up in
+    access logs with the password in it."""
+    dsn = request.headers.get("x-pipeline-dsn") or os.getenv("PIPELINE_DSN")
+    memory_limit: Optional[int] = None
+    if exact_stats:
+        memory_limit = max(1, int(float(os.getenv("UPLOAD_MEMORY_LIMIT_MB", "256")) * 2**20))
+    buffer = StreamBuffer(max_pieces=int(os.getenv("UPLOAD_BUFFER_PIECES", "16")))
+    source: Any = io.BufferedReader(buffer)
+    if gzipped or request.headers.get("content-encoding", "").lower() == "gzip":
+        source = gzip.GzipFile(fileobj=source, mode="rb")
+
+    upload_id = f"upload-{uuid.uuid4().hex}"
+    orch = build_pipeline(
+        csv_path=source,
+        sep=sep,
+        dsn=dsn,
+        schema=dbschema,
+        table=table,
+        if_exists=if_exists,
+        chunksize=chunksize,
+        read_chunksize=read_chunksize,
+        dtype_backend=dtype_backend,
+        memory_limit=memory_limit,
+        progress=lambda event: events.publish({**event, "job_id": upload_id}),
+    )
+
+    def consume() -> int:
+        try:
+            return orch.run() if exact_stats else orch.run_chunked()
+        finally:
+            # wake the producer if the pipeline stopped before the body was fully read
+            buffer.abort()
+            # the upload is not fingerprinted: the next /ingest into this table must not be skipped
+            fingerprints.invalidate(f"{dbschema}.{table}")
+
+    loop = asyncio.get_running_loop()
+    pipeline = loop.run_in_executor(None, consume)
+    try:
+        async for piece in request.stream():
+            if pipeline.done():
+                break
+            await loop.run_in_executor(None, buffer.feed, piece)
+        await loop.run_in_executor(None, buffer.finish)
+    except StreamAborted:
+        pass
+    except Exception as e:
+        buffer.abort()
+        print("UPLOAD ERROR:", repr(e))
+        raise HTTPException(status_code=500, detail=str(e))
+
+    try:
+        rows = await pipeline
+    except Exception as e:
+        print("UPLOAD ERROR:", repr(e))
+        raise HTTPException(status_code=500, detail=str(e))
+    mode = "chunked"
+    if exact_stats:
+        mode = "spilled" if getattr(orch, "spilled", False) else "full"
+    _remember_summary(None, {
+        "table": f"{dbschema}.{table}", "summary": _summary(orch), "if_exists": if_exists, "mode": mode,
+    })
+
+    return {
+        "status": "ok",
+        "upload_id": upload_id,
+        "written_to": f"{dbschema}.{table}",
+        "bytes_received": buffer.bytes_fed,
+        "rows_parsed": orch.stage_rows.get("CSV", 0),
+        "rows_written": rows,
+        "mode": mode,
+        "stages": orch.stage_rows,
+    }
+
+def _cached_aggregate(section: str, dbschema: str, table: str, request: Request) -> Response:
+    entry = summaries.get(f"{dbschema}.{table}", section)
+    if entry is None:
+        raise HTTPException(status_code=404, detail=f"No {section} aggregates for {dbschema}.{table} yet")
+    body, etag = entry
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=body, media_type="application/json", headers=headers)
+
+@app.get("/aggregates/percentiles")
+def percentile_aggregates(request: Request, dbschema: str = "public", table: str = "marketing_data"):
+    """Per-state and national percentile cuts of the last completed load, served from memory"""
+    return _cached_aggregate("percentiles", dbschema, table, request)
+
+@app.get("/aggregates/conversion")
+def conversion_aggregates(request: Request, dbschema: str = "public", table: str = "marketing_data"):
+    """Overall, per-state and per-channel conversion rates of the last completed load, served from memory"""
+    return _cached_aggregate("conversion", dbschema, table, request)
+
+async def _event_stream(sub, fmt: str, until_job_done: bool):
+    """Drain a bus subscription into SSE frames (or JSON lines) without blocking the event loop"""
+    try:
+        while True:
+            event = sub.get()
+            if event is None:
+                await asyncio.sleep(0.05)
+                continue
+            payload = json.dumps(event, default=str)
+            if fmt == "jsonl":
+                yield payload + "\n"
+            else:
+                yield f"event: {event.get('event', 'message')}\ndata: {payload}\n\n"
+            if until_job_done and event.get("event") == "job_finished":
+                return
+    finally:
+        sub.close()
+
+@app.get("/events")
+def stream_events(format: str = "sse"):
+    """Live progress of every run in this process"""
+    sub = events.subscribe()
+    media = "application/x-ndjson" if format == "jsonl" else "text/event-stream"
+    return StreamingResponse(_event_stream(sub, format, until_job_done=False), media_type=media)
+
+@app.get("/jobs/{job_id}/events")
+def stream_job_events(job_id: str, format: str = "sse"):
+    """Live progress of one job; the stream ends with its job_finished event"""
+    # subscribe before looking at the status so a job finishing in between is not missed
+    sub = events.subscribe(lambda e: e.get("job_id") == job_id)
+    job = jobs.get(job_id)
+    if job is None:
+        sub.close()
+        raise HTTPException(status_code=404, detail=f"Unknown job {job_id}")
+    if job["status"] in ("succeeded", "failed"):
+        finished = {"event": "job_finished", "job_id": job_id, "status": job["status"], "error": job["error"]}
+        sub.events.put_nowait(finished)
+    media = "application/x-ndjson" if format == "jsonl" else "text/event-stream"
+    return StreamingResponse(_event_stream(sub, format, until_job_done=True), media_type=media)
+
 from mangum import Mangum
 handler = Mangum(app)
\ No newline at end of file
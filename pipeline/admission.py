@@ -0,0 +1,193 @@
+from __future__ import annotations
+import csv
+import io
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+"""Memory-budget admission control for loads running in this process. Before a load starts, its peak memory is
+estimated from the source file: size, column count and the kind of every column, taken from a small sample at the
+head of the file. Loads reserve their estimate against a process-wide byte budget and wait while it is exhausted;
+a load that can never fit, or that waited too long, is switched to chunked mode and only reserves the memory of one
+chunk. Every finished load reports the memory its frame actually used, which calibrates later estimates.
+
+Only the standard library is imported here, so api.py can plan a load without loading pandas."""
+
+# bytes pandas spends per cell: a float64/int64 slot, or an object pointer plus the str object behind it
+NUMERIC_CELL_BYTES = 8
+STRING_CELL_BYTES = 8 + 49
+
+
+def sample_csv(path: str, sep: str = ",", sample_bytes: int = 1 << 16) -> Dict[str, Any]:
+    """Column count, column kinds, average line length and estimated in-memory bytes per row of a CSV file,
+    from its first sample_bytes bytes"""
+    with open(path, "rb") as fh:
+        head = fh.read(sample_bytes)
+    lines = head.decode("utf-8", errors="replace").splitlines()
+    if len(head) == sample_bytes and len(lines) > 1:
+        lines = lines[:-1]  # the last line is most likely cut off
+    rows = list(csv.reader(io.StringIO("\n".join(lines)), delimiter=sep))
+    if not rows:
+        return {"columns": 0, "kinds": [], "bytes_per_line": 0.0, "header_bytes": 0, "row_bytes": 0.0}
+
+    header, body = rows[0], rows[1:]
+    kinds: List[str] = []
+    row_bytes = 0.0
+    for i in range(len(header)):
+        values = [r[i] for r in body if i < len(r) and r[i] != ""]
+        if values and all(_is_number(v) for v in values):
+            kinds.append("numeric")
+            row_bytes += NUMERIC_CELL_BYTES
+        else:
+            kinds.append("string")
+            avg_len = sum(len(v) for v in values) / len(values) if values else 0.0
+            row_bytes += STRING_CELL_BYTES + avg_len
+
+    body_lines = lines[1:]
+    return {
+        "columns": len(header),
+        "kinds": kinds,
+        "bytes_per_line": sum(len(l) + 1 for l in body_lines) / len(body_lines) if body_lines else 0.0,
+        "header_bytes": len(lines[0]) + 1,
+        "row_bytes": row_bytes,
+    }
+
+
+def _is_number(value: str) -> bool:
+    try:
+        float(value)
+    except ValueError:
+        return False
+    return True
+
+
+class AdmissionController:
+    """
+    budget_bytes: memory all running loads of this process may use together (0 disables admission control)
+    peak_factor: peak memory of a load as a multiple of its parsed frame; the parser's buffers and the copies
+                 processors make come on top of the frame itself (default 3.0)
+    chunk_fraction: share of the budget one chunked load reserves; its chunk size is derived from it (default 0.1)
+    wait_timeout: seconds a load waits for its full estimate before it is switched to chunked mode (default 30)
+    alpha: weight of the newest run in the calibration's moving average (default 0.3)
+    """
+
+    def __init__(
+        self,
+        budget_bytes: int,
+        peak_factor: float = 3.0,
+        chunk_fraction: float = 0.1,
+        wait_timeout: float = 30.0,
+        alpha: float = 0.3,
+        min_chunk_rows: int = 1000,
+    ) -> None:
+        self.budget_bytes = int(budget_bytes)
+        self.peak_factor = float(peak_factor)
+        self.chunk_fraction = float(chunk_fraction)
+        self.wait_timeout = float(wait_timeout)
+        self.alpha = float(alpha)
+        self.min_chunk_rows = int(min_chunk_rows)
+        # actual / estimated bytes per row of the frames of past runs
+        self.calibration = 1.0
+        self.runs_observed = 0
+        self.in_use = 0
+        self.waiting = 0
+        self._cond = threading.Condition()
+
+    def plan(self, path: Any, sep: str = ",") -> Dict[str, Any]:
+        """How a load of path should run: {"mode": "full" | "chunked", "estimate", "reserve", "read_chunksize", ...}.
+        Sources that are not files on disk cannot be estimated and are planned as full loads reserving nothing."""
+        plan: Dict[str, Any] = {"mode": "full", "estimate": 0, "reserve": 0, "read_chunksize": None, "row_bytes": 0.0}
+        if not self.budget_bytes or not isinstance(path, (str, os.PathLike)) or not os.path.isfile(path):
+            return plan
+
+        sample = sample_csv(path, sep)
+        size = os.path.getsize(path)
+        rows = (size - sample["header_bytes"]) / sample["bytes_per_line"] if sample["bytes_per_line"] else 0
+        row_peak = sample["row_bytes"] * self.calibration * self.peak_factor
+        chunk_budget = int(self.budget_bytes * self.chunk_fraction)
+        plan.update(
+            estimate=int(rows * row_peak),
+            rows=int(rows),
+            columns=sample["columns"],
+            row_bytes=sample["row_bytes"],
+        )
+        plan["chunk_rows"] = max(self.min_chunk_rows, int(chunk_budget / row_peak)) if row_peak else None
+        if plan["estimate"] > self.budget_bytes:
+            self._to_chunked(plan)
+        else:
+            plan["reserve"] = plan["estimate"]
+        return plan
+
+    def acquire(self, plan: Dict[str, Any], timeout: Optional[float] = None) -> bool:
+        """Reserve plan["reserve"] bytes, waiting up to timeout seconds (None waits until they are free)"""
+        need = int(plan["reserve"])
+        if not need:
+            return True
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._cond:
+            self.waiting += 1
+            try:
+                # a reservation larger than the whole budget is let through once nothing else runs
+                while self.in_use and self.in_use + need > self.budget_bytes:
+                    remaining = None if deadline is None else deadline - time.monotonic()
+                    if remaining is not None and remaining <= 0:
+                        return False
+                    self._cond.wait(remaining)
+                self.in_use += need
+                return True
+            finally:
+                self.waiting -= 1
+
+    def release(self, plan: Dict[str, Any]) -> None:
+        need = int(plan["reserve"])
+        if not need:
+            return
+        with self._cond:
+            self.in_use = max(0, self.in_use - need)
+            self._cond.notify_all()
+
+    def admit(self, path: Any, sep: str = ",") -> Dict[str, Any]:
+        """Plan a load and block until its reservation is granted. A full load that cannot get its estimate
+        within wait_timeout is switched to chunked mode. The caller must release() the returned plan."""
+        plan = self.plan(path, sep)
+        if plan["mode"] == "full" and not self.acquire(plan, self.wait_timeout):
+            self._to_chunked(plan)
+            self.acquire(plan)
+        return plan
+
+    @contextmanager
+    def admitted(self, path: Any, sep: str = ",") -> Iterator[Dict[str, Any]]:
+        plan = self.admit(path, sep)
+        try:
+            yield plan
+        finally:
+            self.release(plan)
+
+    def observe(self, plan: Dict[str, Any], frame_bytes: Optional[int], frame_rows: Optional[int]) -> None:
+        """Calibrate later estimates with the memory a frame of this load actually took"""
+        if not plan.get("row_bytes") or not frame_bytes or not frame_rows:
+            return
+        ratio = (frame_bytes / frame_rows) / plan["row_bytes"]
+        with self._cond:
+            if self.runs_observed:
+                self.calibration += self.alpha * (ratio - self.calibration)
+            else:
+                self.calibration = ratio
+            self.runs_observed += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "budget_bytes": self.budget_bytes,
+                "in_use": self.in_use,
+                "waiting": self.waiting,
+                "calibration": self.calibration,
+                "runs_observed": self.runs_observed,
+            }
+
+    def _to_chunked(self, plan: Dict[str, Any]) -> None:
+        plan["mode"] = "chunked"
+        plan["read_chunksize"] = plan.get("chunk_rows") or self.min_chunk_rows
+        plan["reserve"] = min(int(self.budget_bytes * self.chunk_fraction), plan["estimate"] or self.budget_bytes)
@@ -0,0 +1,68 @@
+from __future__ import annotations
+from typing import Any
+import numpy as np
+import pandas as pd
+
+"""Helpers that let the processors run unchanged on NumPy-backed and Arrow-backed frames (CSVReader
+dtype_backend="pyarrow"). Statistics are always computed on plain float64 arrays so both backends give bit-identical
+results; new columns are created in the backend of the frame they are added to, so an Arrow-backed frame stays
+Arrow-backed from the reader to the writer. pyarrow is only imported when a frame actually uses it."""
+
+
+def uses_arrow(df: pd.DataFrame) -> bool:
+    return any(isinstance(dtype, pd.ArrowDtype) for dtype in df.dtypes)
+
+
+def float_values(values: pd.Series) -> np.ndarray:
+    """float64 NumPy array of a numeric column, missing values (NaN, None, NA) as NaN"""
+    return pd.to_numeric(values, errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+
+
+def float_series(values: pd.Series) -> pd.Series:
+    """NumPy float64 copy of a column (a no-op view for float64 input), for statistics that must not depend on
+    the backend: pandas reduces NumPy and Arrow arrays with different summation orders"""
+    if isinstance(values.dtype, np.dtype) and values.dtype == np.float64:
+        return values
+    return pd.Series(float_values(values), index=values.index, name=values.name)
+
+
+def as_float(values: pd.Series) -> pd.Series:
+    """Integer columns with missing values as floats in their own backend, so they can take a fractional fill
+    value the way a NumPy column (which is float64 as soon as it has a NaN) does"""
+    if not pd.api.types.is_integer_dtype(values.dtype) or not values.isna().any():
+        return values
+    if isinstance(values.dtype, pd.ArrowDtype):
+        import pyarrow as pa
+
+        return values.astype(pd.ArrowDtype(pa.float64()))
+    return values.astype("Float64")
+
+
+def as_text(values: pd.Series) -> pd.Series:
+    """The column with a string dtype for the .str accessor; Arrow strings are kept as they are instead of
+    being copied into Python objects"""
+    if isinstance(values.dtype, (pd.ArrowDtype, pd.StringDtype)) and pd.api.types.is_string_dtype(values.dtype):
+        return values
+    return values.astype("string")
+
+
+def like(values: pd.Series, df: pd.DataFrame) -> pd.Series:
+    """values converted to the backend of df: unchanged for NumPy-backed frames, the matching Arrow type
+    (missing values as nulls) for Arrow-backed ones"""
+    if not uses_arrow(df) or isinstance(values.dtype, pd.ArrowDtype):
+        return values
+    import pyarrow as pa
+
+    dtype: Any = values.dtype
+    if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_numeric_dtype(dtype):
+        numpy_dtype = getattr(dtype, "numpy_dtype", dtype)
+        return values.astype(pd.ArrowDtype(pa.from_numpy_dtype(numpy_dtype)))
+    return values.astype(pd.ArrowDtype(pa.string()))
+
+
+def to_arrow_table(df: pd.DataFrame) -> Any:
+    """pyarrow.Table of the frame without the index. Arrow-backed columns are handed over as their existing
+    buffers; NumPy columns are converted once (NaN becomes null)."""
+    import pyarrow as pa
+
+    return pa.Table.from_pandas(df, preserve_index=False)
@@ -0,0 +1,66 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from typing import Any, Callable, Dict, Optional, Tuple
+
+"""In-process publish/subscribe for pipeline progress. publish() is cheap enough to call from the hot path: with no
+subscribers it returns after one attribute read, otherwise it stamps the event and does a non-blocking put into each
+subscriber's bounded queue. A subscriber that falls behind loses events (counted in dropped) instead of slowing the
+pipeline down."""
+
+Event = Dict[str, Any]
+
+
+class Subscription:
+    def __init__(self, bus: "EventBus", predicate: Optional[Callable[[Event], bool]], maxsize: int) -> None:
+        self._bus = bus
+        self.predicate = predicate
+        self.events: "queue.Queue[Event]" = queue.Queue(maxsize=maxsize)
+        self.dropped = 0
+
+    def get(self, timeout: Optional[float] = None) -> Optional[Event]:
+        """Next event, or None if nothing arrived within timeout"""
+        try:
+            return self.events.get(timeout=timeout) if timeout else self.events.get_nowait()
+        except queue.Empty:
+            return None
+
+    def close(self) -> None:
+        self._bus.unsubscribe(self)
+
+    def __enter__(self) -> "Subscription":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class EventBus:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        # replaced, never mutated, so publish() can iterate without taking the lock
+        self._subscribers: Tuple[Subscription, ...] = ()
+
+    def subscribe(self, predicate: Optional[Callable[[Event], bool]] = None, maxsize: int = 1024) -> Subscription:
+        sub = Subscription(self, predicate, maxsize)
+        with self._lock:
+            self._subscribers = (*self._subscribers, sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscription) -> None:
+        with self._lock:
+            self._subscribers = tuple(s for s in self._subscribers if s is not sub)
+
+    def publish(self, event: Event) -> None:
+        subscribers = self._subscribers
+        if not subscribers:
+            return
+        event = {"ts": time.time(), **event}
+        for sub in subscribers:
+            if sub.predicate is not None and not sub.predicate(event):
+                continue
+            try:
+                sub.events.put_nowait(event)
+            except queue.Full:
+                sub.dropped += 1
@@ -0,0 +1,132 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+import tempfile
+import threading
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; the store is then only safe within one process
+    fcntl = None  # type: ignore[assignment]
+
+"""Remembers what was last loaded into each target so an unchanged replay can be answered without reading the
+source or touching the database. A load is identified by the source file contents (sha256, with size and mtime as
+a shortcut that avoids hashing at all) plus a hash of the pipeline configuration. The file is shared by every
+process serving loads, so its read-modify-write runs under an advisory lock on a sidecar .lock file."""
+
+
+def file_digest(path: str, block_size: int = 1 << 20) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as fh:
+        for block in iter(lambda: fh.read(block_size), b""):
+            h.update(block)
+    return h.hexdigest()
+
+
+def config_digest(config: Dict[str, Any]) -> str:
+    return hashlib.sha256(json.dumps(config, sort_keys=True, default=str).encode()).hexdigest()
+
+
+class FingerprintStore:
+    """JSON file of target -> fingerprint of the last successful load. A target is a table, optionally followed
+    by "@" and the database it is in; a load into the table forgets what was recorded for it under another DSN"""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._lock = threading.Lock()
+
+    def is_unchanged(self, target: str, source_path: str, config: Dict[str, Any]) -> bool:
+        entry = self._load().get(target)
+        if entry is None or entry["config"] != config_digest(config) or not os.path.exists(source_path):
+            return False
+        stat = os.stat(source_path)
+        if entry["size"] != stat.st_size:
+            return False
+        if entry["mtime_ns"] == stat.st_mtime_ns:
+            return True
+        # touched but maybe not modified: fall back to the content hash
+        return entry["sha256"] == file_digest(source_path)
+
+    @staticmethod
+    def snapshot(source_path: str) -> Optional[Dict[str, Any]]:
+        """Size, mtime and sha256 of the source as it is now; take it before the load reads the file, so a file
+        replaced during the load is not recorded as what was loaded"""
+        if not source_path or not os.path.exists(source_path):
+            return None
+        # stat first: a change made while hashing then shows up as a newer mtime and forces a rehash next time
+        stat = os.stat(source_path)
+        return {
+            "source": os.path.abspath(source_path),
+            "size": stat.st_size,
+            "mtime_ns": stat.st_mtime_ns,
+            "sha256": file_digest(source_path),
+        }
+
+    def record(
+        self, target: str, source_path: str, config: Dict[str, Any], snapshot: Optional[Dict[str, Any]] = None
+    ) -> Optional[Dict[str, Any]]:
+        """Remember a successful load of source_path into target; snapshot is the source as the load found it
+        (default: as it is now)"""
+        if snapshot is None:
+            snapshot = self.snapshot(source_path)
+        if snapshot is None:
+            return None
+        entry = {**snapshot, "config": config_digest(config)}
+        with self._locked():
+            data = self._load()
+            for stale in self._same_table(data, target.split("@")[0]):
+                # the same table reached through another DSN string was just overwritten or appended to
+                del data[stale]
+            data[target] = entry
+            self._save(data)
+        return entry
+
+    def invalidate(self, table: str) -> None:
+        """Forget the last load into table, under every DSN (target "table@..."), after a load that was not
+        recorded changed it (an upload, a failed run), so the next load of the same file is not skipped"""
+        with self._locked():
+            data = self._load()
+            stale = self._same_table(data, table)
+            if not stale:
+                return
+            for target in stale:
+                del data[target]
+            self._save(data)
+
+    @staticmethod
+    def _same_table(data: Dict[str, Any], table: str) -> List[str]:
+        return [target for target in data if target.split("@")[0] == table]
+
+    def _save(self, data: Dict[str, Any]) -> None:
+        directory = os.path.dirname(os.path.abspath(self.path))
+        fd, tmp = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(self.path)}.", suffix=".tmp")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as fh:
+                json.dump(data, fh, indent=2, sort_keys=True)
+            os.replace(tmp, self.path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+
+    @contextmanager
+    def _locked(self) -> Iterator[None]:
+        with self._lock:
+            if fcntl is None:
+                yield
+                return
+            with open(f"{self.path}.lock", "a") as lock:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _load(self) -> Dict[str, Any]:
+        if not os.path.exists(self.path):
+            return {}
+        with open(self.path, encoding="utf-8") as fh:
+            return json.load(fh)
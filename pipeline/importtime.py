@@ -0,0 +1,61 @@
+from __future__ import annotations
+import argparse
+import subprocess
+import sys
+from typing import List, Tuple
+
+"""Import-time report: runs `python -X importtime -c "import <module>"` in a fresh interpreter and breaks the
+startup cost down by module. Used to keep the Lambda cold start of api.py in check.
+
+    python -m pipeline.importtime api --top 15
+"""
+
+# (module, self microseconds, cumulative microseconds, nesting depth)
+Row = Tuple[str, int, int, int]
+
+
+def measure(module: str) -> List[Row]:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"import {module} failed:\n{proc.stderr.strip()[-2000:]}")
+    return parse(proc.stderr)
+
+
+def parse(output: str) -> List[Row]:
+    rows: List[Row] = []
+    for line in output.splitlines():
+        if not line.startswith("import time:") or "self [us]" in line:
+            continue
+        self_us, cumulative_us, name = line[len("import time:"):].split("|", 2)
+        depth = (len(name) - len(name.lstrip(" "))) // 2
+        rows.append((name.strip(), int(self_us), int(cumulative_us), depth))
+    return rows
+
+
+def report(rows: List[Row], top: int = 20) -> str:
+    total = sum(r[1] for r in rows)
+    # top-level packages (depth <= 1) show what each direct import costs including its dependencies
+    direct = sorted((r for r in rows if r[3] <= 1), key=lambda r: r[2], reverse=True)[:top]
+    heavy = sorted(rows, key=lambda r: r[1], reverse=True)[:top]
+    lines = [f"total import time: {total / 1000:.1f} ms across {len(rows)} modules", "",
+             "by cumulative time (direct imports):"]
+    lines += [f"  {cum / 1000:9.1f} ms  {name}" for name, _, cum, _ in direct]
+    lines += ["", "by self time:"]
+    lines += [f"  {own / 1000:9.1f} ms  {name}" for name, own, _, _ in heavy]
+    return "\n".join(lines)
+
+
+def main(argv: List[str] | None = None) -> None:
+    parser = argparse.ArgumentParser(description="Break down the import time of a module")
+    parser.add_argument("module", nargs="?", default="api")
+    parser.add_argument("--top", type=int, default=20)
+    args = parser.parse_args(argv)
+    print(report(measure(args.module), top=args.top))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+from __future__ import annotations
+import multiprocessing
+import queue
+import threading
+import time
+import uuid
+from concurrent.futures import Executor, Future, ProcessPoolExecutor, ThreadPoolExecutor
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from pipeline.events import EventBus
+
+"""Background execution of pipeline runs. A JobManager owns a bounded worker pool; every submitted job gets an id
+whose status, progress and per-stage row counts can be polled while it runs. Workers report progress events over
+a queue that a listener thread in the parent folds into the job table, so the same code path works for thread
+and process pools."""
+
+JobFn = Callable[[Dict[str, Any], Callable[[Dict[str, Any]], None]], Dict[str, Any]]
+Gate = Callable[[Dict[str, Any]], Tuple[Dict[str, Any], Callable[[Optional[Dict[str, Any]]], None]]]
+
+
+class JobQueueFull(RuntimeError):
+    """Raised by JobManager.submit when max_pending jobs are already waiting"""
+
+
+class _Reporter:
+    """Picklable progress callback handed to the worker; tags every event with its job id"""
+    def __init__(self, job_id: str, events: Any) -> None:
+        self.job_id = job_id
+        self.events = events
+
+    def __call__(self, event: Dict[str, Any]) -> None:
+        self.events.put((self.job_id, event))
+
+
+def _run_job(fn: JobFn, params: Dict[str, Any], reporter: _Reporter) -> Dict[str, Any]:
+    reporter({"event": "job_started"})
+    return fn(params, reporter)
+
+
+class JobManager:
+    """
+    max_workers: how many jobs run at the same time
+    mode: "process" (default, each job in its own worker process) or "thread"
+    max_pending: how many jobs may wait for a free worker before submit() refuses (0 = unbounded)
+    bus: optional EventBus; every progress event is republished there tagged with its job_id, followed by
+         a job_finished event
+    on_success: optional callable(job_id, result) run in this process when a job succeeds
+    max_finished: how many succeeded/failed jobs stay pollable; the oldest are forgotten first (0 = unbounded)
+    finished_ttl: seconds a succeeded/failed job stays pollable after it ended (0 = forever)
+    gate: optional callable(params) -> (params, on_end), called in this process before a job is handed to the
+          pool. It may block (the job stays "queued" meanwhile, e.g. until enough memory is free) and may
+          return adjusted params; on_end(result, or None if the job failed) runs once the job has ended
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        mode: str = "process",
+        max_pending: int = 0,
+        bus: Optional[EventBus] = None,
+        on_success: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+        gate: Optional[Gate] = None,
+        max_finished: int = 1000,
+        finished_ttl: float = 3600.0,
+    ) -> None:
+        if mode not in ("process", "thread"):
+            raise ValueError(f"Unknown job mode '{mode}'")
+        self.max_workers = max(1, int(max_workers))
+        self.mode = mode
+        self.max_pending = int(max_pending)
+        self.max_finished = int(max_finished)
+        self.finished_ttl = float(finished_ttl)
+        self._jobs: Dict[str, Dict[str, Any]] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[Executor] = None
+        self._events: Any = None
+        self._manager: Any = None
+        self.bus = bus
+        self.on_success = on_success
+        self.gate = gate
+
+    def submit(self, fn: JobFn, params: Dict[str, Any]) -> str:
+        """Queue fn(params, progress) on the pool and return the new job id immediately"""
+        self._ensure_pool()
+        with self._lock:
+            self._prune()
+            waiting = sum(1 for j in self._jobs.values() if j["status"] == "queued")
+            if self.max_pending and waiting >= self.max_pending:
+                raise JobQueueFull(f"{waiting} jobs already waiting for a worker")
+            job_id = uuid.uuid4().hex
+            self._jobs[job_id] = {
+                "id": job_id,
+                "status": "queued",
+                "submitted_at": time.time(),
+                "started_at": None,
+                "finished_at": None,
+                "progress": {"stage": None, "completed_stages": 0, "total_stages": None},
+                "stages": {},
+                "result": None,
+                "error": None,
+            }
+        if self.gate is None:
+            self._dispatch(job_id, fn, params)
+        else:
+            # the gate may block, so it runs on its own thread and submit() still returns immediately
+            threading.Thread(
+                target=self._gated_dispatch, args=(job_id, fn, params), name=f"job-gate-{job_id[:8]}", daemon=True
+            ).start()
+        return job_id
+
+    def _dispatch(
+        self,
+        job_id: str,
+        fn: JobFn,
+        params: Dict[str, Any],
+        on_end: Optional[Callable[[Optional[Dict[str, Any]]], None]] = None,
+    ) -> None:
+        assert self._executor is not None
+        future = self._executor.submit(_run_job, fn, params, _Reporter(job_id, self._events))
+        future.add_done_callback(lambda f: self._on_done(job_id, f, on_end))
+
+    def _gated_dispatch(self, job_id: str, fn: JobFn, params: Dict[str, Any]) -> None:
+        assert self.gate is not None
+        try:
+            params, on_end = self.gate(params)
+        except Exception as e:
+            future: Future = Future()
+            future.set_exception(e)
+            self._on_done(job_id, future)
+            return
+        try:
+            self._dispatch(job_id, fn, params, on_end)
+        except Exception as e:
+            # e.g. the pool was shut down while the job waited at the gate
+            on_end(None)
+            future = Future()
+            future.set_exception(e)
+            self._on_done(job_id, future)
+
+    def _prune(self) -> None:
+        """Forget finished jobs past finished_ttl, then the oldest ones beyond max_finished; the caller holds
+        the lock. Queued and running jobs are always kept."""
+        finished = sorted(
+            (j for j in self._jobs.values() if j["status"] in ("succeeded", "failed")), key=lambda j: j["finished_at"]
+        )
+        expired = 0
+        if self.finished_ttl > 0:
+            cutoff = time.time() - self.finished_ttl
+            expired = sum(1 for j in finished if j["finished_at"] < cutoff)
+        if self.max_finished > 0:
+            expired = max(expired, len(finished) - self.max_finished)
+        for job in finished[:expired]:
+            del self._jobs[job["id"]]
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return None
+            return {**job, "progress": dict(job["progress"]), "stages": dict(job["stages"])}
+
+    def shutdown(self, wait: bool = True) -> None:
+        if self._executor is not None:
+            self._executor.shutdown(wait=wait)
+            self._executor = None
+        if self._events is not None:
+            self._events.put(None)
+            self._events = None
+        if self._manager is not None:
+            self._manager.shutdown()
+            self._manager = None
+
+    def _ensure_pool(self) -> None:
+        with self._lock:
+            if self._executor is not None:
+                return
+            if self.mode == "process":
+                # a manager queue proxy can be pickled into worker processes, a plain Queue cannot
+                self._manager = multiprocessing.Manager()
+                self._events = self._manager.Queue()
+                self._executor = ProcessPoolExecutor(max_workers=self.max_workers)
+            else:
+                self._events = queue.Queue()
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix="job")
+            threading.Thread(target=self._listen, args=(self._events,), name="job-events", daemon=True).start()
+
+    def _listen(self, events: Any) -> None:
+        while True:
+            try:
+                item = events.get()
+            except (EOFError, OSError):
+                return
+            if item is None:
+                return
+            self._on_event(*item)
+
+    def _on_event(self, job_id: str, event: Dict[str, Any]) -> None:
+        if self.bus is not None:
+            self.bus.publish({**event, "job_id": job_id})
+        with self._lock:
+            job = self._jobs.get(job_id)
+            if job is None:
+                return
+            kind = event.get("event")
+            if kind == "job_started" and job["status"] == "queued":
+                job["status"] = "running"
+                job["started_at"] = time.time()
+            elif kind == "stage_started":
+                job["progress"].update(stage=event["stage"], total_stages=event["total"])
+            elif kind == "stage_finished":
+                job["progress"].update(completed_stages=event["index"], total_stages=event["total"])
+                if event.get("rows") is not None:
+                    job["stages"][event["stage"]] = event["rows"]
+
+    def _on_done(
+        self,
+        job_id: str,
+        future: Future,
+        on_end: Optional[Callable[[Optional[Dict[str, Any]]], None]] = None,
+    ) -> None:
+        if on_end is not None:
+            try:
+                on_end(None if future.exception() is not None else future.result())
+            except Exception as e:
+                print(f"[JobManager] gate callback for {job_id} failed: {e!r}")
+        with self._lock:
+            job = self._jobs[job_id]
+            job["finished_at"] = time.time()
+            error = future.exception()
+            if error is not None:
+                job["status"] = "failed"
+                job["error"] = str(error)
+            else:
+                job["status"] = "succeeded"
+                job["result"] = future.result()
+                # the result carries the final counts in case the last progress events are still in flight
+                job["stages"].update((job["result"] or {}).get("stages", {}))
+            final = {"event": "job_finished", "status": job["status"], "error": job["error"]}
+            self._prune()
+        if job["status"] == "succeeded" and self.on_success is not None:
+            try:
+                self.on_success(job_id, job["result"])
+            except Exception as e:
+                print(f"[JobManager] on_success for {job_id} failed: {e!r}")
+        # through the event queue rather than straight to the bus, so it arrives after the job's last progress event
+        if self._events is not None:
+            self._events.put((job_id, final))
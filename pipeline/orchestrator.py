@@ -1,5 +1,6 @@
 from __future__ import annotations
-from typing import Any, Dict, Protocol
+import time
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Protocol, Tuple
 
 """The class orchestrator is like the controller of the pipeline, it wires the three stages of the pipeline together,
 the Reader, Processor, Writer are in fact interfaces, and basically anything that has the method rin can be treated as
@@ -14,22 +15,263 @@ class Writer(Protocol):
     def run(self) -> Any: ...
 
 class Orchestrator:
-    """Runs the 3 step pipeline"""
-    def __init__(self, reader: Reader, processors: list[Processor], writer: Writer):
+    """Runs the 3 step pipeline
+
+    progress: optional callable (e.g. EventBus.publish) receiving a dict per stage boundary, e.g.
+    {"event": "stage_finished", "stage": "MissingValue", "index": 2, "total": 7, "rows": 1000, "seconds": 0.2},
+    per chunk in run_chunked() (chunk_read, chunk_processed, chunk_written with throughput) and a final
+    run_finished. Without a callback no event dicts are built at all.
+    Row counts per stage are also kept in stage_rows after the run, and the summary of every processor
+    that exposes one (e.g. percentile cuts, conversion rates) in summaries, keyed by stage name.
+
+    measure_memory: record the deep memory footprint of the frame the reader returned (the first chunk in
+    run_chunked()) in frame_bytes / frame_rows, e.g. to calibrate admission control.
+
+    memory_limit: bytes. When set and the reader can iter_chunks(), run() reads chunk by chunk and keeps the
+    frame in memory only while it stays below the limit. Past it, the run spills: chunks go to disk and every
+    processor that needs the whole dataset (one with observe(df, store) and finalize(store), e.g. exact
+    percentiles and medians) gets a pass over all chunks first, after which its exact statistics apply to
+    every chunk. Order statistics come out exactly as in the in-memory run, means and standard deviations
+    up to float rounding, at the cost of one extra pass over the spilled chunks per such processor.
+    spill_dir: where the spill files go (default: the system temp directory); they are removed after the run."""
+    def __init__(
+        self,
+        reader: Reader,
+        processors: list[Processor],
+        writer: Writer,
+        progress: Optional[Callable[[Dict[str, Any]], None]] = None,
+        measure_memory: bool = False,
+        memory_limit: Optional[int] = None,
+        spill_dir: Optional[str] = None,
+    ):
         self.reader = reader
         self.processors = processors
         self.writer = writer
+        self.progress = progress
+        self.stage_rows: Dict[str, int] = {}
+        self.summaries: Dict[str, Any] = {}
+        self.measure_memory = measure_memory
+        self.frame_bytes: Optional[int] = None
+        self.frame_rows: Optional[int] = None
+        self.memory_limit = memory_limit
+        self.spill_dir = spill_dir
+        self.spilled = False
+        self._stage_t0: Dict[str, float] = {}
+        self._run_t0 = 0.0
 
     def run(self) -> int:
+        # state left behind by an earlier run that failed outside this orchestrator must not leak into this one
+        self._rollback_processors()
+        try:
+            return self._run()
+        except BaseException:
+            self._rollback_processors()
+            raise
+
+    def _run(self) -> int:
         print("[Orchestrator] Start")
-        data = self.reader.run()
+        self._run_t0 = time.perf_counter()
+        total = len(self.processors) + 2
+        self._started(self.reader, 1, total)
+        if self.memory_limit and callable(getattr(self.reader, "iter_chunks", None)):
+            data, overflow = self._read_within_limit()
+            if overflow is not None:
+                return self._run_spilled(overflow, total)
+        else:
+            data = self.reader.run()
+        self._finished(self.reader, 1, total, data)
+        self._measure(data)
         for i, p in enumerate(self.processors, start=1):
             print(f"[Orchestrator] Processor {i}: {p.__class__.__name__}")
+            self._started(p, i + 1, total)
             data = p.run(data)
+            self._finished(p, i + 1, total, data)
+        self._started(self.writer, total, total)
         rows = self.writer.run(data)  # return rows
+        self._finished(self.writer, total, total, rows)
+        self._commit_processors()
+        self._run_finished(rows)
         print("[Orchestrator] Done")
         return rows
 
+    def run_chunked(self) -> int:
+        """Stream the data through the pipeline one frame at a time: reader.iter_chunks() -> every processor
+        -> writer.run_chunks(). Memory stays bounded by the chunk size; processors that compute statistics
+        (mean, percentiles, ...) see one chunk at a time unless they are given precomputed values."""
+        self._rollback_processors()
+        try:
+            return self._run_chunked()
+        except BaseException:
+            self._rollback_processors()
+            raise
+
+    def _run_chunked(self) -> int:
+        print("[Orchestrator] Start (chunked)")
+        self._run_t0 = time.perf_counter()
+        total = len(self.processors) + 2
+        for i, stage in enumerate([self.reader, *self.processors], start=1):
+            self._started(stage, i, total)
+        self._started(self.writer, total, total)
+        rows = self.writer.run_chunks(self._processed_chunks())
+        for i, stage in enumerate([self.reader, *self.processors], start=1):
+            self._finished(stage, i, total, self.stage_rows.get(self._stage_name(stage), 0))
+        self._finished(self.writer, total, total, rows)
+        self._commit_processors()
+        self._run_finished(rows)
+        print("[Orchestrator] Done")
+        return rows
+
+    def _processed_chunks(self) -> Iterator[Any]:
+        names = [self._stage_name(p) for p in self.processors]
+        reader_name = self._stage_name(self.reader)
+        self.stage_rows = {reader_name: 0, **{n: 0 for n in names}}
+        written = 0
+        for n, chunk in enumerate(self.reader.iter_chunks(), start=1):
+            self.stage_rows[reader_name] += len(chunk)
+            if n == 1:
+                self._measure(chunk)
+            if self.progress is not None:
+                self.progress({"event": "chunk_read", "chunk": n, "rows": len(chunk),
+                               "total_rows": self.stage_rows[reader_name]})
+            for name, p in zip(names, self.processors):
+                chunk = p.run(chunk)
+                self.stage_rows[name] += len(chunk)
+            if self.progress is not None:
+                self.progress({"event": "chunk_processed", "chunk": n, "rows": len(chunk)})
+            yield chunk
+            # the writer only asks for the next chunk once this one is persisted
+            written += len(chunk)
+            if self.progress is not None:
+                elapsed = time.perf_counter() - self._run_t0
+                self.progress({"event": "chunk_written", "chunk": n, "rows": len(chunk), "total_rows": written,
+                               "seconds": elapsed, "rows_per_sec": written / elapsed if elapsed else None})
+
+    def _read_within_limit(self) -> Tuple[Any, Optional[Iterator[Any]]]:
+        """(frame, None) if the whole input stays below memory_limit, else (None, iterator over every chunk)"""
+        import pandas as pd
+
+        chunks = iter(self.reader.iter_chunks())
+        buffered: List[Any] = []
+        size = 0
+        for chunk in chunks:
+            buffered.append(chunk)
+            size += int(chunk.memory_usage(deep=True).sum())
+            if size > self.memory_limit:
+                print(f"[Orchestrator] Frame passed memory_limit ({size} > {self.memory_limit} bytes), spilling to disk")
+                if self.progress is not None:
+                    self.progress({"event": "spill_started", "bytes": size, "memory_limit": self.memory_limit})
+                return None, self._drain(buffered, chunks)
+        return (pd.concat(buffered, ignore_index=True) if buffered else pd.DataFrame()), None
+
+    @staticmethod
+    def _drain(buffered: List[Any], rest: Iterator[Any]) -> Iterator[Any]:
+        # hand the buffered chunks over one by one so each can be freed once it is spilled
+        while buffered:
+            yield buffered.pop(0)
+        yield from rest
+
+    def _run_spilled(self, chunks: Iterator[Any], total: int) -> int:
+        from pipeline.spill import SpillStore
+
+        self.spilled = True
+        store = SpillStore(self.spill_dir)
+        # finalize() installs exact statistics as config presets; they only hold for this run
+        configs = [(p, p.config) for p in self.processors if hasattr(p, "config")]
+        reader_name = self._stage_name(self.reader)
+        self.stage_rows = {reader_name: 0, **{self._stage_name(p): 0 for p in self.processors}}
+        for i, p in enumerate(self.processors, start=2):
+            self._started(p, i, total)
+        self._started(self.writer, total, total)
+
+        def read() -> Iterator[Any]:
+            for n, chunk in enumerate(chunks, start=1):
+                self.stage_rows[reader_name] += len(chunk)
+                if n == 1:
+                    self._measure(chunk)
+                yield chunk
+
+        source: Iterable[Any] = read()
+        pending: List[Processor] = []
+        try:
+            for n, p in enumerate(self.processors, start=1):
+                if callable(getattr(p, "observe", None)) and callable(getattr(p, "finalize", None)):
+                    print(f"[Orchestrator] Spill pass for processor {n}: {p.__class__.__name__}")
+                    frames = store.frames(f"pass-{n}")
+                    for chunk in self._apply(pending, source):
+                        p.observe(chunk, store)
+                        frames.append(chunk)
+                    p.finalize(store)
+                    source, pending = frames, []
+                pending.append(p)
+            print("[Orchestrator] Final pass")
+            rows = self.writer.run_chunks(self._apply(pending, source))
+        finally:
+            for p, config in configs:
+                p.config = config
+            store.cleanup()
+
+        for i, stage in enumerate([self.reader, *self.processors], start=1):
+            self._finished(stage, i, total, self.stage_rows.get(self._stage_name(stage), 0))
+        self._finished(self.writer, total, total, rows)
+        self._commit_processors()
+        self._run_finished(rows)
+        print("[Orchestrator] Done (spilled)")
+        return rows
+
+    def _apply(self, stages: List[Processor], source: Iterable[Any]) -> Iterator[Any]:
+        for chunk in source:
+            for p in stages:
+                chunk = p.run(chunk)
+                self.stage_rows[self._stage_name(p)] += len(chunk)
+            yield chunk
+
+    def _rollback_processors(self) -> None:
+        # processors that keep state across runs (e.g. DedupProcessor) drop what a run collected that never
+        # reached a successful write
+        for p in self.processors:
+            rollback = getattr(p, "rollback", None)
+            if callable(rollback):
+                rollback()
+
+    def _commit_processors(self) -> None:
+        # processors that keep state across runs (e.g. DedupProcessor) persist it only once the write succeeded
+        for p in self.processors:
+            commit = getattr(p, "commit", None)
+            if callable(commit):
+                commit()
+        self.summaries = {
+            self._stage_name(p): p.summary for p in self.processors if getattr(p, "summary", None) is not None
+        }
+
+    def _measure(self, data: Any) -> None:
+        usage = getattr(data, "memory_usage", None)
+        if self.measure_memory and callable(usage):
+            self.frame_bytes = int(usage(deep=True).sum())
+            self.frame_rows = len(data)
+
+    @staticmethod
+    def _stage_name(stage: Any) -> str:
+        return str(getattr(stage, "name", None) or stage.__class__.__name__)
 
+    def _started(self, stage: Any, index: int, total: int) -> None:
+        if self.progress is not None:
+            name = self._stage_name(stage)
+            self._stage_t0[name] = time.perf_counter()
+            self.progress({"event": "stage_started", "stage": name, "index": index, "total": total})
 
+    def _finished(self, stage: Any, index: int, total: int, data: Any) -> None:
+        rows = data if isinstance(data, int) else len(data) if hasattr(data, "__len__") else None
+        name = self._stage_name(stage)
+        if rows is not None:
+            self.stage_rows[name] = int(rows)
+        if self.progress is not None:
+            seconds = time.perf_counter() - self._stage_t0.get(name, self._run_t0)
+            self.progress({"event": "stage_finished", "stage": name, "index": index, "total": total, "rows": rows,
+                           "seconds": seconds, "rows_per_sec": rows / seconds if rows and seconds else None})
 
+    def _run_finished(self, rows: Any) -> None:
+        if self.progress is not None:
+            seconds = time.perf_counter() - self._run_t0
+            rows = rows if isinstance(rows, int) else None
+            self.progress({"event": "run_finished", "rows": rows, "seconds": seconds,
+                           "rows_per_sec": rows / seconds if rows and seconds else None})
@@ -1,11 +1,55 @@
 from __future__ import annotations
+from typing import Dict, Optional
 import pandas as pd
+from pipeline.dtypes import like
 from pipeline.process.processor import Processor
 
 class ConversionProcessor(Processor):
-    """Add the converted column which indicates if a sale has been made or not"""
+    """Add the converted column which indicates if a sale has been made or not
+    Conversion rates of the last run (overall, per state, per marketing channel) are kept in summary. The counts
+    behind them add up over every frame processed since the last rollback() (which the orchestrator calls when a
+    run starts), so a chunked or spilled run reports the rates of the whole run, not of its last chunk"""
+
+    def __init__(self, name: str, config: dict | None = None) -> None:
+        super().__init__(name, config or {})
+        self.summary: dict | None = None
+        self._rows = 0
+        self._converted = 0
+        self._groups: Dict[str, Optional[pd.DataFrame]] = {}
 
     def process(self, df: pd.DataFrame) -> pd.DataFrame:
         self.log("Creating converted column from purchase")
-        df["converted"] = df["purchase"].notnull().astype(int)
-        return df
\ No newline at end of file
+        converted = df["purchase"].notnull()
+        df["converted"] = like(converted.astype(int), df)
+        self._rows += int(len(df))
+        self._converted += int(converted.sum())
+        for column in ("state", "marketing_channel"):
+            self._count(column, df, converted)
+        self.summary = {
+            "rows": self._rows,
+            "conversion_rate": self._converted / self._rows if self._rows else None,
+            "by_state": self._rates("state"),
+            "by_channel": self._rates("marketing_channel"),
+        }
+        return df
+
+    def rollback(self) -> None:
+        """Start counting afresh, for a new run or after a failed one"""
+        self.summary = None
+        self._rows = 0
+        self._converted = 0
+        self._groups = {}
+
+    def _count(self, column: str, df: pd.DataFrame, converted: pd.Series) -> None:
+        if column not in df.columns:
+            return
+        counts = converted.astype("int64").groupby(df[column]).agg(["sum", "size"])
+        counts.index = counts.index.map(str)
+        seen = self._groups.get(column)
+        self._groups[column] = counts if seen is None else seen.add(counts, fill_value=0)
+
+    def _rates(self, column: str) -> dict:
+        counts = self._groups.get(column)
+        if counts is None:
+            return {}
+        return {k: {"rate": float(c) / n, "rows": int(n)} for k, c, n in counts.itertuples()}
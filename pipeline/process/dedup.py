@@ -0,0 +1,121 @@
+from __future__ import annotations
+import os
+import tempfile
+from contextlib import contextmanager
+from typing import Iterator
+import numpy as np
+import pandas as pd
+from pipeline.dtypes import float_series
+from pipeline.process.processor import Processor
+
+try:
+    import fcntl
+except ImportError:  # not on Windows; commit() is then only safe within one process
+    fcntl = None  # type: ignore[assignment]
+
+
+class DedupProcessor(Processor):
+    """Drop rows whose key columns were already delivered in this batch or in an earlier run
+
+    Every row is reduced to a 64-bit hash of its key columns. Hashes seen by earlier runs live in a sorted
+    uint64 .npy file; membership is a single np.searchsorted over the memory-mapped array. New hashes are
+    only merged into that file by commit(), which the Orchestrator calls after the writer succeeded, so a
+    failed load never marks its rows as seen. Until then they are kept for the rest of the run (later chunks
+    are checked against them) and dropped by rollback() if the run fails.
+
+    Config options:
+    - keys: list[str], columns that identify a row (default: ["ip_address", "marketing_channel", "purchase"])
+    - index_path: str, the persistent hash index (default: ".dedup_index.npy")
+    """
+
+    def __init__(self, name: str, config: dict | None = None) -> None:
+        super().__init__(name, config or {})
+        self._pending = np.empty(0, dtype="uint64")
+
+    def process(self, df: pd.DataFrame) -> pd.DataFrame:
+        keys = list(self.config.get("keys", ["ip_address", "marketing_channel", "purchase"]))
+        missing = [k for k in keys if k not in df.columns]
+        if missing:
+            self.log(f"Key columns {missing} not found, skipping this step")
+            return df
+
+        self.log(f"Hashing {len(df)} rows on {keys}")
+        hashes = self.hash_rows(df[keys])
+        # seen = the on-disk index plus the earlier chunks of this run, looked up in each sorted array instead
+        # of merging them, which would copy the whole memory-mapped index for every chunk
+        already = self._member(self._load_index(), hashes)
+        earlier = self._member(self._pending, hashes) & ~already
+        repeated = pd.Series(hashes).duplicated().to_numpy() & ~already & ~earlier
+        keep = ~(already | earlier | repeated)
+
+        self._pending = np.union1d(self._pending, hashes[keep])
+        self.log(
+            f"Dropped {int(already.sum())} rows seen in earlier runs and {int((earlier | repeated).sum())} "
+            f"duplicates within this batch"
+        )
+        if keep.all():
+            return df
+        return df.loc[keep]
+
+    def rollback(self) -> None:
+        """Forget the hashes of a run whose write did not succeed, so its rows are not treated as seen by
+        the next run. The Orchestrator calls this when a run fails and before every run."""
+        self._pending = np.empty(0, dtype="uint64")
+
+    def commit(self) -> None:
+        """Merge this run's hashes into the on-disk index. Written to a temp file and renamed, so readers
+        see either the old or the new index, never a partial one. The read-merge-write runs under an advisory
+        lock on a sidecar .lock file, so concurrent runs sharing the index do not drop each other's hashes."""
+        if not len(self._pending):
+            return
+        path = self.config.get("index_path", ".dedup_index.npy")
+        with self._locked(path):
+            merged = np.union1d(self._load_index(), self._pending)
+            directory = os.path.dirname(os.path.abspath(path))
+            fd, tmp = tempfile.mkstemp(dir=directory, prefix=f"{os.path.basename(path)}.", suffix=".tmp.npy")
+            try:
+                with os.fdopen(fd, "wb") as fh:
+                    np.save(fh, merged)
+                os.replace(tmp, path)
+            except BaseException:
+                if os.path.exists(tmp):
+                    os.remove(tmp)
+                raise
+        self.log(f"Committed {len(self._pending)} new hashes, index now holds {len(merged)}")
+        self._pending = np.empty(0, dtype="uint64")
+
+    @staticmethod
+    def hash_rows(keys: pd.DataFrame) -> np.ndarray:
+        # Normalise dtypes first so the same row hashes identically whatever the reader inferred
+        normalised = pd.DataFrame({
+            col: float_series(keys[col]) if pd.api.types.is_numeric_dtype(keys[col].dtype)
+            else keys[col].astype("string")
+            for col in keys.columns
+        })
+        return pd.util.hash_pandas_object(normalised, index=False).to_numpy(dtype="uint64")
+
+    @staticmethod
+    def _member(sorted_hashes: np.ndarray, hashes: np.ndarray) -> np.ndarray:
+        if not len(sorted_hashes):
+            return np.zeros(len(hashes), dtype=bool)
+        pos = np.searchsorted(sorted_hashes, hashes).clip(max=len(sorted_hashes) - 1)
+        return sorted_hashes[pos] == hashes
+
+    @staticmethod
+    @contextmanager
+    def _locked(path: str) -> Iterator[None]:
+        if fcntl is None:
+            yield
+            return
+        with open(f"{path}.lock", "a") as lock:
+            fcntl.flock(lock.fileno(), fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(lock.fileno(), fcntl.LOCK_UN)
+
+    def _load_index(self) -> np.ndarray:
+        path = self.config.get("index_path", ".dedup_index.npy")
+        if not os.path.exists(path):
+            return np.empty(0, dtype="uint64")
+        return np.load(path, mmap_mode="r")
@@ -0,0 +1,135 @@
+from __future__ import annotations
+import hashlib
+import json
+import os
+from typing import Dict, Tuple
+import numpy as np
+import pandas as pd
+from pipeline.dtypes import as_text, like
+from pipeline.process.ip_address import ipv4_to_uint32
+from pipeline.process.processor import Processor
+
+# (start, end, codes, labels) per reference file, kept for the life of the process
+_INDEX_CACHE: Dict[str, Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = {}
+
+
+class GeoIPProcessor(Processor):
+    """Add the column inferred_state looked up from a local IP-range reference file, and flag rows
+    whose self-reported state disagrees with it.
+
+    The reference file is a CSV with the columns start, end, state (start/end as dotted IPv4 or integers,
+    ranges inclusive). Overlapping or nested ranges resolve to the narrowest range containing the address.
+    It is parsed once into sorted, disjoint arrays which are saved as .npy files in cache_dir and
+    memory-mapped on later runs; lookups are a single np.searchsorted.
+
+    Config options:
+    - reference_path: str (required)
+    - cache_dir: str, where the compiled index is kept (default: ".geoip_cache")
+    - column: str, the IP column, dotted text or uint32 from IPAddressProcessor (default: "ip_address")
+    - compare_column: str, column cross-checked against the inferred state (default: "state_abbreviation")
+    """
+
+    def process(self, df: pd.DataFrame) -> pd.DataFrame:
+        column = self.config.get("column", "ip_address")
+        compare_column = self.config.get("compare_column", "state_abbreviation")
+        if column not in df.columns:
+            self.log(f"Column {column} not found, skipping this step")
+            return df
+
+        starts, ends, codes, labels = self._load_index()
+        self.log(f"Looking up {len(df)} addresses in {len(starts)} IP ranges")
+
+        ips = df[column]
+        if not pd.api.types.is_integer_dtype(ips.dtype):
+            ips = ipv4_to_uint32(ips)
+        known = ips.notna().to_numpy()
+        values = ips.fillna(0).to_numpy(dtype="uint32")
+
+        pos = np.searchsorted(starts, values, side="right") - 1
+        safe = np.clip(pos, 0, None)
+        hit = known & (pos >= 0) & (values <= ends[safe]) if len(starts) else np.zeros(len(df), dtype=bool)
+
+        inferred = pd.Series(pd.NA, index=df.index, dtype="string")
+        if hit.any():
+            inferred[hit] = labels[codes[safe[hit]]]
+        df["inferred_state"] = like(inferred, df)
+        self.log(f"Matched {int(hit.sum())} of {len(df)} addresses")
+
+        if compare_column in df.columns:
+            reported = as_text(df[compare_column]).str.strip().str.upper()
+            mismatch = (reported != inferred.str.upper()).fillna(False)
+            df["state_mismatch"] = like(mismatch.astype("int8"), df)
+            self.log(f"{int(mismatch.sum())} rows disagree with {compare_column}")
+        else:
+            self.log(f"WARN: '{compare_column}' column missing; skipping state cross-check")
+
+        return df
+
+    def _load_index(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        path = self.config.get("reference_path")
+        if not path or not os.path.exists(path):
+            raise ValueError(f"GeoIP reference file not found: {path}")
+
+        stat = os.stat(path)
+        key = hashlib.sha1(f"{os.path.abspath(path)}|{stat.st_size}|{stat.st_mtime_ns}".encode()).hexdigest()[:16]
+        if key in _INDEX_CACHE:
+            return _INDEX_CACHE[key]
+
+        cache_dir = self.config.get("cache_dir", ".geoip_cache")
+        prefix = os.path.join(cache_dir, key)
+        if os.path.exists(f"{prefix}.labels.json"):
+            self.log(f"Memory-mapping cached GeoIP index {prefix}")
+            with open(f"{prefix}.labels.json", encoding="utf-8") as fh:
+                labels = np.array(json.load(fh), dtype=object)
+            index = tuple(np.load(f"{prefix}.{part}.npy", mmap_mode="r") for part in ("start", "end", "codes"))
+            _INDEX_CACHE[key] = (*index, labels)
+            return _INDEX_CACHE[key]
+
+        self.log(f"Building GeoIP index from {path}")
+        ref = pd.read_csv(path, dtype={"start": "string", "end": "string", "state": "string"})
+        bounds = {}
+        for col in ("start", "end"):
+            text = ref[col].str.strip()
+            numeric = pd.to_numeric(text, errors="coerce")
+            bounds[col] = numeric.fillna(ipv4_to_uint32(text).astype("Float64")).to_numpy(dtype="float64")
+        usable = ~(np.isnan(bounds["start"]) | np.isnan(bounds["end"])) & ref["state"].notna().to_numpy()
+        if not usable.all():
+            self.log(f"WARN: dropped {int((~usable).sum())} unparseable reference rows")
+
+        order = np.argsort(bounds["start"][usable], kind="stable")
+        starts = bounds["start"][usable][order].astype("uint32")
+        ends = bounds["end"][usable][order].astype("uint32")
+        codes, uniques = pd.factorize(ref["state"][usable].str.strip().to_numpy()[order])
+        if len(starts) > 1 and (starts[1:] <= np.maximum.accumulate(ends)[:-1]).any():
+            self.log("Reference ranges overlap; splitting them so the narrowest containing range wins")
+            starts, ends, codes = _most_specific(starts, ends, codes)
+
+        os.makedirs(cache_dir, exist_ok=True)
+        for part, arr in (("start", starts), ("end", ends), ("codes", codes.astype("int32"))):
+            # write then rename so a concurrent run never maps a half-written file
+            np.save(f"{prefix}.{part}.tmp.npy", arr)
+            os.replace(f"{prefix}.{part}.tmp.npy", f"{prefix}.{part}.npy")
+        with open(f"{prefix}.labels.tmp.json", "w", encoding="utf-8") as fh:
+            json.dump([str(u) for u in uniques], fh)
+        os.replace(f"{prefix}.labels.tmp.json", f"{prefix}.labels.json")
+
+        _INDEX_CACHE[key] = (starts, ends, codes.astype("int32"), np.asarray(uniques, dtype=object))
+        return _INDEX_CACHE[key]
+
+
+def _most_specific(starts: np.ndarray, ends: np.ndarray, codes: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Split overlapping ranges at every boundary into disjoint ones, each labelled with the narrowest range that
+    contains it (of equally wide ones, the one with the highest start)"""
+    lo = starts.astype("int64")
+    hi = ends.astype("int64") + 1
+    bounds = np.unique(np.concatenate([lo, hi]))
+    owner = np.full(len(bounds) - 1, -1, dtype="int64")
+    # widest first, so every range paints over the ranges that contain it
+    for i in np.argsort(lo - hi, kind="stable"):
+        owner[np.searchsorted(bounds, lo[i]):np.searchsorted(bounds, hi[i])] = i
+    covered = owner >= 0
+    return (
+        bounds[:-1][covered].astype("uint32"),
+        (bounds[1:][covered] - 1).astype("uint32"),
+        codes[owner[covered]],
+    )
@@ -0,0 +1,85 @@
+from __future__ import annotations
+import ipaddress
+import numpy as np
+import pandas as pd
+from pipeline.dtypes import as_text, like
+from pipeline.process.processor import Processor
+
+# named groups: the Arrow string backend only extracts named groups
+_IPV4_PATTERN = r"^\s*(?P<a>\d{1,3})\.(?P<b>\d{1,3})\.(?P<c>\d{1,3})\.(?P<d>\d{1,3})\s*$"
+
+
+def ipv4_to_uint32(values: pd.Series) -> pd.Series:
+    """Parse dotted IPv4 strings into a nullable UInt32 series.
+    Anything that is not a valid dotted quad (IPv6, garbage, missing) becomes <NA>."""
+    octets = as_text(values).str.extract(_IPV4_PATTERN)
+    parsed = octets.notna().all(axis=1).to_numpy()
+    parts = octets.fillna("0").astype("uint32").to_numpy()
+    parsed &= (parts <= 255).all(axis=1)
+
+    packed = (parts[:, 0] << 24) | (parts[:, 1] << 16) | (parts[:, 2] << 8) | parts[:, 3]
+    return pd.Series(
+        pd.arrays.IntegerArray(packed.astype("uint32"), ~parsed),
+        index=values.index,
+        name=values.name,
+    )
+
+
+def uint32_to_ipv4(values: pd.Series) -> pd.Series:
+    """Format integer IPv4 addresses back into dotted strings (<NA> stays <NA>)."""
+    missing = values.isna().to_numpy()
+    packed = values.fillna(0).to_numpy(dtype="uint32")
+    out = pd.Series("", index=values.index, dtype="string", name=values.name)
+    for shift in (24, 16, 8, 0):
+        octet = pd.Series((packed >> shift) & 0xFF, index=values.index).astype("string")
+        out = out + octet if shift == 24 else out + "." + octet
+    out[missing] = pd.NA
+    return out
+
+
+class IPAddressProcessor(Processor):
+    """Store ip_address compactly: dotted IPv4 becomes a UInt32 column, IPv6 goes to a separate column, which is
+    created (all NA) even when there is no IPv6 address
+
+    Config options:
+    - column: str, the column holding the addresses (default: "ip_address")
+    - ipv6_column: str, where IPv6 addresses are kept as compressed text (default: "<column>_v6")
+    """
+
+    def process(self, df: pd.DataFrame) -> pd.DataFrame:
+        column = self.config.get("column", "ip_address")
+        ipv6_column = self.config.get("ipv6_column", f"{column}_v6")
+        if column not in df.columns:
+            self.log(f"Column {column} not found, skipping this step")
+            return df
+
+        self.log(f"Packing IPv4 addresses in {column} into uint32")
+        raw = df[column]
+        packed = ipv4_to_uint32(raw)
+
+        # IPv6 is rare, so it is parsed only on the rows that actually contain a colon
+        leftover = raw.notna() & packed.isna()
+        has_colon = leftover & as_text(raw).str.contains(":", regex=False).fillna(False)
+        # always created, so every chunk of a load (and every load into a table) has the same columns
+        v6 = pd.Series(pd.NA, index=df.index, dtype="string")
+        if has_colon.any():
+            v6.loc[has_colon] = [self._compress_ipv6(v) for v in raw[has_colon]]
+        is_v6 = has_colon & v6.notna()
+        df[ipv6_column] = like(v6, df)
+        if is_v6.any():
+            self.log(f"Moved {int(is_v6.sum())} IPv6 addresses to {ipv6_column}")
+
+        # includes strings with a colon that do not parse as IPv6
+        invalid = leftover & ~is_v6
+        if invalid.any():
+            self.log(f"WARN: {int(invalid.sum())} values in {column} are not valid IP addresses, set to NA")
+
+        df[column] = like(packed, df)
+        return df
+
+    @staticmethod
+    def _compress_ipv6(value: str) -> object:
+        try:
+            return ipaddress.IPv6Address(str(value).strip()).compressed
+        except ValueError:
+            return pd.NA
@@ -1,9 +1,28 @@
 from __future__ import annotations
+from typing import Any, Dict, List
+import numpy as np
 import pandas as pd
+from pipeline.dtypes import as_float, float_series
 from pipeline.process.processor import Processor
 
 class MissingValuesProcessor(Processor):
-    """Fill missing values in the column timeSpentSeconds using mean or median"""
+    """Fill missing values in the column timeSpentSeconds using mean or median
+
+    Config options:
+    - strategy: str, "mean" or "median" (default: "mean")
+    - group_by: str or list[str], fill with the mean/median of the row's group (e.g. "state"),
+      falling back to the global value for groups without any observed value
+    - fill_values: dict from export_fill_values() of an earlier run; when given the values are reused
+      instead of recomputed, so every chunk of a chunked run is filled consistently. Its group_by must be
+      the configured one
+
+    In a spilled run (Orchestrator memory_limit) observe() collects the column on disk and finalize()
+    installs the exact global and per-group values as the fill_values preset.
+    """
+
+    def __init__(self, name: str, config: dict | None = None) -> None:
+        super().__init__(name, config or {})
+        self.fill_values: Dict[str, Any] | None = None
 
     def process(self, df: pd.DataFrame) -> pd.DataFrame:
         """fill missing values in the column timeSpentSeconds using mean or median"""
@@ -12,15 +31,128 @@ class MissingValuesProcessor(Processor):
             self.log("Column time_spent_seconds not found, skipping this step")
             return df
 
+        keys = self._group_keys()
+        preset = self.config.get("fill_values")
+        if preset and list(preset.get("group_by") or []) != keys:
+            raise ValueError(
+                f"fill_values were computed per {list(preset.get('group_by') or [])}, not per {keys} (group_by)"
+            )
+        if keys:
+            return self._process_grouped(df, strategy, keys)
+
         self.log(f"Filling missing time_spent_seconds using {strategy} strategy")
-        if strategy == "mean":
-            value = df["time_spent_seconds"].mean()
+        col = as_float(df["time_spent_seconds"])
+        if preset:
+            value = preset["global"]
+        elif strategy == "mean":
+            value = float_series(col).mean()
         elif strategy == "median":
-            value = df["time_spent_seconds"].median()
+            value = float_series(col).median()
         else:
             raise ValueError(f"Unknown strategy '{strategy}'")
 
-        df["time_spent_seconds"] = df["time_spent_seconds"].fillna(value)
+        df["time_spent_seconds"] = col.fillna(value)
+        self.fill_values = {"strategy": strategy, "group_by": [], "global": float(value), "groups": []}
         self.log(f"Filled missing values with {value:.2f}")
 
-        return df
\ No newline at end of file
+        return df
+
+    def _process_grouped(self, df: pd.DataFrame, strategy: str, keys: List[str]) -> pd.DataFrame:
+        self.log(f"Filling missing time_spent_seconds using {strategy} strategy per {keys}")
+        if strategy not in ("mean", "median"):
+            raise ValueError(f"Unknown strategy '{strategy}'")
+        missing = [k for k in keys if k not in df.columns]
+        if missing:
+            raise KeyError(f"group_by columns not found: {missing}")
+
+        col = as_float(df["time_spent_seconds"])
+        stats = float_series(col)
+        preset = self.config.get("fill_values")
+        if preset:
+            fallback = preset["global"]
+            group_values = self._groups_to_series(preset["groups"], keys)
+            index = pd.MultiIndex.from_frame(df[keys]) if len(keys) > 1 else pd.Index(df[keys[0]])
+            per_row = pd.Series(group_values.reindex(index).to_numpy(), index=df.index)
+        else:
+            fallback = stats.mean() if strategy == "mean" else stats.median()
+            # one groupby pass computes every group's value, broadcast back to its rows by group code
+            grouped = stats.groupby([df[k] for k in keys])
+            group_values = grouped.agg(strategy)
+            codes = grouped.ngroup().fillna(-1).to_numpy(dtype="int64")
+            # code -1 (a missing key) picks the appended NaN, which the global fallback fills
+            per_row = pd.Series(np.append(group_values.to_numpy(dtype="float64"), np.nan)[codes], index=df.index)
+
+        df["time_spent_seconds"] = col.fillna(per_row).fillna(fallback)
+        self.fill_values = {
+            "strategy": strategy,
+            "group_by": keys,
+            "global": float(fallback),
+            "groups": self._series_to_groups(group_values.dropna()),
+        }
+        self.log(
+            f"Filled missing values with {len(self.fill_values['groups'])} group {strategy}s, "
+            f"global fallback {fallback:.2f}"
+        )
+        return df
+
+    def observe(self, df: pd.DataFrame, store: Any) -> None:
+        """First pass of a spilled run: append time_spent_seconds (with group codes) to the spill store"""
+        if "time_spent_seconds" not in df.columns:
+            return
+        values = pd.to_numeric(df["time_spent_seconds"], errors="coerce").to_numpy(dtype="float64", na_value=np.nan)
+        store.values(f"{self.name}:global").append(values)
+        keys = self._group_keys()
+        if keys and all(k in df.columns for k in keys):
+            store.values(f"{self.name}:groups").append(values, store.codes(self.name).encode(df[keys]))
+
+    def finalize(self, store: Any) -> None:
+        """Exact mean/median of everything observed, installed as the fill_values preset"""
+        strategy = self.config.get("strategy", "mean").lower()
+        if strategy not in ("mean", "median"):
+            raise ValueError(f"Unknown strategy '{strategy}'")
+        spill = store.values(f"{self.name}:global")
+        fill = {"strategy": strategy, "group_by": self._group_keys(), "global": self._exact(spill, strategy, 0),
+                "groups": []}
+        if fill["group_by"]:
+            groups = store.values(f"{self.name}:groups")
+            fill["groups"] = [
+                {"key": list(key) if isinstance(key, tuple) else [key], "value": self._exact(groups, strategy, code)}
+                for key, code in store.codes(self.name).items() if groups.size(code)
+            ]
+        self.log(f"Exact {strategy} from {spill.count} spilled values: {fill['global']:.2f}")
+        self.config = {**self.config, "fill_values": fill}
+
+    def _group_keys(self) -> List[str]:
+        group_by = self.config.get("group_by")
+        if not group_by:
+            return []
+        return [group_by] if isinstance(group_by, str) else list(group_by)
+
+    @staticmethod
+    def _exact(spill: Any, strategy: str, code: int) -> float:
+        return spill.mean(code) if strategy == "mean" else spill.median(code)
+
+    def export_fill_values(self) -> Dict[str, Any]:
+        """The values used by the last process() call, as plain JSON-friendly data for the fill_values option"""
+        if self.fill_values is None:
+            raise ValueError("No fill values computed yet; run process() first")
+        return self.fill_values
+
+    @staticmethod
+    def _series_to_groups(values: pd.Series) -> List[Dict[str, Any]]:
+        keys = values.index.tolist()
+        return [
+            {"key": list(k) if isinstance(k, tuple) else [k], "value": float(v)}
+            for k, v in zip(keys, values.tolist())
+        ]
+
+    @staticmethod
+    def _groups_to_series(groups: List[Dict[str, Any]], keys: List[str]) -> pd.Series:
+        values = [g["value"] for g in groups]
+        if not groups:
+            return pd.Series(values, dtype="float64")
+        if len(keys) > 1:
+            index = pd.MultiIndex.from_tuples([tuple(g["key"]) for g in groups], names=keys)
+        else:
+            index = pd.Index([g["key"][0] for g in groups], name=keys[0])
+        return pd.Series(values, index=index, dtype="float64")
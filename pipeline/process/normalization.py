@@ -1,5 +1,8 @@
 from __future__ import annotations
+from typing import Any, Dict, List
+import numpy as np
 import pandas as pd
+from pipeline.dtypes import float_series, float_values, like
 from pipeline.process.processor import Processor
 
 class NormalizationProcessor(Processor):
@@ -10,8 +13,20 @@ class NormalizationProcessor(Processor):
 
     Config options:
     - method: str, either "z_score" or "min_max (default: "z_score")
+    - group_by: str or list[str], scale within each group (e.g. "state") instead of globally;
+      rows without a group key use the global statistics
+    - stats: dict from export_stats() of an earlier run; when given the statistics are reused
+      instead of recomputed, so every chunk of a chunked run is scaled consistently (also without group_by).
+      Its group_by must be the configured one
+
+    In a spilled run (Orchestrator memory_limit) observe() merges the statistics chunk by chunk and
+    finalize() installs those of the whole dataset as the stats preset.
     """
 
+    def __init__(self, name: str, config: dict | None = None) -> None:
+        super().__init__(name, config or {})
+        self.stats: Dict[str, Any] | None = None
+
     def process(self, df: pd.DataFrame) -> pd.DataFrame:
         self.log("Normalizing purchase column")
         if "purchase" not in df.columns:
@@ -28,9 +43,29 @@ class NormalizationProcessor(Processor):
             df["normalized_purchases"] = pd.NA
             return df
 
+        keys = self._group_keys()
+        preset = self.config.get("stats")
+        if preset and list(preset.get("group_by") or []) != keys:
+            raise ValueError(
+                f"stats were computed per {list(preset.get('group_by') or [])}, not per {keys} (group_by)"
+            )
+        if keys:
+            return self._normalize_grouped(df, method, keys)
+
+        if preset:
+            g = preset["global"]
+            mean, std, min_val, max_val = g["mean"], g["std"], g["min"], g["max"]
+        else:
+            stats = float_series(df["purchase"])
+            mean, std, min_val, max_val = stats.mean(), stats.std(), stats.min(), stats.max()
+        self.stats = {
+            "method": method,
+            "group_by": [],
+            "global": {k: float(v) for k, v in zip(("mean", "std", "min", "max"), (mean, std, min_val, max_val))},
+            "groups": [],
+        }
+
         if method == "z_score":
-            mean = df["purchase"].mean()
-            std = df["purchase"].std()
             if std == 0 or pd.isna(std):
                 self.log("WARN: Standard deviation is zero — all purchases identical.")
                 df["normalized_purchases"] = 0
@@ -38,8 +73,6 @@ class NormalizationProcessor(Processor):
                 df["normalized_purchases"] = (df["purchase"] - mean) / std
 
         elif method == "min_max":
-            min_val = df["purchase"].min()
-            max_val = df["purchase"].max()
             if min_val == max_val:
                 self.log("WARN: Min and max are equal — all purchases identical.")
                 df["normalized_purchases"] = 0
@@ -49,9 +82,113 @@ class NormalizationProcessor(Processor):
 
         else:
             self.log(f"ERROR: Unknown normalization method '{method}'. Using z_score by default.")
-            mean = df["purchase"].mean()
-            std = df["purchase"].std()
             df["normalized_purchases"] = (df["purchase"] - mean) / std
 
 
-        return df
\ No newline at end of file
+        return df
+
+    def _normalize_grouped(self, df: pd.DataFrame, method: str, keys: List[str]) -> pd.DataFrame:
+        if method not in ("z_score", "min_max"):
+            self.log(f"ERROR: Unknown normalization method '{method}'. Using z_score by default.")
+            method = "z_score"
+        missing = [k for k in keys if k not in df.columns]
+        if missing:
+            raise KeyError(f"group_by columns not found: {missing}")
+        self.log(f"Normalizing within groups of {keys}")
+
+        purchase = float_series(df["purchase"])
+        preset = self.config.get("stats")
+        if preset:
+            global_stats = preset["global"]
+            table = pd.DataFrame(
+                [g["stats"] for g in preset["groups"]],
+                index=self._key_index([tuple(g["key"]) for g in preset["groups"]], keys),
+                columns=["mean", "std", "min", "max"],
+                dtype="float64",
+            )
+            row_keys = pd.MultiIndex.from_frame(df[keys]) if len(keys) > 1 else pd.Index(df[keys[0]])
+            codes = table.index.get_indexer(row_keys)
+        else:
+            global_stats = {
+                "mean": purchase.mean(), "std": purchase.std(), "min": purchase.min(), "max": purchase.max()
+            }
+            # factorize once, aggregate every group in a single pass, then broadcast back by group code
+            grouped = purchase.groupby([df[k] for k in keys], sort=False)
+            table = grouped.agg(["mean", "std", "min", "max"])
+            codes = grouped.ngroup().fillna(-1).to_numpy(dtype="int64")
+
+        cols = {c: np.append(table[c].to_numpy(dtype="float64"), global_stats[c]) for c in table.columns}
+        # code -1 (no group key / unknown group) picks the appended global statistics
+        codes = np.where(codes < 0, len(table), codes)
+        values = purchase.to_numpy(dtype="float64", na_value=np.nan)
+
+        if method == "z_score":
+            center, scale = cols["mean"][codes], cols["std"][codes]
+            flat = (scale == 0) | np.isnan(scale)
+        else:
+            center, scale = cols["min"][codes], cols["max"][codes] - cols["min"][codes]
+            flat = scale == 0
+        with np.errstate(divide="ignore", invalid="ignore"):
+            normalized = (values - center) / scale
+        # same rule as the global path: a group whose purchases are all identical normalizes to 0
+        normalized[flat] = 0
+        if flat.any():
+            self.log(f"WARN: {len(np.unique(codes[flat]))} groups have identical purchases, set to 0")
+        df["normalized_purchases"] = like(pd.Series(normalized, index=df.index), df)
+
+        self.stats = {
+            "method": method,
+            "group_by": keys,
+            "global": {k: float(v) for k, v in global_stats.items()},
+            "groups": [
+                {"key": list(key) if isinstance(key, tuple) else [key], "stats": [float(x) for x in row]}
+                for key, row in zip(table.index.tolist(), table[["mean", "std", "min", "max"]].to_numpy())
+            ],
+        }
+        return df
+
+    def observe(self, df: pd.DataFrame, store: Any) -> None:
+        """First pass of a spilled run: merge this chunk into the running global and per-group statistics"""
+        if "purchase" not in df.columns:
+            return
+        values = float_values(df["purchase"])
+        store.moments(f"{self.name}:global").update(values)
+        keys = self._group_keys()
+        if keys and all(k in df.columns for k in keys):
+            store.moments(f"{self.name}:groups").update(values, store.codes(self.name).encode(df[keys]))
+
+    def finalize(self, store: Any) -> None:
+        """Statistics of everything observed, installed as the stats preset"""
+        keys = self._group_keys()
+        groups = store.moments(f"{self.name}:groups")
+        stats = {
+            "method": self.config.get("method", "z_score").lower().strip(),
+            "group_by": keys,
+            "global": store.moments(f"{self.name}:global").stats(),
+            "groups": [
+                {"key": list(key) if isinstance(key, tuple) else [key],
+                 "stats": [groups.stats(code)[c] for c in ("mean", "std", "min", "max")]}
+                for key, code in store.codes(self.name).items()
+            ] if keys else [],
+        }
+        self.log(f"Statistics of the whole dataset: {stats['global']}")
+        self.config = {**self.config, "stats": stats}
+
+    def _group_keys(self) -> List[str]:
+        group_by = self.config.get("group_by")
+        if not group_by:
+            return []
+        return [group_by] if isinstance(group_by, str) else list(group_by)
+
+    def export_stats(self) -> Dict[str, Any]:
+        """The statistics used by the last process() call, as JSON-friendly data for the stats option"""
+        if self.stats is None:
+            raise ValueError("No statistics computed yet; run process() first")
+        return self.stats
+
+    @staticmethod
+    def _key_index(keys: List[tuple], names: List[str]) -> pd.Index:
+        if len(names) > 1:
+            return pd.MultiIndex.from_tuples(keys, names=names) if keys else pd.MultiIndex.from_arrays(
+                [[]] * len(names), names=names)
+        return pd.Index([k[0] for k in keys], name=names[0])
@@ -1,14 +1,33 @@
 from __future__ import annotations
+from typing import Any, Dict, List, Optional
 import pandas as pd
 import numpy as np
+from pipeline.dtypes import float_series, float_values, like
 from pipeline.process.processor import Processor
 
 class PercentileProcessor(Processor):
     """Add the columns 85th_percentile_state - purchase in top 15% within its state
-    85th_percentile_national: purchase in top 15% within its national"""
+    85th_percentile_national: purchase in top 15% within its national
+    The cuts of the last run are kept in summary (percentile, national_cut, state_cuts)
+
+    Config options:
+    - percentile: float (default 0.85)
+    - output_dtype: "int" (default) or "bool"
+    - cuts: {"national_cut": x, "state_cuts": {state: x}} to use instead of computing them from the frame.
+      In a spilled run (Orchestrator memory_limit) observe() collects purchase on disk and finalize()
+      installs the exact cuts of the whole dataset here
+    - pushdown: {"dsn", "table", "schema" (default 'public'), "mode", "target"} for pushdown(), which refreshes
+      the flags of a table already in Postgres without moving its rows. mode "update" (default) rewrites the
+      flags in place, only on rows whose flags change; "create" builds target (dropped first if it exists) as a
+      copy of the table with fresh flags"""
+
+    def __init__(self, name: str, config: dict | None = None) -> None:
+        super().__init__(name, config or {})
+        self.summary: dict | None = None
 
     def process(self, df: pd.DataFrame) -> pd.DataFrame:
         self.log("Percentile columns")
+        self.summary = None
         thresh = self.config.get("percentile", 0.85)
         out_dtype  =str(self.config.get("output_dtype", "int")).lower()
 
@@ -18,21 +37,28 @@ class PercentileProcessor(Processor):
             df["85th_percentile_national"] = 0
             return df
 
-        purchase = df["purchase"]
+        # statistics and comparisons on plain float64, so both dtype backends produce the same flags
+        purchase = float_series(df["purchase"])
         valid = purchase.notna()
 
-        if valid.any():
+        preset = self.config.get("cuts")
+        if preset:
+            national_cut = np.nan if preset.get("national_cut") is None else preset["national_cut"]
+        elif valid.any():
             national_cut = purchase.quantile(thresh, interpolation="linear")
         else:
             national_cut = np.nan
 
         if "state" in df.columns:
-            state_cuts = (
-              df.loc[valid]
-              .groupby("state")["purchase"]
-              .quantile(thresh, interpolation="linear")
-            )
-            per_row_state_cut = df["state"].map(state_cuts)
+            if preset:
+                state_cuts = pd.Series(preset.get("state_cuts", {}), dtype="float64")
+            else:
+                state_cuts = (
+                  purchase[valid]
+                  .groupby(df.loc[valid, "state"])
+                  .quantile(thresh, interpolation="linear")
+                )
+            per_row_state_cut = float_series(df["state"].map(state_cuts))
         else:
             # No state column; treat all as no state threshold
             self.log("WARN: 'state' column missing; '85th_percentile_state' will be 0 for all rows.")
@@ -43,15 +69,208 @@ class PercentileProcessor(Processor):
 
         # Output dtype
         if out_dtype == "bool":
-            df["85th_percentile_state"] = state_flag
-            df["85th_percentile_national"] = national_flag
+            df["85th_percentile_state"] = like(state_flag, df)
+            df["85th_percentile_national"] = like(national_flag, df)
         else:
             # default int 0/1 for easier downstream SQL and aggregation
-            df["85th_percentile_state"] = state_flag.astype("int8")
-            df["85th_percentile_national"] = national_flag.astype("int8")
+            df["85th_percentile_state"] = like(state_flag.astype("int8"), df)
+            df["85th_percentile_national"] = like(national_flag.astype("int8"), df)
 
+        self.summary = {
+            "percentile": float(thresh),
+            "national_cut": None if pd.isna(national_cut) else float(national_cut),
+            "state_cuts": {str(k): float(v) for k, v in state_cuts.items()} if "state_cuts" in locals() else {},
+        }
         self.log(
             f"Computed cuts: national={national_cut!r}; "
             f"states with cuts={state_cuts.index.tolist() if 'state_cuts' in locals() else 'N/A'}"
         )
-        return df
\ No newline at end of file
+        return df
+
+    def observe(self, df: pd.DataFrame, store: Any) -> None:
+        """First pass of a spilled run: append purchase (and its state codes) to the spill store"""
+        if "purchase" not in df.columns:
+            return
+        values = float_values(df["purchase"])
+        store.values(f"{self.name}:national").append(values)
+        if "state" in df.columns:
+            store.values(f"{self.name}:state").append(values, store.codes(self.name).encode(df[["state"]]))
+
+    def finalize(self, store: Any) -> None:
+        """Exact cuts over everything observed, computed the way pandas computes them in process()"""
+        thresh = self.config.get("percentile", 0.85)
+        national = store.values(f"{self.name}:national")
+        by_state = store.values(f"{self.name}:state")
+        national_cut = national.quantile(thresh, method="numpy")
+        cuts = {
+            "national_cut": None if np.isnan(national_cut) else national_cut,
+            "state_cuts": {
+                state: by_state.quantile(thresh, code, method="groupby")
+                for state, code in store.codes(self.name).items() if by_state.size(code)
+            },
+        }
+        self.log(f"Exact cuts from {national.count} spilled purchases: national={cuts['national_cut']!r}")
+        self.config = {**self.config, "cuts": cuts}
+
+    def pushdown(self) -> int:
+        """Compute the cuts and set the flags inside Postgres in one statement: percentile_cont per state (the
+        a + (b - a) * frac of pandas' groupby quantile) and a national cut from its two neighbouring order
+        statistics, interpolated the way numpy does for Series.quantile, so the flags equal what process()
+        gives for the same rows. Returns the rows updated (mode "update") or created (mode "create")."""
+        from sqlalchemy import bindparam, create_engine, text
+
+        cfg = self.config.get("pushdown") or {}
+        for key in ("dsn", "table"):
+            if not cfg.get(key):
+                raise ValueError(f"Missing required pushdown config key: {key}")
+        mode = cfg.get("mode", "update")
+        if mode not in ("update", "create"):
+            raise ValueError(f"Unknown pushdown mode '{mode}'")
+        schema = cfg.get("schema", "public")
+        source = _qualify(schema, cfg["table"])
+        thresh = float(self.config.get("percentile", 0.85))
+        params = {"q": thresh, "q100": float(np.float64(thresh * 100))}
+        flags = {
+            "state": ("85th_percentile_state", "s.cut"),
+            "national": ("85th_percentile_national", "n.cut"),
+        }
+        out_dtype = str(self.config.get("output_dtype", "int")).lower()
+        sql_type = "boolean" if out_dtype == "bool" else "smallint"
+
+        self.log(f"Percentile pushdown ({mode}) on {source}")
+        self.summary = None
+        engine = create_engine(cfg["dsn"])
+        try:
+            with engine.begin() as conn:
+                if mode == "update":
+                    # flags already in the table keep their type (the type planner makes 0/1 columns BOOLEAN)
+                    existing = dict(conn.execute(
+                        text(
+                            "SELECT column_name, data_type FROM information_schema.columns "
+                            "WHERE table_schema = :schema AND table_name = :table AND column_name IN :columns"
+                        ).bindparams(bindparam("columns", expanding=True)),
+                        {"schema": schema, "table": cfg["table"], "columns": [c for c, _ in flags.values()]},
+                    ).all())
+                    types = {}
+                    for column, _ in flags.values():
+                        if column not in existing:
+                            conn.execute(text(f'ALTER TABLE {source} ADD COLUMN IF NOT EXISTS "{column}" {sql_type}'))
+                        types[column] = existing.get(column, sql_type)
+                        if types[column] not in _FLAG_TYPES:
+                            raise ValueError(f"Column {column} of {source} has type {types[column]}, not a flag type")
+                    row = conn.execute(text(_update_sql(source, flags, types)), params).one()
+                    rows = int(row.updated)
+                    self.summary = {
+                        "percentile": thresh,
+                        "national_cut": None if row.national_cut is None else float(row.national_cut),
+                        "state_cuts": {str(k): float(v) for k, v in zip(row.states or [], row.cuts or [])},
+                    }
+                else:
+                    target = cfg.get("target")
+                    if not target or target == cfg["table"]:
+                        raise ValueError("pushdown mode 'create' needs a target other than table")
+                    columns = [
+                        c for c in conn.execute(
+                            text(
+                                "SELECT column_name FROM information_schema.columns "
+                                "WHERE table_schema = :schema AND table_name = :table ORDER BY ordinal_position"
+                            ),
+                            {"schema": schema, "table": cfg["table"]},
+                        ).scalars()
+                        if c not in (column for column, _ in flags.values())
+                    ]
+                    if not columns:
+                        raise ValueError(f"Table {source} not found")
+                    target = _qualify(schema, target)
+                    conn.execute(text(f"DROP TABLE IF EXISTS {target}"))
+                    created = conn.execute(text(_create_sql(source, target, columns, flags, sql_type)), params)
+                    rows = int(created.rowcount)
+                    # the cuts stay in the database: CREATE TABLE AS cannot return them
+                    self.summary = {"percentile": thresh}
+        finally:
+            engine.dispose()
+        self.log(f"Pushdown {'updated' if mode == 'update' else 'created'} {rows} rows")
+        return rows
+
+
+# column types a flag may already have in the table; anything else is not overwritten with 0/1
+_FLAG_TYPES = ("boolean", "smallint", "integer", "bigint", "numeric", "real", "double precision")
+
+
+def _qualify(schema: Optional[str], name: str) -> str:
+    return f'"{schema}"."{name}"' if schema else f'"{name}"'
+
+
+def _cuts_sql(source: str) -> str:
+    """CTEs state_cuts (state, cut) and national (exactly one row, cut NULL without valid purchases). NaN is
+    excluded like pandas excludes it (Postgres sorts NaN above every number)."""
+    return f"""
+valid AS (
+    SELECT d."state", d."purchase"::float8 AS purchase FROM {source} AS d
+    WHERE d."purchase" IS NOT NULL AND d."purchase"::float8 <> 'NaN'::float8
+),
+state_cuts AS (
+    SELECT "state", percentile_cont(CAST(:q AS float8)) WITHIN GROUP (ORDER BY purchase) AS cut
+    FROM valid WHERE "state" IS NOT NULL GROUP BY "state"
+),
+ranks AS (
+    -- position (n - 1) * (q * 100 / 100) as numpy computes it, see ValueSpill.quantile
+    SELECT floor(pos)::bigint AS i, LEAST(floor(pos)::bigint + 1, n - 1) AS j, pos - floor(pos) AS t
+    FROM (SELECT count(*) AS n, (count(*) - 1) * (CAST(:q100 AS float8) / 100) AS pos FROM valid) AS c
+),
+ends AS (
+    SELECT min(r.purchase) FILTER (WHERE r.k = p.i) AS a, min(r.purchase) FILTER (WHERE r.k = p.j) AS b, min(p.t) AS t
+    FROM (SELECT purchase, row_number() OVER (ORDER BY purchase) - 1 AS k FROM valid) AS r, ranks AS p
+    WHERE r.k IN (p.i, p.j)
+),
+national AS (
+    SELECT CASE WHEN t >= 0.5 THEN b - (b - a) * (1 - t) ELSE a + (b - a) * t END AS cut FROM ends
+)"""
+
+
+def _flag_sql(cut: Optional[str], sql_type: str) -> str:
+    if cut is None:
+        return "false" if sql_type == "boolean" else f"0::{sql_type}"
+    test = (
+        f"""COALESCE(d."purchase" IS NOT NULL AND d."purchase"::float8 <> 'NaN'::float8 """
+        f"""AND d."purchase"::float8 >= {cut}, false)"""
+    )
+    return test if sql_type == "boolean" else f"({test})::int::{sql_type}"
+
+
+def _update_sql(source: str, flags: Dict[str, Any], types: Dict[str, str]) -> str:
+    """Two UPDATEs over disjoint rows, so both can join instead of looking a cut up per row: rows of a state
+    with a cut (hash join on state_cuts) and all others, whose state flag is 0. types maps each flag column to
+    its SQL type"""
+    state_col, state_cut = flags["state"]
+    national_col, national_cut = flags["national"]
+
+    def update(name: str, state_flag: str, sources: str, where: str) -> str:
+        national_flag = _flag_sql(national_cut, types[national_col])
+        return f"""
+{name} AS (
+    UPDATE {source} AS d SET "{state_col}" = {state_flag}, "{national_col}" = {national_flag}
+    FROM {sources}
+    WHERE {where}
+      AND (d."{state_col}" IS DISTINCT FROM {state_flag} OR d."{national_col}" IS DISTINCT FROM {national_flag})
+    RETURNING 1
+)"""
+
+    with_cut = update("with_cut", _flag_sql(state_cut, types[state_col]), "state_cuts AS s, national AS n",
+                      's.state = d."state"')
+    without_cut = update("without_cut", _flag_sql(None, types[state_col]), "national AS n",
+                         'NOT EXISTS (SELECT 1 FROM state_cuts AS s WHERE s.state = d."state")')
+    return f"""WITH {_cuts_sql(source)},{with_cut},{without_cut}
+SELECT (SELECT count(*) FROM with_cut) + (SELECT count(*) FROM without_cut) AS updated,
+       (SELECT cut FROM national) AS national_cut,
+       (SELECT array_agg("state"::text ORDER BY "state") FROM state_cuts) AS states,
+       (SELECT array_agg(cut ORDER BY "state") FROM state_cuts) AS cuts"""
+
+
+def _create_sql(source: str, target: str, columns: List[str], flags: Dict[str, Any], sql_type: str) -> str:
+    keep = ", ".join(f'd."{c}"' for c in columns)
+    computed = ", ".join(f'{_flag_sql(cut, sql_type)} AS "{column}"' for column, cut in flags.values())
+    return f"""CREATE TABLE {target} AS
+WITH {_cuts_sql(source)}
+SELECT {keep}, {computed}
+FROM {source} AS d LEFT JOIN state_cuts AS s ON s.state = d."state" CROSS JOIN national AS n"""
@@ -1,19 +1,27 @@
 from __future__ import annotations
+from functools import lru_cache
+from typing import Dict, FrozenSet, Tuple
 import pandas as pd
 import us
+from pipeline.dtypes import as_text, like
 from pipeline.process.processor import Processor
 
+
+@lru_cache(maxsize=1)
+def _state_lookup() -> Tuple[Dict[str, str], FrozenSet[str]]:
+    # Build lowercase mapping to avoid title-casing pitfalls ("of", "and", etc.); built once per process
+    name_to_abbr = {
+        s.name.strip().casefold(): s.abbr
+        for s in us.states.STATES_AND_TERRITORIES
+    }
+    return name_to_abbr, frozenset(s.abbr for s in us.states.STATES_AND_TERRITORIES)
+
 class StateAbbreviationProcessor(Processor):
     """Add the column state_abbreviation which contain the abbreviated US state names"""
 
     def __init__(self, name: str, config: dict | None = None) -> None:
         super().__init__(name, config or {})
-        # Build lowercase mapping to avoid title-casing pitfalls ("of", "and", etc.)
-        self._name_to_abbr = {
-            s.name.strip().casefold(): s.abbr
-            for s in us.states.STATES_AND_TERRITORIES
-        }
-        self._abbr_set = {s.abbr for s in us.states.STATES_AND_TERRITORIES}
+        self._name_to_abbr, self._abbr_set = _state_lookup()
 
     def process(self, df: pd.DataFrame) -> pd.DataFrame:
         self.log("Mapping state via 'us' library")
@@ -23,7 +31,7 @@ class StateAbbreviationProcessor(Processor):
             return df
 
         # Normalize input once
-        state_raw = df["state"].astype("string")
+        state_raw = as_text(df["state"])
         state_trim = state_raw.str.strip()
 
         # 1) Name-based mapping (lowercased keys)
@@ -35,7 +43,7 @@ class StateAbbreviationProcessor(Processor):
         already_abbr = state_upper.where(state_upper.isin(self._abbr_set), other=pd.NA)
 
         # Prefer name mapping, else keep existing abbr
-        df["state_abbreviation"] = mapped_from_name.fillna(already_abbr)
+        df["state_abbreviation"] = like(mapped_from_name.fillna(already_abbr), df)
 
         # Optional: log unmapped values to help debugging
         unmapped = df.loc[state_trim.notna() & df["state_abbreviation"].isna(), "state"].unique()
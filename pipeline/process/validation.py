@@ -0,0 +1,128 @@
+from __future__ import annotations
+import os
+from typing import Any, Callable, Dict, List, Tuple
+import numpy as np
+import pandas as pd
+from pipeline.dtypes import as_text, float_series
+from pipeline.process.processor import Processor
+
+Check = Callable[[pd.Series], pd.Series]
+
+
+class ValidationProcessor(Processor):
+    """Check rows against declarative data-quality rules, pass the good rows on and quarantine the bad ones
+
+    Each rule is compiled once into a function returning one vectorized boolean "fails" mask for the whole
+    column; there is no per-row apply. Failing rows get a reject_reasons column ("code;code") and are sent
+    to the quarantine sink; the processor returns only the rows that passed every rule.
+
+    Rules (dicts):
+    - {"column": c, "check": "not_null"}
+    - {"column": c, "check": "type", "type": "numeric" | "integer" | "string"}
+    - {"column": c, "check": "range", "min": x, "max": y}  (either bound optional, inclusive)
+    - {"column": c, "check": "allowed", "values": [...]}
+    - {"column": c, "check": "regex", "pattern": "..."}  (full match)
+    Every rule may set "code"; the default is "<column>_<check>". Apart from not_null, missing values pass.
+
+    Config options:
+    - rules: list[dict] (required)
+    - quarantine: str path of a CSV file that rejected rows are appended to, or a Writer (anything with run(df))
+    """
+
+    def __init__(self, name: str, config: dict | None = None) -> None:
+        super().__init__(name, config or {})
+        self._compiled = [self._compile(rule) for rule in self.config.get("rules", [])]
+        self.report: Dict[str, int] = {}
+
+    def process(self, df: pd.DataFrame) -> pd.DataFrame:
+        self.log(f"Validating {len(df)} rows against {len(self._compiled)} rules")
+        failed = np.zeros(len(df), dtype=bool)
+        masks: List[Tuple[str, np.ndarray]] = []
+        for code, column, check in self._compiled:
+            if column not in df.columns:
+                self.log(f"WARN: column {column} not found, skipping rule {code}")
+                continue
+            # Arrow-backed columns give <NA> where NumPy comparisons give False; both mean "did not fail"
+            mask = check(df[column]).fillna(False).to_numpy(dtype=bool)
+            masks.append((code, mask))
+            failed |= mask
+
+        self.report = {code: int(mask.sum()) for code, mask in masks}
+        if not failed.any():
+            self.log("All rows passed validation")
+            return df
+
+        # reason strings are assembled only for the failing rows, one vectorized step per rule
+        reasons = np.full(int(failed.sum()), "", dtype=object)
+        for code, mask in masks:
+            reasons = reasons + np.where(mask[failed], code + ";", "")
+        rejected = df.loc[failed].assign(reject_reasons=[r.rstrip(";") for r in reasons])
+
+        summary = ", ".join(f"{code}={n}" for code, n in self.report.items() if n)
+        self.log(f"Quarantined {len(rejected)} rows ({summary})")
+        self._quarantine(rejected)
+        return df.loc[~failed]
+
+    def _quarantine(self, rejected: pd.DataFrame) -> None:
+        sink = self.config.get("quarantine")
+        if sink is None:
+            self.log("WARN: no quarantine sink configured, rejected rows are dropped")
+        elif isinstance(sink, (str, os.PathLike)):
+            rejected.to_csv(sink, mode="a", header=not os.path.exists(sink), index=False)
+        else:
+            sink.run(rejected)
+
+    @staticmethod
+    def _compile(rule: Dict[str, Any]) -> Tuple[str, str, Check]:
+        column = rule.get("column")
+        check = str(rule.get("check", "")).lower()
+        code = rule.get("code") or f"{column}_{check}"
+        if not column:
+            raise ValueError(f"Rule {rule!r} has no column")
+
+        if check == "not_null":
+            fn: Check = lambda s: s.isna()
+
+        elif check == "type":
+            kind = str(rule.get("type", "")).lower()
+            if kind == "numeric":
+                fn = lambda s: pd.to_numeric(s, errors="coerce").isna() & s.notna()
+            elif kind == "integer":
+                def fn(s: pd.Series) -> pd.Series:
+                    num = float_series(s)
+                    return s.notna() & (num.isna() | (num % 1 != 0))
+            elif kind == "string":
+                def fn(s: pd.Series) -> pd.Series:
+                    if not (pd.api.types.is_object_dtype(s.dtype) or pd.api.types.is_string_dtype(s.dtype)):
+                        return s.notna()
+                    # the .str accessor yields NA for every element that is not a str
+                    return s.notna() & s.str.len().isna()
+            else:
+                raise ValueError(f"Unknown type '{kind}' in rule {code}")
+
+        elif check == "range":
+            low, high = rule.get("min"), rule.get("max")
+            def fn(s: pd.Series) -> pd.Series:
+                num = pd.to_numeric(s, errors="coerce")
+                bad = pd.Series(False, index=s.index)
+                if low is not None:
+                    bad |= num < low
+                if high is not None:
+                    bad |= num > high
+                # non-numeric text cannot be inside any range
+                return bad | (num.isna() & s.notna())
+
+        elif check == "allowed":
+            allowed = list(rule.get("values", []))
+            fn = lambda s: s.notna() & ~s.isin(allowed)
+
+        elif check == "regex":
+            pattern = rule.get("pattern")
+            if not pattern:
+                raise ValueError(f"Rule {code} has no pattern")
+            fn = lambda s: s.notna() & ~as_text(s).str.fullmatch(pattern).fillna(False)
+
+        else:
+            raise ValueError(f"Unknown check '{check}' in rule {code}")
+
+        return code, column, fn
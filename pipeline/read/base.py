@@ -1,6 +1,6 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Iterator
 import pandas as pd
 from pipeline.task import Task
 
@@ -14,6 +14,11 @@ class Reader(Task, ABC):
     def read(self) -> pd.DataFrame:
         raise NotImplementedError
 
+    def iter_chunks(self) -> Iterator[pd.DataFrame]:
+        """Yield the data as a stream of frames for Orchestrator.run_chunked(); readers that can stream
+        override this, the default is a single chunk holding everything read() returns"""
+        yield self.read()
+
     # so Orchestrator can call reader.run()
     def run(self) -> pd.DataFrame:
         self.log("Reader.run() -> delegating to read()")
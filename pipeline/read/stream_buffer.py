@@ -0,0 +1,79 @@
+from __future__ import annotations
+import io
+import queue
+from typing import Optional
+
+"""A bounded, blocking byte pipe between a producer (e.g. an HTTP upload arriving piece by piece) and a consumer
+that wants a file object (e.g. pandas.read_csv). At most max_pieces are buffered, so a fast producer is throttled
+to the speed of the consumer instead of spooling the whole upload to memory or disk."""
+
+_EOF = b""
+
+
+class StreamAborted(BrokenPipeError):
+    """Raised to the producer once the consumer has given up (and vice versa)"""
+
+
+class StreamBuffer(io.RawIOBase):
+    def __init__(self, max_pieces: int = 16) -> None:
+        super().__init__()
+        self._pieces: "queue.Queue[bytes]" = queue.Queue(maxsize=max_pieces)
+        self._current = memoryview(b"")
+        self._finished = False
+        self._aborted = False
+        self.bytes_fed = 0
+
+    # producer side
+    def feed(self, data: bytes) -> None:
+        """Append bytes, blocking while the buffer is full"""
+        if not data:
+            return
+        self._put(bytes(data))
+        self.bytes_fed += len(data)
+
+    def finish(self) -> None:
+        """Signal end of stream to the reader"""
+        self._put(_EOF)
+
+    def abort(self) -> None:
+        """Unblock both sides; the producer's feed() and the reader's read() raise StreamAborted"""
+        self._aborted = True
+        try:
+            while True:
+                self._pieces.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            self._pieces.put_nowait(_EOF)
+        except queue.Full:
+            pass
+
+    def _put(self, data: bytes) -> None:
+        while True:
+            if self._aborted:
+                raise StreamAborted("stream consumer stopped")
+            try:
+                self._pieces.put(data, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    # consumer side
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> Optional[int]:
+        if not len(self._current):
+            if self._finished:
+                return 0
+            piece = self._pieces.get()
+            if self._aborted:
+                raise StreamAborted("stream producer aborted")
+            if piece is _EOF or not piece:
+                self._finished = True
+                return 0
+            self._current = memoryview(piece)
+        n = min(len(b), len(self._current))
+        b[:n] = self._current[:n]
+        self._current = self._current[n:]
+        return n
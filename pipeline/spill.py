@@ -0,0 +1,296 @@
+from __future__ import annotations
+import os
+import shutil
+import tempfile
+from typing import Any, Dict, Hashable, Iterator, List, Optional, Tuple
+import numpy as np
+import pandas as pd
+
+"""Disk-backed buffers for runs whose data does not fit in memory (see Orchestrator memory_limit).
+
+Frames are spilled as pickles, one per chunk. Columns that need exact order statistics (percentiles, medians)
+are spilled as int64 sort keys, optionally paired with an int64 group code. The keys are turned into sorted runs
+by an external sort: run_rows rows are sorted in memory at a time and written back in place. The k-th smallest
+value is then found without merging the runs, by bisecting over the key space and counting keys <= x in every
+run with searchsorted. Only the touched pages of the memory-mapped runs are ever read."""
+
+_LOW_BITS = np.int64(0x7FFFFFFFFFFFFFFF)
+
+
+def float_keys(values: np.ndarray) -> np.ndarray:
+    """Map float64 values to int64 keys with the same order (flip the magnitude bits of negative numbers)"""
+    bits = np.ascontiguousarray(values, dtype="float64").view("int64")
+    return np.where(bits < 0, bits ^ _LOW_BITS, bits)
+
+
+def key_floats(keys: np.ndarray) -> np.ndarray:
+    keys = np.asarray(keys, dtype="int64")
+    return np.where(keys < 0, keys ^ _LOW_BITS, keys).view("float64")
+
+
+class GroupCodes:
+    """Stable int codes for group keys across chunks; a key is a scalar for one column, a tuple for several"""
+
+    def __init__(self) -> None:
+        self.codes: Dict[Hashable, int] = {}
+
+    def encode(self, keys: pd.DataFrame) -> np.ndarray:
+        """Code of every row; -1 where any key column is missing"""
+        if keys.shape[1] == 1:
+            local, uniques = pd.factorize(keys.iloc[:, 0])
+        else:
+            local, uniques = pd.factorize(pd.MultiIndex.from_frame(keys))
+        lut = np.array([self.codes.setdefault(u, len(self.codes)) for u in uniques.tolist()], dtype="int64")
+        codes = np.where(local >= 0, lut[np.maximum(local, 0)] if len(lut) else -1, -1)
+        return np.where(keys.isna().any(axis=1).to_numpy(), -1, codes)
+
+    def items(self) -> List[Tuple[Hashable, int]]:
+        return list(self.codes.items())
+
+
+class ValueSpill:
+    """Append-only column of float64 values (NaN dropped) with group codes, queried for exact order statistics"""
+
+    def __init__(self, directory: str, name: str, run_rows: int) -> None:
+        self.run_rows = int(run_rows)
+        self._keys_path = os.path.join(directory, f"{name}.keys")
+        self._codes_path = os.path.join(directory, f"{name}.codes")
+        self._keys_fh: Any = open(self._keys_path, "ab")
+        self._codes_fh: Any = open(self._codes_path, "ab")
+        self.count = 0
+        self.sums = np.zeros(0, dtype="float64")
+        self.counts = np.zeros(0, dtype="int64")
+        self._keys: Optional[np.ndarray] = None
+        self._codes: Optional[np.ndarray] = None
+        self._runs: List[Tuple[int, int]] = []
+        self._bounds: Dict[int, List[Tuple[int, int]]] = {}
+
+    def append(self, values: np.ndarray, codes: Optional[np.ndarray] = None) -> None:
+        if self._keys is not None:
+            raise RuntimeError("ValueSpill is sealed")
+        values = np.asarray(values, dtype="float64")
+        codes = np.zeros(len(values), dtype="int64") if codes is None else np.asarray(codes, dtype="int64")
+        keep = ~np.isnan(values) & (codes >= 0)
+        values, codes = values[keep], codes[keep]
+        if not len(values):
+            return
+        self._keys_fh.write(float_keys(values).tobytes())
+        self._codes_fh.write(codes.tobytes())
+        self.count += len(values)
+        size = max(len(self.sums), int(codes.max()) + 1)
+        self.sums = np.pad(self.sums, (0, size - len(self.sums))) + np.bincount(codes, values, size)
+        self.counts = np.pad(self.counts, (0, size - len(self.counts))) + np.bincount(codes, minlength=size)
+
+    def seal(self) -> None:
+        """External sort: sort the spilled (code, key) pairs run_rows at a time, in place on disk"""
+        if self._keys is not None:
+            return
+        self._keys_fh.close()
+        self._codes_fh.close()
+        if not self.count:
+            self._keys = np.empty(0, dtype="int64")
+            self._codes = np.empty(0, dtype="int64")
+            return
+        keys = np.memmap(self._keys_path, dtype="int64", mode="r+", shape=(self.count,))
+        codes = np.memmap(self._codes_path, dtype="int64", mode="r+", shape=(self.count,))
+        for start in range(0, self.count, self.run_rows):
+            stop = min(start + self.run_rows, self.count)
+            run_keys, run_codes = np.array(keys[start:stop]), np.array(codes[start:stop])
+            order = np.lexsort((run_keys, run_codes))
+            keys[start:stop] = run_keys[order]
+            codes[start:stop] = run_codes[order]
+            self._runs.append((start, stop))
+        keys.flush()
+        codes.flush()
+        self._keys, self._codes = keys, codes
+
+    def size(self, code: int = 0) -> int:
+        return int(self.counts[code]) if 0 <= code < len(self.counts) else 0
+
+    def mean(self, code: int = 0) -> float:
+        n = self.size(code)
+        return float(self.sums[code] / n) if n else float("nan")
+
+    def kth(self, k: int, code: int = 0) -> float:
+        """The k-th smallest value (0-based) of a group"""
+        bounds = self._group_bounds(code)
+        if not 0 <= k < sum(hi - lo for lo, hi in bounds):
+            raise IndexError(f"k={k} out of range for group {code}")
+        keys = self._keys
+        assert keys is not None
+        lo = min(int(keys[a]) for a, b in bounds if b > a)
+        hi = max(int(keys[b - 1]) for a, b in bounds if b > a)
+        # smallest key with at least k + 1 keys <= it; at most 64 rounds of one searchsorted per run
+        while lo < hi:
+            mid = lo + (hi - lo) // 2
+            if sum(int(np.searchsorted(keys[a:b], mid, side="right")) for a, b in bounds) >= k + 1:
+                hi = mid
+            else:
+                lo = mid + 1
+        return float(key_floats(np.array([lo]))[0])
+
+    def quantile(self, q: float, code: int = 0, method: str = "numpy") -> float:
+        """Linear-interpolated quantile matching pandas bit for bit: method="numpy" as Series.quantile
+        (numpy's lerp), method="groupby" as DataFrameGroupBy.quantile (a + (b - a) * frac)"""
+        n = self.size(code)
+        if not n:
+            return float("nan")
+        if method == "numpy":
+            # Series.quantile goes through np.percentile(q * 100), which divides by 100 again
+            pos = (n - 1) * (np.float64(q * 100) / 100)
+            i = int(np.floor(pos))
+            t = pos - i
+            a = self.kth(i, code)
+            b = self.kth(min(i + 1, n - 1), code)
+            diff = b - a
+            return float(b - diff * (1 - t)) if t >= 0.5 else float(a + diff * t)
+        if method == "groupby":
+            pos = q * (n - 1)
+            i = int(pos)
+            frac = pos % 1
+            a = self.kth(i, code)
+            return a if frac == 0.0 else a + (self.kth(i + 1, code) - a) * frac
+        raise ValueError(f"Unknown quantile method '{method}'")
+
+    def median(self, code: int = 0) -> float:
+        """Median as numpy computes it: the middle value, or the mean of the two middle values"""
+        n = self.size(code)
+        if not n:
+            return float("nan")
+        if n % 2:
+            return self.kth(n // 2, code)
+        return (self.kth(n // 2 - 1, code) + self.kth(n // 2, code)) / 2
+
+    def close(self) -> None:
+        self._keys_fh.close()
+        self._codes_fh.close()
+
+    def _group_bounds(self, code: int) -> List[Tuple[int, int]]:
+        self.seal()
+        if code not in self._bounds:
+            codes = self._codes
+            assert codes is not None
+            self._bounds[code] = [
+                (a + int(np.searchsorted(codes[a:b], code, side="left")),
+                 a + int(np.searchsorted(codes[a:b], code, side="right")))
+                for a, b in self._runs
+            ]
+        return self._bounds[code]
+
+
+class Moments:
+    """Count, mean, sum of squared deviations, min and max per group code, merged chunk by chunk
+    (Chan et al.), so std is computed in one pass without keeping the values"""
+
+    def __init__(self) -> None:
+        self.n = np.zeros(0, dtype="float64")
+        self.mean = np.zeros(0, dtype="float64")
+        self.m2 = np.zeros(0, dtype="float64")
+        self.min = np.zeros(0, dtype="float64")
+        self.max = np.zeros(0, dtype="float64")
+
+    def update(self, values: np.ndarray, codes: Optional[np.ndarray] = None) -> None:
+        values = np.asarray(values, dtype="float64")
+        codes = np.zeros(len(values), dtype="int64") if codes is None else np.asarray(codes, dtype="int64")
+        keep = ~np.isnan(values) & (codes >= 0)
+        values, codes = values[keep], codes[keep]
+        if not len(values):
+            return
+        size = max(len(self.n), int(codes.max()) + 1)
+        self._grow(size)
+        n_b = np.bincount(codes, minlength=size).astype("float64")
+        with np.errstate(invalid="ignore", divide="ignore"):
+            mean_b = np.bincount(codes, values, size) / n_b
+        m2_b = np.bincount(codes, (values - mean_b[codes]) ** 2, size)
+        min_b = np.full(size, np.inf)
+        max_b = np.full(size, -np.inf)
+        np.minimum.at(min_b, codes, values)
+        np.maximum.at(max_b, codes, values)
+
+        seen = n_b > 0
+        n = self.n + n_b
+        delta = np.where(seen, mean_b - self.mean, 0.0)
+        with np.errstate(invalid="ignore", divide="ignore"):
+            share = np.where(seen, n_b / n, 0.0)
+        self.m2 = self.m2 + np.where(seen, m2_b, 0.0) + delta ** 2 * self.n * share
+        self.mean = self.mean + delta * share
+        self.n = n
+        self.min = np.minimum(self.min, min_b)
+        self.max = np.maximum(self.max, max_b)
+
+    def stats(self, code: int = 0) -> Dict[str, float]:
+        """mean, std (ddof=1, as pandas), min and max of a group; NaN where undefined"""
+        n = self.n[code] if code < len(self.n) else 0.0
+        if not n:
+            return {"mean": float("nan"), "std": float("nan"), "min": float("nan"), "max": float("nan")}
+        return {
+            "mean": float(self.mean[code]),
+            "std": float(np.sqrt(self.m2[code] / (n - 1))) if n > 1 else float("nan"),
+            "min": float(self.min[code]),
+            "max": float(self.max[code]),
+        }
+
+    def _grow(self, size: int) -> None:
+        extra = size - len(self.n)
+        if extra > 0:
+            self.n = np.pad(self.n, (0, extra))
+            self.mean = np.pad(self.mean, (0, extra))
+            self.m2 = np.pad(self.m2, (0, extra))
+            self.min = np.pad(self.min, (0, extra), constant_values=np.inf)
+            self.max = np.pad(self.max, (0, extra), constant_values=-np.inf)
+
+
+class FrameSpill:
+    """Chunks of one pass, pickled to disk; iterating reads them back and deletes each file once loaded"""
+
+    def __init__(self, directory: str, name: str) -> None:
+        self.directory = directory
+        self.name = name
+        self._paths: List[str] = []
+
+    def append(self, df: pd.DataFrame) -> None:
+        path = os.path.join(self.directory, f"{self.name}-{len(self._paths):06d}.pkl")
+        df.to_pickle(path)
+        self._paths.append(path)
+
+    def __len__(self) -> int:
+        return len(self._paths)
+
+    def __iter__(self) -> Iterator[pd.DataFrame]:
+        for path in self._paths:
+            df = pd.read_pickle(path)
+            os.remove(path)
+            yield df
+
+
+class SpillStore:
+    """Scratch directory of one spilled run; every processor gets its buffers here by name"""
+
+    def __init__(self, directory: Optional[str] = None, run_rows: int = 4_000_000) -> None:
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = tempfile.mkdtemp(prefix="spill-", dir=directory)
+        self.run_rows = int(run_rows)
+        self._values: Dict[str, ValueSpill] = {}
+        self._codes: Dict[str, GroupCodes] = {}
+        self._moments: Dict[str, Moments] = {}
+
+    def values(self, name: str) -> ValueSpill:
+        if name not in self._values:
+            self._values[name] = ValueSpill(self.path, f"values-{len(self._values)}", self.run_rows)
+        return self._values[name]
+
+    def codes(self, name: str) -> GroupCodes:
+        return self._codes.setdefault(name, GroupCodes())
+
+    def moments(self, name: str) -> Moments:
+        return self._moments.setdefault(name, Moments())
+
+    def frames(self, name: str) -> FrameSpill:
+        return FrameSpill(self.path, name)
+
+    def cleanup(self) -> None:
+        for spill in self._values.values():
+            spill.close()
+        self._values.clear()
+        shutil.rmtree(self.path, ignore_errors=True)
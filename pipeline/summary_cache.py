@@ -0,0 +1,39 @@
+from __future__ import annotations
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Optional, Tuple
+
+"""Aggregates computed during a load (percentile cuts, conversion rates), kept per target table and section so
+dashboards can read them without querying the database. Each entry is stored pre-serialised with its ETag, so
+serving it is a dict lookup; a completed load replaces the target's entries, which invalidates the old ETags.
+A load whose aggregates do not describe the whole table (an append, a chunked run) only drops the entries."""
+
+
+class SummaryCache:
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._entries: Dict[Tuple[str, str], Tuple[bytes, str]] = {}
+
+    def update(self, target: str, summary: Dict[str, Any]) -> None:
+        fresh = {}
+        for section, value in summary.items():
+            if value is None:
+                continue
+            body = json.dumps({"target": target, section: value}, sort_keys=True).encode()
+            fresh[(target, section)] = (body, '"' + hashlib.sha1(body).hexdigest() + '"')
+        with self._lock:
+            self._drop(target)
+            self._entries.update(fresh)
+
+    def invalidate(self, target: str) -> None:
+        with self._lock:
+            self._drop(target)
+
+    def _drop(self, target: str) -> None:
+        for key in [k for k in self._entries if k[0] == target]:
+            del self._entries[key]
+
+    def get(self, target: str, section: str) -> Optional[Tuple[bytes, str]]:
+        """(json body, etag) or None when no load of target produced this section yet"""
+        return self._entries.get((target, section))
@@ -0,0 +1,170 @@
+from __future__ import annotations
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+import pandas as pd
+
+from pipeline.write.writer import Writer
+
+"""One pipeline run, several destinations. FanOutWriter hands the same frame (or every chunk of a stream) to each
+of its writers and runs them concurrently on threads. Sinks get a shallow view of the frame: the column data is
+shared, never copied, so they must not modify values in place (the writers in this package only derive new
+frames). Chunks reach each sink through a small bounded queue, so a slow sink holds back the reader instead of
+buffering the whole stream."""
+
+_END = object()
+
+
+class FanOutAborted(RuntimeError):
+    """Raised inside a sink's chunk stream when another sink failed under on_error='abort'"""
+
+
+class _Sink:
+    def __init__(self, writer: Writer, name: str, maxsize: int) -> None:
+        self.writer = writer
+        self.name = name
+        self.chunks: "queue.Queue[Any]" = queue.Queue(maxsize=maxsize)
+        self.rows = 0
+        self.seconds = 0.0
+        self.error: Optional[BaseException] = None
+        self.done = threading.Event()
+
+    def stream(self, abort: threading.Event) -> Iterator[pd.DataFrame]:
+        while True:
+            try:
+                item = self.chunks.get(timeout=0.1)
+            except queue.Empty:
+                if abort.is_set():
+                    raise FanOutAborted(f"{self.name}: stopped, the load was aborted")
+                continue
+            if abort.is_set():
+                raise FanOutAborted(f"{self.name}: stopped, the load was aborted")
+            if item is _END:
+                return
+            yield item
+
+
+class FanOutWriter(Writer):
+    """
+    writers: the sinks, each a Writer; all of them receive every row
+    config:
+      - on_error: "abort" (default) stops the other sinks of a chunk stream as soon as one fails and raises its
+                  error (sinks writing a whole frame cannot be interrupted; they finish, then the error is raised);
+                  "continue" lets the others finish and only raises if every sink failed
+      - queue_chunks: chunks buffered per sink while streaming (default 2)
+    After every write, report holds one entry per sink: {"sink", "rows", "seconds", "status", "committed",
+    "error"}. committed is True for a sink whose write returned, so its rows are in place even if the fan-out
+    raised: there is no transaction across sinks, and a sink may commit before another one fails. A sink
+    stopped under abort is not committed (a writer that commits chunk by chunk may have kept earlier chunks).
+    """
+
+    def __init__(self, name: str, writers: Sequence[Writer], config: Dict[str, Any] | None = None) -> None:
+        super().__init__(name=name, config=config or {})
+        if not writers:
+            raise ValueError("FanOutWriter needs at least one writer")
+        on_error = self.config.get("on_error", "abort")
+        if on_error not in ("abort", "continue"):
+            raise ValueError(f"Unknown on_error policy '{on_error}'")
+        self.writers = list(writers)
+        self.report: List[Dict[str, Any]] = []
+
+    def write(self, df: pd.DataFrame) -> int:
+        sinks = self._sinks()
+        with ThreadPoolExecutor(max_workers=len(sinks), thread_name_prefix="fanout") as pool:
+            for sink in sinks:
+                pool.submit(self._run, sink, lambda w=sink.writer: w.write(df.copy(deep=False)))
+        return self._finish(sinks)
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> int:
+        sinks = self._sinks()
+        abort = threading.Event()
+        threads: List[threading.Thread] = []
+        for sink in sinks:
+            t = threading.Thread(
+                target=self._run, args=(sink, lambda s=sink: s.writer.write_chunks(s.stream(abort)), abort),
+                name=f"fanout-{sink.name}", daemon=True,
+            )
+            t.start()
+            threads.append(t)
+        try:
+            for chunk in chunks:
+                live = [s for s in sinks if not s.done.is_set()]
+                if abort.is_set() or not live:
+                    break
+                for sink in live:
+                    self._put(sink, chunk.copy(deep=False))
+        except BaseException:
+            # the source failed: every sink stops and rolls back whatever it has open
+            abort.set()
+            self._close(sinks, threads)
+            self._finish(sinks, raise_errors=False)
+            raise
+        self._close(sinks, threads)
+        return self._finish(sinks)
+
+    def _sinks(self) -> List[_Sink]:
+        maxsize = max(1, int(self.config.get("queue_chunks", 2)))
+        names: Dict[str, int] = {}
+        sinks = []
+        for writer in self.writers:
+            seen = names[writer.name] = names.get(writer.name, 0) + 1
+            sinks.append(_Sink(writer, writer.name if seen == 1 else f"{writer.name}#{seen}", maxsize))
+        return sinks
+
+    def _run(self, sink: _Sink, call: Any, abort: Optional[threading.Event] = None) -> None:
+        started = time.perf_counter()
+        try:
+            sink.rows = int(call() or 0)
+        except BaseException as e:
+            sink.error = e
+            if abort is not None and self.config.get("on_error", "abort") == "abort":
+                abort.set()
+        finally:
+            sink.seconds = time.perf_counter() - started
+            sink.done.set()
+
+    @staticmethod
+    def _put(sink: _Sink, item: Any) -> None:
+        """Queue item for a sink that is still running; a finished (or failed) sink is skipped"""
+        while not sink.done.is_set():
+            try:
+                sink.chunks.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def _close(self, sinks: List[_Sink], threads: List[threading.Thread]) -> None:
+        for sink in sinks:
+            self._put(sink, _END)
+        for t in threads:
+            t.join()
+
+    def _finish(self, sinks: List[_Sink], raise_errors: bool = True) -> int:
+        self.report = []
+        for sink in sinks:
+            status = "ok" if sink.error is None else "aborted" if isinstance(sink.error, FanOutAborted) else "failed"
+            self.report.append({
+                "sink": sink.name,
+                "rows": sink.rows,
+                "seconds": round(sink.seconds, 6),
+                "status": status,
+                "committed": sink.error is None,
+                "error": None if sink.error is None else str(sink.error),
+            })
+            self.log(f"{sink.name}: {status}, {sink.rows} rows in {sink.seconds:.3f}s")
+
+        failed = [s for s in sinks if s.error is not None and not isinstance(s.error, FanOutAborted)]
+        succeeded = [s for s in sinks if s.error is None]
+        if not raise_errors:
+            return sum(s.rows for s in succeeded)
+        if failed and (self.config.get("on_error", "abort") == "abort" or not succeeded):
+            if succeeded:
+                self.log(
+                    f"WARN: {', '.join(s.name for s in succeeded)} committed before {failed[0].name} failed; "
+                    f"the sinks no longer hold the same rows"
+                )
+            raise failed[0].error  # type: ignore[misc]
+        # the rows of the first sink that succeeded, normally the primary destination
+        return succeeded[0].rows
@@ -0,0 +1,190 @@
+from __future__ import annotations
+import os
+import shutil
+import tempfile
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+from urllib.parse import quote
+import pandas as pd
+
+from pipeline.dtypes import to_arrow_table
+from pipeline.write.writer import Writer
+
+"""Processed output as a Hive-partitioned Parquet dataset (<path>/state_abbreviation=OH/part-....parquet), for readers
+that only want some partitions and columns. Files are written into a staging directory next to the dataset and
+only moved into place once every writer is closed, so a failed run leaves the dataset as it was. pyarrow is
+imported when the writer runs."""
+
+# directory name pyarrow and Hive use for rows whose partition value is null
+NULL_PARTITION = "__HIVE_DEFAULT_PARTITION__"
+
+
+class _PartitionFile:
+    """One open Parquet file and the rows buffered for its next row group"""
+
+    def __init__(self, writer: Any, path: str) -> None:
+        self.writer = writer
+        self.path = path
+        self.pending: List[Any] = []
+        self.pending_rows = 0
+
+
+class ParquetDatasetWriter(Writer):
+    """
+    config:
+      - path: str (required), root directory of the dataset
+      - partition_by: column or list of columns for Hive-style <column>=<value> directories (default: none);
+        the partition columns are stored in the directory names, not in the files
+      - if_exists: "replace" (default) swaps the whole directory for the new one once the write succeeded,
+        "append" adds the new files next to the existing ones (no file is ever rewritten), "fail" refuses to
+        write into an existing dataset
+      - row_group_size: rows per row group (default 100000); rows are buffered per partition until a row group
+        is full, so small chunks still give full row groups
+      - compression: Parquet codec, e.g. "snappy" (default), "zstd", "gzip", "none"
+      - use_dictionary: True (default), False, or a list of columns to dictionary-encode
+      - max_open_writers: partition files kept open at once (default 64); the least recently used one is
+        closed when another is needed and the partition continues in a new file
+    """
+
+    def __init__(self, name: str, config: Dict[str, Any] | None = None) -> None:
+        super().__init__(name=name, config=config or {})
+        self.files: List[str] = []
+
+    def write(self, df: pd.DataFrame) -> int:
+        return self.write_chunks([df])
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> int:
+        root = os.path.abspath(self._require("path"))
+        if_exists = self.config.get("if_exists", "replace")
+        if if_exists not in ("replace", "append", "fail"):
+            raise ValueError(f"Unknown if_exists '{if_exists}'")
+        if if_exists == "fail" and os.path.exists(root):
+            raise FileExistsError(f"Parquet dataset already exists: {root}")
+
+        parent = os.path.dirname(root)
+        os.makedirs(parent, exist_ok=True)
+        # on the same file system as the dataset, so committing is a rename
+        staging = tempfile.mkdtemp(prefix=f".{os.path.basename(root)}.", dir=parent)
+        self._run_id = uuid.uuid4().hex[:12]
+        self._open: "OrderedDict[str, _PartitionFile]" = OrderedDict()
+        self._schema: Any = None
+        self._seq = 0
+        self.files = []
+        rows = 0
+        try:
+            for chunk in chunks:
+                for directory, part in self._partitions(chunk):
+                    self._append(staging, directory, part)
+                rows += int(len(chunk))
+            while self._open:
+                self._close(next(iter(self._open)))
+            self._commit(staging, root, if_exists)
+        except BaseException:
+            for entry in self._open.values():
+                entry.writer.close()
+            self._open.clear()
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.log(f"Wrote {rows} rows in {len(self.files)} files to {root} ({if_exists})")
+        return rows
+
+    def _partitions(self, df: pd.DataFrame) -> Iterable[Tuple[str, Any]]:
+        """(relative directory, Arrow table without the partition columns) for every partition in df"""
+        columns = self._partition_columns()
+        missing = [c for c in columns if c not in df.columns]
+        if missing:
+            raise ValueError(f"partition_by columns not in the frame: {missing}")
+        if not columns:
+            yield "", to_arrow_table(df)
+            return
+        for keys, part in df.groupby(columns, dropna=False, sort=False):
+            keys = keys if isinstance(keys, tuple) else (keys,)
+            directory = os.path.join(*(f"{quote(str(c), safe='')}={_segment(k)}" for c, k in zip(columns, keys)))
+            yield directory, to_arrow_table(part.drop(columns=columns))
+
+    def _append(self, staging: str, directory: str, table: Any) -> None:
+        import pyarrow as pa
+
+        if self._schema is None:
+            self._schema = table.schema
+        elif table.schema != self._schema:
+            # e.g. a chunk whose column is all-null or came out int where the first one was float
+            table = table.cast(self._schema)
+        entry = self._open.get(directory)
+        if entry is None:
+            entry = self._open_file(staging, directory)
+        self._open.move_to_end(directory)
+        entry.pending.append(table)
+        entry.pending_rows += table.num_rows
+        row_group_size = int(self.config.get("row_group_size", 100_000))
+        if entry.pending_rows >= row_group_size:
+            merged = pa.concat_tables(entry.pending)
+            full = (merged.num_rows // row_group_size) * row_group_size
+            entry.writer.write_table(merged.slice(0, full), row_group_size=row_group_size)
+            rest = merged.slice(full)
+            entry.pending = [rest] if rest.num_rows else []
+            entry.pending_rows = rest.num_rows
+
+    def _open_file(self, staging: str, directory: str) -> _PartitionFile:
+        import pyarrow.parquet as pq
+
+        max_open = max(1, int(self.config.get("max_open_writers", 64)))
+        while len(self._open) >= max_open:
+            self._close(next(iter(self._open)))
+        os.makedirs(os.path.join(staging, directory), exist_ok=True)
+        name = os.path.join(directory, f"part-{self._run_id}-{self._seq:05d}.parquet")
+        self._seq += 1
+        compression = self.config.get("compression", "snappy")
+        writer = pq.ParquetWriter(
+            os.path.join(staging, name),
+            self._schema,
+            compression=None if compression in (None, "none") else compression,
+            use_dictionary=self.config.get("use_dictionary", True),
+        )
+        entry = self._open[directory] = _PartitionFile(writer, name)
+        return entry
+
+    def _close(self, directory: str) -> None:
+        import pyarrow as pa
+
+        entry = self._open.pop(directory)
+        if entry.pending:
+            entry.writer.write_table(
+                pa.concat_tables(entry.pending), row_group_size=int(self.config.get("row_group_size", 100_000))
+            )
+        entry.writer.close()
+        self.files.append(entry.path)
+
+    def _commit(self, staging: str, root: str, if_exists: str) -> None:
+        if if_exists == "append" and os.path.isdir(root):
+            # new file names never collide with existing ones; each rename is atomic
+            for name in self.files:
+                os.makedirs(os.path.join(root, os.path.dirname(name)), exist_ok=True)
+                os.replace(os.path.join(staging, name), os.path.join(root, name))
+            shutil.rmtree(staging, ignore_errors=True)
+            return
+        old: Optional[str] = None
+        if os.path.exists(root):
+            old = f"{staging}.old"
+            os.rename(root, old)
+        # readers may find no dataset for an instant, never a half-written one
+        os.rename(staging, root)
+        if old is not None:
+            shutil.rmtree(old, ignore_errors=True)
+
+    def _partition_columns(self) -> List[str]:
+        columns = self.config.get("partition_by") or []
+        return [columns] if isinstance(columns, str) else list(columns)
+
+    def _require(self, key: str) -> Any:
+        val = self.config.get(key)
+        if val in (None, ""):
+            raise ValueError(f"Missing required config key: {key}")
+        return val
+
+
+def _segment(value: Any) -> str:
+    if pd.isna(value):
+        return NULL_PARTITION
+    return quote(str(value), safe="")
@@ -1,19 +1,99 @@
 from __future__ import annotations
-from typing import Any, Dict, Optional
+import hashlib
+import io
+import re
+import threading
+import uuid
+from contextlib import contextmanager
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Set, Tuple
+import numpy as np
 import pandas as pd
 
 from sqlalchemy import create_engine, text
 from sqlalchemy.engine import Engine
-from sqlalchemy.dialects.postgresql import VARCHAR, INTEGER, BIGINT, NUMERIC, BOOLEAN
-from sqlalchemy.exc import SQLAlchemyError
+from sqlalchemy.dialects.postgresql import VARCHAR, INTEGER, BIGINT, NUMERIC, BOOLEAN, INET
+from sqlalchemy.exc import ProgrammingError, SQLAlchemyError
 
+from pipeline.dtypes import like, to_arrow_table
+from pipeline.process.ip_address import uint32_to_ipv4
+from pipeline.write.type_planner import TypePlan, plan_types, sql_literal
 from pipeline.write.writer import Writer
 
+# engines shared by writers configured with reuse_engine, keyed by DSN; they live as long as the process
+# (e.g. a warm Lambda container) so later writes skip engine creation and reuse pooled connections
+_ENGINES: Dict[str, Engine] = {}
+_ENGINES_LOCK = threading.Lock()
+
+# what writers configured with cache_metadata learned about their targets, keyed by (DSN, schema, table): the
+# fingerprint of the column types last written and, with the type planner, the column layout. Lets repeated
+# loads into the same table skip CREATE SCHEMA, pandas' table existence check and the planner's reflection.
+_TABLES: Dict[Tuple[str, str, str], Dict[str, Any]] = {}
+_SCHEMAS: Set[Tuple[str, str]] = set()
+_METADATA_LOCK = threading.Lock()
+
 class PostgreSQLStorage(Writer):
+    """
+    config:
+      - dsn: str (required)
+      - table: str (required)
+      - schema: str (default 'public')
+      - if_exists: str (default 'append')
+      - chunksize: int (default 10000)
+      - index: bool (default False)
+      - dtype: dict of column -> SQLAlchemy type (default: inferred)
+      - inet_columns: list of columns written as native INET; uint32 IPv4 columns
+        are formatted back to dotted text on the way out (default: none)
+      - reuse_engine: bool, take the engine from a process-wide cache and keep it open after
+        the write instead of disposing it (default False)
+      - bulk_load: "copy" creates the table as to_sql would and then streams the rows with COPY FROM STDIN,
+        rendered to CSV by Arrow straight from the column buffers (no Python objects per value; needs pyarrow
+        and a psycopg2 or psycopg 3 DSN). Default: batched multi-row INSERTs via to_sql
+      - type_planner: True, or a dict of plan_types options (booleans, real, enum_max_values, reorder), to
+        size every column from its values (SMALLINT, BOOLEAN, REAL, INET, ENUM, ...) instead of the fixed
+        mapping of _infer_types; ignored when dtype is given. The estimated bytes per row before and after
+        end up in type_report (default: off)
+      - cache_metadata: bool, remember per DSN and table which schema and table layout already exist, so later
+        appends with the same column types skip CREATE SCHEMA, reflection and DDL. The entry is dropped when a
+        write fails; a cached append that fails on a missing table or column is retried once the slow way
+        (default False)
+      - parallel: int, number of connections that load at the same time (default 1). The frame (or the chunk
+        stream) is spread over them into an UNLOGGED staging table, which is published in a single transaction:
+        readers see all of the load or none of it. With if_exists 'replace' the staging table is made LOGGED
+        and renamed into place of the target; otherwise its rows are moved into the target with one
+        INSERT ... SELECT. The default engine pool allows up to 15 connections
+      - partition_by: column (e.g. "state_abbreviation") to LIST-partition the table by; one child table
+        <table>_<value> per value, created as values show up, and rows are written straight into their child.
+        With if_exists 'replace' only the partitions of values in the load are replaced: their rows go into a
+        standalone table that is swapped in (detach and drop the old child, attach the new one) in one
+        transaction at the end; other partitions are kept, and so is the parent's column layout. An existing
+        unpartitioned table is an error, raised before anything is loaded. parallel does not apply to
+        partitioned writes (default: unpartitioned)
+      - resumable: bool, commit every chunk (for write(): every chunksize rows) in its own transaction together
+        with a row in checkpoint_table, keyed by (source_fingerprint, table, chunk_seq). A rerun with the same
+        source_fingerprint skips the chunks already committed and continues with the first missing one. Rows
+        carry the id of the run that wrote them in a _load_batch column (see rollback_batch). The processors
+        must yield the same rows for the same source. Not combinable with parallel or partition_by
+        (default False)
+      - source_fingerprint: str identifying the source and pipeline configuration (required with resumable)
+      - checkpoint_table: str (default '_pipeline_checkpoints', in the target schema)
+    """
 
     def __init__(self, name: str, config: Dict[str, Any] | None = None) -> None:
         super().__init__(name=name, config=config or {})
         self._engine: Optional[Engine] = None
+        self._dsn: Optional[str] = None
+        # the connection whose transaction spans a whole chunk stream (write_chunks); every step of the write
+        # then runs in a savepoint on it instead of a transaction of its own
+        self._conn: Optional[Any] = None
+        self._plan: Optional[TypePlan] = None
+        # planner widenings applied to the staging table of a parallel load, replayed on the target
+        self._staged_changes: List[Tuple[str, str, str]] = []
+        # id of the current resumable run, stored in the _load_batch column of every row it writes
+        self.batch_id: Optional[str] = None
+        self.skipped_chunks = 0
+        self._batch_indexed = False
+        self.type_report: Optional[Dict[str, Any]] = None
 
 
     def write(self, df: pd.DataFrame) -> int:
@@ -21,23 +101,526 @@ class PostgreSQLStorage(Writer):
         table = self._require("table")
         schema = self.config.get("schema", "public")
         if_exists = self.config.get("if_exists", "append")
-        chunksize = int(self.config.get("chunksize", 10_000))
-        include_index = bool(self.config.get("index", False))
 
         self._ensure_engine(dsn)
         self._ensure_schema(schema)
+        self._plan = None
+        try:
+            if self.config.get("resumable"):
+                rows = self._write_resumable(self._batches(df), table, schema, if_exists)
+            elif self.config.get("partition_by"):
+                rows = self._write_partitioned([df], table, schema, if_exists)
+            elif self._parallelism() > 1:
+                rows = self._write_parallel(self._slices(df), table, schema, if_exists)
+            else:
+                rows = self._write_frame(df, table, schema, if_exists)
+        finally:
+            self._dispose()
+        self.log(f"Done  writing to {schema}.{table}")
+        return rows
 
-        dtype_cfg = self.config.get("dtype")
-        dtype = dtype_cfg if isinstance(dtype_cfg, dict) else self._infer_types(df)
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> int:
+        """Stream frames into one table over a single engine: the first chunk honours if_exists
+        (so 'replace' drops the old table once), every later chunk is appended"""
+        dsn = self._require("dsn")
+        table = self._require("table")
+        schema = self.config.get("schema", "public")
+        if_exists = self.config.get("if_exists", "append")
+
+        self._ensure_engine(dsn)
+        self._ensure_schema(schema)
+        self._plan = None
+        rows = 0
+        try:
+            if self.config.get("resumable"):
+                rows = self._write_resumable(chunks, table, schema, if_exists)
+            elif self.config.get("partition_by"):
+                rows = self._write_partitioned(chunks, table, schema, if_exists)
+            elif self._parallelism() > 1:
+                rows = self._write_parallel(chunks, table, schema, if_exists)
+            else:
+                rows = self._write_stream(chunks, table, schema, if_exists)
+        finally:
+            self._dispose()
+        self.log(f"Done  writing {rows} rows to {schema}.{table}")
+        return rows
+
+    def _write_stream(self, chunks: Iterable[pd.DataFrame], table: str, schema: str, if_exists: str) -> int:
+        """All chunks in one transaction, so a failure in the middle of the stream leaves the table as it was
+        (with 'replace', the old table is only dropped when the last chunk is in)"""
+        assert self._engine is not None
+        rows = 0
+        try:
+            with self._engine.begin() as conn:
+                self._conn = conn
+                for i, chunk in enumerate(chunks):
+                    rows += self._write_frame(chunk, table, schema, if_exists if i == 0 else "append")
+        except BaseException:
+            # whatever the cache learned from the chunks was rolled back with them
+            self._forget(self._metadata_key(table, schema))
+            raise
+        finally:
+            self._conn = None
+        return rows
+
+    def _write_frame(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        schema: str,
+        if_exists: str,
+        checkpoint: Optional[Tuple[str, int, bool, bool]] = None,
+    ) -> int:
+        """checkpoint is (source fingerprint, chunk seq, replacing, last) for a resumable chunk"""
+        chunksize = int(self.config.get("chunksize", 10_000))
+        include_index = bool(self.config.get("index", False))
+
+        df, dtype = self._prepare(df, table, schema, if_exists)
+        after: Optional[Callable[[Any], None]] = None
+        if checkpoint is not None:
+            df = df.assign(_load_batch=self.batch_id)
+            dtype = {**dtype, "_load_batch": VARCHAR(32)}
+            rows = int(len(df))
+            after = lambda conn: self._record_checkpoint(conn, table, schema, *checkpoint, rows=rows)
 
         self.log(
             f"Writing {len(df)} rows x {len(df.columns)} cols to {schema}.{table} "
             f"(if_exists={if_exists}, chunksize={chunksize})"
         )
 
+        key = self._metadata_key(table, schema)
+        fingerprint = _fingerprint(df, dtype, include_index)
+        known = key is not None and if_exists == "append" and _TABLES.get(key, {}).get("fingerprint") == fingerprint
+        try:
+            try:
+                self._load(df, table, schema, if_exists, dtype, chunksize, include_index, known, after)
+            except ProgrammingError as e:
+                if not known:
+                    raise
+                # the table changed behind the cache (dropped, altered): forget it and check again
+                self.log(f"Cached metadata for {schema}.{table} is stale ({e.orig!r}); retrying with reflection")
+                self._forget(key)
+                self._load(df, table, schema, if_exists, dtype, chunksize, include_index, False, after)
+        except SQLAlchemyError as e:
+            self._forget(key)
+            self.log(f"Error: database write failed: {e}")
+            raise
+        self._remember(key, fingerprint)
+        return int(len(df))
+
+    def _prepare(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        schema: str,
+        if_exists: str,
+        stage: Optional[str] = None,
+        standalone: Sequence[str] = (),
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """The frame as it is written and its column types"""
+        df = self._prepare_inet(df)
+        dtype_cfg = self.config.get("dtype")
+        if isinstance(dtype_cfg, dict):
+            return df, dtype_cfg
+        if self.config.get("type_planner"):
+            return self._planned(df, table, schema, if_exists, stage, standalone)
+        return df, self._infer_types(df)
+
+    def _parallelism(self) -> int:
+        return max(1, int(self.config.get("parallel", 1) or 1))
+
+    def _slices(self, df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        """df cut into one contiguous slice per connection"""
+        for positions in np.array_split(np.arange(len(df)), max(1, min(self._parallelism(), len(df)))):
+            yield df.iloc[positions]
+
+    def _write_parallel(self, frames: Iterable[pd.DataFrame], table: str, schema: str, if_exists: str) -> int:
+        """Load frames over several connections at once into a staging table, then publish them in one
+        transaction. At most one frame per connection is held in flight, so a chunk stream is not read ahead."""
+        workers = self._parallelism()
+        chunksize = int(self.config.get("chunksize", 10_000))
+        include_index = bool(self.config.get("index", False))
+        stage = f"{table[:40]}__stage_{uuid.uuid4().hex[:8]}"
+        key = self._metadata_key(table, schema)
+        self._staged_changes = []
+        head: Optional[pd.DataFrame] = None
+        dtype: Dict[str, Any] = {}
+        rows = 0
+        try:
+            with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="pg-load") as pool:
+                pending: Set[Future] = set()
+                for df in frames:
+                    if include_index:
+                        df = df.reset_index()
+                    df, dtype = self._prepare(df, table, schema, if_exists, stage)
+                    if head is None:
+                        self._create_stage(df, stage, schema, dtype)
+                    head = df.head(0)
+                    while len(pending) >= workers:
+                        done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                        rows += sum(f.result() for f in done)
+                    pending.add(pool.submit(self._load_stage, df, stage, schema, dtype, chunksize))
+                    self.log(f"Loading {len(df)} rows into {schema}.{stage} ({len(pending)} connections busy)")
+                rows += sum(f.result() for f in wait(pending).done)
+            if head is not None:
+                self._publish(head, dtype, stage, table, schema, if_exists)
+        except Exception as e:
+            self._forget(key)
+            if head is not None:
+                self._drop_stage(stage, schema)
+            self.log(f"Error: parallel load into {schema}.{table} failed: {e}")
+            raise
+        if head is not None:
+            self._remember(key, _fingerprint(head, dtype, False))
+        self.log(f"Loaded {rows} rows over {workers} connections into {schema}.{table}")
+        return rows
+
+    def _create_stage(self, df: pd.DataFrame, stage: str, schema: str, dtype: Dict[str, Any]) -> None:
+        assert self._engine is not None
+        with self._engine.begin() as conn:
+            df.head(0).to_sql(
+                name=stage, con=conn, schema=schema, if_exists="fail", index=False,
+                chunksize=None, method=None, dtype=dtype,
+            )
+            # no WAL for rows that only pass through on their way into the target
+            conn.execute(text(f"ALTER TABLE {_qualify(schema, stage)} SET UNLOGGED"))
+
+    def _load_stage(self, df: pd.DataFrame, stage: str, schema: str, dtype: Dict[str, Any], chunksize: int) -> int:
+        """Runs on a pool thread, on a connection of its own"""
+        self._load(df, stage, schema, "append", dtype, chunksize, False, known=True)
+        return int(len(df))
+
+    def _publish(
+        self, head: pd.DataFrame, dtype: Dict[str, Any], stage: str, table: str, schema: str, if_exists: str
+    ) -> None:
+        """Make the staged rows the target's, atomically. replace renames the staging table into place, so the
+        rows are not copied again; otherwise the target is created if needed, widened as the stage was, and the
+        staged rows are moved into it"""
+        assert self._engine is not None
+        columns = ", ".join(f'"{c}"' for c in head.columns)
+        with self._engine.begin() as conn:
+            if if_exists == "replace":
+                # one sequential pass that makes the table crash-safe again; it runs before the drop, so the
+                # target is only locked (ACCESS EXCLUSIVE) for the drop and the rename
+                conn.execute(text(f"ALTER TABLE {_qualify(schema, stage)} SET LOGGED"))
+                conn.execute(text(f"DROP TABLE IF EXISTS {_qualify(schema, table)}"))
+                conn.execute(text(f'ALTER TABLE {_qualify(schema, stage)} RENAME TO "{table}"'))
+                return
+            head.to_sql(
+                name=table, con=conn, schema=schema, if_exists=if_exists, index=False,
+                chunksize=None, method=None, dtype=dtype,
+            )
+            if self._plan is not None and if_exists == "append":
+                for statement in self._plan.ddl(self._staged_changes):
+                    conn.execute(text(statement))
+            conn.execute(text(
+                f"INSERT INTO {_qualify(schema, table)} ({columns}) SELECT {columns} FROM {_qualify(schema, stage)}"
+            ))
+            conn.execute(text(f"DROP TABLE {_qualify(schema, stage)}"))
+
+    def _drop_stage(self, stage: str, schema: str) -> None:
+        assert self._engine is not None
+        try:
+            with self._engine.begin() as conn:
+                conn.execute(text(f"DROP TABLE IF EXISTS {_qualify(schema, stage)}"))
+        except SQLAlchemyError as e:
+            self.log(f"Error: could not drop staging table {schema}.{stage}: {e}")
+
+    def _batches(self, df: pd.DataFrame) -> Iterator[pd.DataFrame]:
+        chunksize = max(1, int(self.config.get("chunksize", 10_000)))
+        for start in range(0, len(df), chunksize):
+            yield df.iloc[start:start + chunksize]
+
+    def _write_resumable(self, frames: Iterable[pd.DataFrame], table: str, schema: str, if_exists: str) -> int:
+        """Write every frame not checkpointed by an earlier run of the same source, one transaction each"""
+        if self.config.get("partition_by") or self._parallelism() > 1:
+            raise ValueError("resumable cannot be combined with parallel or partition_by")
+        fingerprint = self._require("source_fingerprint")
+        self.batch_id = uuid.uuid4().hex
+        self.skipped_chunks = 0
+        self._batch_indexed = False
+        self._ensure_checkpoints(schema)
+        committed = self._committed_chunks(fingerprint, table, schema)
+        if committed:
+            self.log(f"Resuming {schema}.{table}: {len(committed)} chunks of this source are already committed")
+            # the run that committed them already replaced the table
+            if_exists = "append"
+        if if_exists == "append":
+            self._ensure_batch_column(table, schema)
+        rows = 0
+        first = True
+        last_written = False
+        frames = iter(frames)
+        df = next(frames, None)
+        seq = 0
+        while df is not None:
+            following = next(frames, None)
+            if seq in committed:
+                self.skipped_chunks += 1
+                last_written = False
+            else:
+                replacing = first and if_exists == "replace"
+                checkpoint = (fingerprint, seq, replacing, following is None)
+                rows += self._write_frame(df, table, schema, if_exists if first else "append", checkpoint)
+                first = False
+                last_written = True
+            df, seq = following, seq + 1
+        if committed and not last_written:
+            # the source is fully loaded, but its last chunk was committed by an earlier run
+            assert self._engine is not None
+            with self._engine.begin() as conn:
+                self._clear_checkpoints(conn, table, schema, fingerprint)
+        self.log(f"Batch {self.batch_id}: {rows} rows written, {self.skipped_chunks} chunks skipped")
+        return rows
+
+    def _checkpoint_table(self, schema: str) -> str:
+        return _qualify(schema, self.config.get("checkpoint_table", "_pipeline_checkpoints"))
+
+    def _ensure_checkpoints(self, schema: str) -> None:
+        assert self._engine is not None
+        with self._engine.begin() as conn:
+            conn.execute(text(
+                f"CREATE TABLE IF NOT EXISTS {self._checkpoint_table(schema)} ("
+                "source_fingerprint TEXT NOT NULL, target TEXT NOT NULL, chunk_seq INTEGER NOT NULL, "
+                "batch_id VARCHAR(32) NOT NULL, row_count BIGINT NOT NULL, "
+                "committed_at TIMESTAMPTZ NOT NULL DEFAULT now(), "
+                "PRIMARY KEY (source_fingerprint, target, chunk_seq))"
+            ))
+
+    def _ensure_batch_column(self, table: str, schema: str) -> None:
+        """A table loaded before without resumable has no _load_batch column to append into"""
+        assert self._engine is not None
+        with self._engine.begin() as conn:
+            conn.execute(text(
+                f'ALTER TABLE IF EXISTS {_qualify(schema, table)} ADD COLUMN IF NOT EXISTS "_load_batch" varchar(32)'
+            ))
+        # reflected metadata of the table no longer matches it
+        self._forget(self._metadata_key(table, schema))
+
+    def _committed_chunks(self, fingerprint: str, table: str, schema: str) -> Set[int]:
+        assert self._engine is not None
+        with self._engine.begin() as conn:
+            result = conn.execute(
+                text(
+                    f"SELECT chunk_seq FROM {self._checkpoint_table(schema)} "
+                    "WHERE source_fingerprint = :fingerprint AND target = :target"
+                ),
+                {"fingerprint": fingerprint, "target": table},
+            )
+            return {int(seq) for (seq,) in result}
+
+    def _record_checkpoint(
+        self, conn: Any, table: str, schema: str, fingerprint: str, seq: int, replacing: bool, last: bool, rows: int
+    ) -> None:
+        """In the transaction of chunk seq: a replace forgets every checkpoint of the table it drops, and the last
+        chunk forgets the checkpoints of its source, so a later load of the same source starts from scratch"""
+        if not self._batch_indexed:
+            # rollback_batch deletes by batch id
+            conn.execute(text(
+                f'CREATE INDEX IF NOT EXISTS "{table[:45]}__load_batch_idx" ON {_qualify(schema, table)} ("_load_batch")'
+            ))
+            self._batch_indexed = True
+        if replacing:
+            self._clear_checkpoints(conn, table, schema)
+        if last:
+            self._clear_checkpoints(conn, table, schema, fingerprint)
+            return
+        conn.execute(
+            text(
+                f"INSERT INTO {self._checkpoint_table(schema)} "
+                "(source_fingerprint, target, chunk_seq, batch_id, row_count) "
+                "VALUES (:fingerprint, :target, :seq, :batch, :rows)"
+            ),
+            {"fingerprint": fingerprint, "target": table, "seq": seq, "batch": self.batch_id, "rows": rows},
+        )
+
+    def _clear_checkpoints(self, conn: Any, table: str, schema: str, fingerprint: Optional[str] = None) -> None:
+        if fingerprint is None:
+            conn.execute(text(f"DELETE FROM {self._checkpoint_table(schema)} WHERE target = :target"), {"target": table})
+            return
+        conn.execute(
+            text(
+                f"DELETE FROM {self._checkpoint_table(schema)} "
+                "WHERE source_fingerprint = :fingerprint AND target = :target"
+            ),
+            {"fingerprint": fingerprint, "target": table},
+        )
+
+    def rollback_batch(self, batch_id: str) -> int:
+        """Delete every row a resumable run wrote, and its checkpoints, so the next run loads those chunks
+        again. Returns the number of rows deleted."""
+        dsn = self._require("dsn")
+        table = self._require("table")
+        schema = self.config.get("schema", "public")
+        self._ensure_engine(dsn)
         try:
             assert self._engine is not None
             with self._engine.begin() as conn:
+                result = conn.execute(
+                    text(f'DELETE FROM {_qualify(schema, table)} WHERE "_load_batch" = :batch'), {"batch": batch_id}
+                )
+                conn.execute(
+                    text(f"DELETE FROM {self._checkpoint_table(schema)} WHERE batch_id = :batch AND target = :target"),
+                    {"batch": batch_id, "target": table},
+                )
+        finally:
+            self._dispose()
+        self.log(f"Rolled back batch {batch_id}: {result.rowcount} rows deleted from {schema}.{table}")
+        return int(result.rowcount)
+
+    def _write_partitioned(self, frames: Iterable[pd.DataFrame], table: str, schema: str, if_exists: str) -> int:
+        """Write every frame's rows partition by partition, each chunk in one transaction"""
+        column = self.config["partition_by"]
+        chunksize = int(self.config.get("chunksize", 10_000))
+        include_index = bool(self.config.get("index", False))
+        # partition value -> standalone table collecting its new rows (replace), child tables known to exist (append)
+        swaps: Dict[Any, str] = {}
+        children: Set[str] = set()
+        rows = 0
+        assert self._engine is not None
+        self._check_parent(table, schema)
+        try:
+            for i, df in enumerate(frames):
+                if include_index:
+                    df = df.reset_index()
+                # widenings of later chunks also go to the standalone tables, which are copies of the parent
+                df, dtype = self._prepare(
+                    df, table, schema, if_exists if i == 0 else "append", standalone=list(swaps.values())
+                )
+                if column not in df.columns:
+                    raise ValueError(f"partition_by column '{column}' is not in the frame")
+                if i == 0:
+                    self._create_parent(df, dtype, table, schema, if_exists, column)
+                with self._engine.begin() as conn:
+                    for value, part in df.groupby(column, dropna=False, sort=True):
+                        value = None if pd.isna(value) else value
+                        if if_exists == "replace":
+                            target = swaps.get(value)
+                            if target is None:
+                                target = swaps[value] = self._partition_name(table, value, suffix=uuid.uuid4().hex[:6])
+                                conn.execute(text(
+                                    f"CREATE TABLE {_qualify(schema, target)} "
+                                    f"(LIKE {_qualify(schema, table)} INCLUDING DEFAULTS)"
+                                ))
+                        else:
+                            target = self._partition_name(table, value)
+                            if target not in children:
+                                conn.execute(text(
+                                    f"CREATE TABLE IF NOT EXISTS {_qualify(schema, target)} PARTITION OF "
+                                    f"{_qualify(schema, table)} FOR VALUES IN ({sql_literal(value)})"
+                                ))
+                                children.add(target)
+                        if self.config.get("bulk_load") == "copy":
+                            self._copy_frame(conn, part, target, schema, "append", dtype, chunksize, False, create=False)
+                        else:
+                            self._insert(conn, part, target, schema, dtype, chunksize, False)
+                rows += int(len(df))
+                self.log(f"Wrote {len(df)} rows into partitions of {schema}.{table} by {column}")
+            if swaps:
+                self._swap_partitions(swaps, table, schema, column)
+        except Exception:
+            if swaps:
+                with self._engine.begin() as conn:
+                    for standalone in swaps.values():
+                        conn.execute(text(f"DROP TABLE IF EXISTS {_qualify(schema, standalone)}"))
+            raise
+        return rows
+
+    def _check_parent(self, table: str, schema: str) -> None:
+        """Fail before loading anything when the table exists but is not partitioned: neither its partitions
+        nor a swap of them can be created"""
+        assert self._engine is not None
+        with self._engine.begin() as conn:
+            kind = conn.execute(
+                text(
+                    "SELECT c.relkind FROM pg_class AS c JOIN pg_namespace AS n ON n.oid = c.relnamespace "
+                    "WHERE n.nspname = COALESCE(NULLIF(:schema, ''), current_schema()) AND c.relname = :table"
+                ),
+                {"schema": schema or "", "table": table},
+            ).scalar()
+        if kind is not None and kind != "p":
+            raise ValueError(
+                f"{schema}.{table} exists and is not partitioned; drop it (or load it without partition_by) "
+                f"before a partitioned load"
+            )
+
+    def _create_parent(
+        self, df: pd.DataFrame, dtype: Dict[str, Any], table: str, schema: str, if_exists: str, column: str
+    ) -> None:
+        """CREATE TABLE ... PARTITION BY LIST (column), unless the table exists ('fail' makes that an error)"""
+        from sqlalchemy import Column, MetaData, Table
+        from sqlalchemy.dialects import postgresql
+        from sqlalchemy.schema import CreateTable
+
+        types = {**self._infer_types(df), **dtype}
+        parent = Table(
+            table, MetaData(), *[Column(str(c), types[c]) for c in df.columns],
+            schema=schema or None, postgresql_partition_by=f'LIST ("{column}")',
+        )
+        ddl = CreateTable(parent, if_not_exists=if_exists != "fail").compile(dialect=postgresql.dialect())
+        assert self._engine is not None
+        with self._engine.begin() as conn:
+            conn.execute(text(str(ddl)))
+
+    def _swap_partitions(self, swaps: Dict[Any, str], table: str, schema: str, column: str) -> None:
+        """Replace the child of every value with its standalone table, all in one transaction"""
+        parent = _qualify(schema, table)
+        assert self._engine is not None
+        with self._engine.begin() as conn:
+            for value, standalone in swaps.items():
+                name = self._partition_name(table, value)
+                child = _qualify(schema, name)
+                literal = sql_literal(value)
+                bound = f'"{column}" IS NULL' if value is None else f'"{column}" IS NOT NULL AND "{column}" = {literal}'
+                # a constraint that matches the partition bound lets ATTACH skip its validation scan
+                conn.execute(text(
+                    f'ALTER TABLE {_qualify(schema, standalone)} ADD CONSTRAINT "{name[:56]}_bound" CHECK ({bound})'
+                ))
+                conn.execute(text(
+                    f"DO $$ BEGIN IF to_regclass('{child}') IS NOT NULL THEN "
+                    f"ALTER TABLE {parent} DETACH PARTITION {child}; DROP TABLE {child}; END IF; END $$"
+                ))
+                conn.execute(text(f'ALTER TABLE {_qualify(schema, standalone)} RENAME TO "{name}"'))
+                conn.execute(text(f"ALTER TABLE {parent} ATTACH PARTITION {child} FOR VALUES IN ({literal})"))
+        self.log(f"Swapped {len(swaps)} partitions of {schema}.{table}")
+
+    @staticmethod
+    def _partition_name(table: str, value: Any, suffix: str = "") -> str:
+        slug = "null" if value is None else re.sub(r"\W+", "_", str(value).lower()).strip("_")[:32] or "blank"
+        # values with the same slug ("New York", "new-york") get different children from the raw value's hash
+        digest = hashlib.sha1(b"\0" if value is None else str(value).encode()).hexdigest()[:6]
+        tail = f"_{slug}_{digest}" + (f"__new_{suffix}" if suffix else "")
+        return table[: 63 - len(tail)] + tail
+
+    def _remember(self, key: Optional[Tuple[str, str, str]], fingerprint: str) -> None:
+        if key is None:
+            return
+        with _METADATA_LOCK:
+            _TABLES[key] = {
+                "fingerprint": fingerprint,
+                "columns": self._plan.columns() if self._plan is not None else None,
+            }
+
+    def _load(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        schema: str,
+        if_exists: str,
+        dtype: Dict[str, Any],
+        chunksize: int,
+        include_index: bool,
+        known: bool,
+        after: Optional[Callable[[Any], None]] = None,
+    ) -> None:
+        """Write df in one transaction; known means the table exists with exactly these column types, after(conn)
+        runs in the same transaction once the rows are in"""
+        with self._begin() as conn:
+            if self.config.get("bulk_load") == "copy":
+                self._copy_frame(conn, df, table, schema, if_exists, dtype, chunksize, include_index, create=not known)
+            elif known:
+                self._insert(conn, df, table, schema, dtype, chunksize, include_index)
+            else:
                 df.to_sql(
                     name=table,
                     con=conn,
@@ -48,15 +631,167 @@ class PostgreSQLStorage(Writer):
                     method="multi",
                     dtype=dtype,
                 )
-        except SQLAlchemyError as e:
-            self.log(f"Error: database write failed: {e}")
-            raise
-        finally:
-            self._dispose()
-        self.log(f"Done  writing to {schema}.{table}")
-        return int(len(df))
+            if after is not None:
+                after(conn)
+
+    @contextmanager
+    def _begin(self) -> Iterator[Any]:
+        """A transaction for one step of a write; a savepoint when the step is part of a streamed write, so a
+        failed step (e.g. a stale cached append that is retried) does not abort the whole stream"""
+        if self._conn is not None:
+            with self._conn.begin_nested():
+                yield self._conn
+            return
+        assert self._engine is not None
+        with self._engine.begin() as conn:
+            yield conn
+
+    def _insert(
+        self,
+        conn: Any,
+        df: pd.DataFrame,
+        table: str,
+        schema: str,
+        dtype: Dict[str, Any],
+        chunksize: int,
+        include_index: bool,
+    ) -> None:
+        """The multi-row INSERTs of to_sql without its table existence check and CREATE TABLE step"""
+        from pandas.io.sql import SQLDatabase, SQLTable
+
+        target = SQLTable(
+            table, SQLDatabase(conn, schema=schema or None), frame=df, index=include_index,
+            if_exists="append", schema=schema or None, dtype=dtype,
+        )
+        target.insert(chunksize=chunksize, method="multi")
+
+    def _copy_frame(
+        self,
+        conn: Any,
+        df: pd.DataFrame,
+        table: str,
+        schema: str,
+        if_exists: str,
+        dtype: Dict[str, Any],
+        chunksize: int,
+        include_index: bool,
+        create: bool = True,
+    ) -> None:
+        import pyarrow.csv as pa_csv
+
+        if include_index:
+            df = df.reset_index()
+        if create:
+            # the empty frame only creates (or replaces) the table with the mapped column types
+            df.head(0).to_sql(
+                name=table, con=conn, schema=schema, if_exists=if_exists, index=False,
+                chunksize=chunksize, method=None, dtype=dtype,
+            )
+        target = _qualify(schema, table)
+        columns = ", ".join(f'"{c}"' for c in df.columns)
+        sql = f"COPY {target} ({columns}) FROM STDIN WITH (FORMAT csv)"
+        options = pa_csv.WriteOptions(include_header=False)
+        cursor = conn.connection.cursor()
+        # nulls are written as unquoted empty fields, which COPY reads as NULL; empty strings stay quoted
+        for batch in to_arrow_table(df).to_batches(max_chunksize=chunksize):
+            payload = io.BytesIO()
+            pa_csv.write_csv(batch, payload, options)
+            payload.seek(0)
+            if hasattr(cursor, "copy_expert"):  # psycopg2
+                cursor.copy_expert(sql, payload)
+            else:  # psycopg 3
+                with cursor.copy(sql) as copy:
+                    copy.write(payload.getvalue())
+
+    def _planned(
+        self,
+        df: pd.DataFrame,
+        table: str,
+        schema: str,
+        if_exists: str,
+        stage: Optional[str] = None,
+        standalone: Sequence[str] = (),
+    ) -> Tuple[pd.DataFrame, Dict[str, Any]]:
+        """Plan compact types on the first frame of a write and widen the plan for later chunks; the DDL this
+        needs (enum types, ALTER TABLE) runs in its own transaction before the rows are written. Widenings of a
+        parallel load (including those an append needs on its first frame) go to its staging table and are
+        replayed on the target when it is published; those of a partitioned replace also go to the standalone
+        tables (standalone) waiting to be swapped in."""
+        cached: Dict[str, Any] = {}
+        alter_table: Optional[str] = None
+        deferred = False
+        if self._plan is None:
+            options = self.config["type_planner"] if isinstance(self.config["type_planner"], dict) else {}
+            self._plan = plan_types(
+                df, table, schema, baseline=self._infer_types(df),
+                inet_columns=self.config.get("inet_columns") or (), **options,
+            )
+            report = self.type_report = self._plan.report
+            self.log(
+                f"Type plan for {schema}.{table}: ~{report['bytes_per_row_after']} bytes/row instead of "
+                f"~{report['bytes_per_row_before']} ({report['bytes_saved_per_row']} saved, "
+                f"padding {report['padding_before']} -> {report['padding_after']})"
+            )
+            changes = []
+            if if_exists == "append":
+                cached = _TABLES.get(self._metadata_key(table, schema) or ("", "", ""), {})
+                existing = cached.get("columns")
+                changes = self._plan.adopt(existing if existing is not None else self._existing_columns(table, schema))
+                if stage is not None:
+                    # the stage is created with the widened types; the target is only altered on publish, so a
+                    # failed load leaves it as it was
+                    self._staged_changes.extend(changes)
+                    deferred = True
+        else:
+            changes = self._plan.extend(df)
+            if stage is not None:
+                self._staged_changes.extend(changes)
+                alter_table = stage
+        for col, old, new in changes:
+            self.log(f"Widening {schema}.{table}.{col}: {old} -> {new}")
+        statements = self._plan.ddl([] if deferred else changes, table=alter_table)
+        for name in standalone:
+            statements += self._plan.ddl(changes, table=name)
+        planned, dtype = self._plan.apply(df), self._plan.dtype
+        # the same layout as the cached one: enum types and values already exist
+        unchanged = not changes and cached.get("fingerprint") == _fingerprint(
+            planned, dtype, bool(self.config.get("index", False))
+        )
+        if statements and not unchanged:
+            with self._begin() as conn:
+                for statement in statements:
+                    conn.execute(text(statement))
+        return planned, dtype
+
+    def _existing_columns(self, table: str, schema: str) -> Dict[str, Any]:
+        """{column: (data_type, udt_name)} of the target table, empty if it does not exist yet"""
+        with self._begin() as conn:
+            rows = conn.execute(
+                text(
+                    "SELECT column_name, data_type, udt_name FROM information_schema.columns "
+                    "WHERE table_schema = COALESCE(NULLIF(:schema, ''), current_schema()) AND table_name = :table"
+                ),
+                {"schema": schema or "", "table": table},
+            )
+            return {name: (data_type, udt_name) for name, data_type, udt_name in rows}
+
+    def _metadata_key(self, table: str, schema: str) -> Optional[Tuple[str, str, str]]:
+        if not self.config.get("cache_metadata") or self._dsn is None:
+            return None
+        return (self._dsn, schema or "", table)
+
+    def _forget(self, key: Optional[Tuple[str, str, str]]) -> None:
+        if key is None:
+            return
+        with _METADATA_LOCK:
+            _TABLES.pop(key, None)
+            _SCHEMAS.discard(key[:2])
 
     def _ensure_engine(self, dsn: str) -> None:
+        self._dsn = dsn
+        if self._engine is None and self.config.get("reuse_engine"):
+            with _ENGINES_LOCK:
+                self._engine = _ENGINES.get(dsn)
         if self._engine is None:
             # Mask password in logs
             masked = dsn
@@ -71,8 +806,15 @@ class PostgreSQLStorage(Writer):
                 pass
             self.log(f"Connecting via DSN: {masked}")
             self._engine = create_engine(dsn, pool_pre_ping=True)
+            if self.config.get("reuse_engine"):
+                with _ENGINES_LOCK:
+                    self._engine = _ENGINES.setdefault(dsn, self._engine)
 
     def _dispose(self) -> None:
+        if self.config.get("reuse_engine"):
+            # cached engines stay open for the next write; just drop this writer's handle
+            self._engine = None
+            return
         if self._engine is not None:
             self._engine.dispose()
             self._engine = None
@@ -82,9 +824,15 @@ class PostgreSQLStorage(Writer):
         if not schema:
             return
         assert self._engine is not None
+        cached = self.config.get("cache_metadata") and (self._dsn, schema) in _SCHEMAS
+        if cached:
+            return
         self.log(f"Ensuring schema exists: {schema}")
         with self._engine.begin() as conn:
             conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{schema}"'))
+        if self.config.get("cache_metadata"):
+            with _METADATA_LOCK:
+                _SCHEMAS.add((self._dsn or "", schema))
 
     def _infer_types(self, df: pd.DataFrame) -> Dict[str, Any]:
         """
@@ -103,10 +851,34 @@ class PostgreSQLStorage(Writer):
             else:
                 # default to text; if you know max lengths, set VARCHAR(n)
                 mapping[col] = VARCHAR()
+        for col in self.config.get("inet_columns") or []:
+            if col in mapping:
+                mapping[col] = INET()
         return mapping
 
+    def _prepare_inet(self, df: pd.DataFrame) -> pd.DataFrame:
+        """Packed IPv4 columns listed in inet_columns go out as dotted text, Postgres parses them into INET.
+        Works on a shallow copy so the caller's frame keeps its compact uint32 column."""
+        packed = [
+            col for col in self.config.get("inet_columns") or []
+            if col in df.columns and pd.api.types.is_integer_dtype(df[col].dtype)
+        ]
+        if not packed:
+            return df
+        return df.assign(**{col: like(uint32_to_ipv4(df[col]), df) for col in packed})
+
     def _require(self, key: str) -> Any:
         val = self.config.get(key)
         if val in (None, ""):
             raise ValueError(f"Missing required config key: {key}")
-        return val
\ No newline at end of file
+        return val
+
+
+def _qualify(schema: str, name: str) -> str:
+    return f'"{schema}"."{name}"' if schema else f'"{name}"'
+
+
+def _fingerprint(df: pd.DataFrame, dtype: Dict[str, Any], include_index: bool) -> str:
+    """Digest of the columns a write creates: names in order with their SQL types (enum values included)"""
+    layout = [(str(col), repr(dtype.get(col))) for col in df.columns]
+    return hashlib.sha1(repr((layout, include_index)).encode()).hexdigest()
@@ -0,0 +1,182 @@
+from __future__ import annotations
+import os
+import sqlite3
+from typing import Any, Dict, Iterable, List, Optional
+import pandas as pd
+
+from pipeline.dtypes import like
+from pipeline.process.ip_address import uint32_to_ipv4
+from pipeline.write.writer import Writer
+
+"""Local single-file sink: the processed output in a SQLite database, for tests, benchmarks and laptop-scale
+analysis without a Postgres server. Rows are bound with executemany (no SQL text per row) inside one transaction
+per write, on a connection whose pragmas trade durability for load speed; a crash mid-load rolls the file back
+to where it was, a power cut may not."""
+
+# per-connection settings for a bulk load: no fsync per commit, temp b-trees in memory and a 64 MiB page cache.
+# The rollback journal stays a file (SQLite's default): an in-memory journal is lost with the process and can
+# leave a half-written database behind, while a file journal of a load that mostly appends holds few pages
+# (pages past the old end of the file are not journaled). Overridable through the pragmas config.
+LOAD_PRAGMAS: Dict[str, Any] = {
+    "journal_mode": "DELETE",
+    "synchronous": "OFF",
+    "temp_store": "MEMORY",
+    "cache_size": -65536,
+}
+
+
+class SQLiteStorage(Writer):
+    """
+    config:
+      - path: str, database file, created if missing (required unless dsn is given)
+      - dsn: "sqlite:///<path>" as an alternative to path, so a PostgreSQLStorage config can be pointed at a
+        local file by swapping the DSN
+      - table: str (required)
+      - schema: ignored, a SQLite file has a single schema; accepted so Postgres configs can be reused
+      - if_exists: str (default 'append'), 'replace' or 'fail' as with PostgreSQLStorage
+      - chunksize: int, rows bound per executemany call (default 10000)
+      - index: bool (default False)
+      - dtype: dict of column -> SQL type, a string ("INTEGER", "TEXT", ...) or a SQLAlchemy type; columns
+        not listed are inferred (INTEGER / REAL / TEXT)
+      - inet_columns: list of uint32 IPv4 columns written as dotted text (SQLite has no INET type)
+      - pragmas: dict of PRAGMA name -> value applied to the load connection, on top of LOAD_PRAGMAS
+    """
+
+    def __init__(self, name: str, config: Dict[str, Any] | None = None) -> None:
+        super().__init__(name=name, config=config or {})
+
+    def write(self, df: pd.DataFrame) -> int:
+        return self.write_chunks([df])
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> int:
+        """All chunks go into the table in one transaction; the first one honours if_exists (so 'replace'
+        drops the old table once), every later chunk is appended"""
+        path = self._path()
+        table = self._require("table")
+        if_exists = self.config.get("if_exists", "append")
+        if if_exists not in ("append", "replace", "fail"):
+            raise ValueError(f"Unknown if_exists '{if_exists}'")
+
+        conn = self._connect(path)
+        rows = 0
+        try:
+            conn.execute("BEGIN")
+            columns: Optional[List[str]] = None
+            for chunk in chunks:
+                df = self._prepare(chunk)
+                if columns is None:
+                    columns = list(df.columns)
+                    self.log(
+                        f"Writing {len(df.columns)} cols to {path}:{table} "
+                        f"(if_exists={if_exists}, chunksize={self.config.get('chunksize', 10_000)})"
+                    )
+                    self._create(conn, table, df, if_exists)
+                rows += self._insert(conn, table, df)
+            conn.execute("COMMIT")
+        except sqlite3.Error as e:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            self.log(f"Error: database write failed: {e}")
+            raise
+        except BaseException:
+            if conn.in_transaction:
+                conn.execute("ROLLBACK")
+            raise
+        finally:
+            conn.close()
+        self.log(f"Done  writing {rows} rows to {path}:{table}")
+        return rows
+
+    def _connect(self, path: str) -> sqlite3.Connection:
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        # autocommit mode: transactions are opened and closed explicitly, DDL included
+        conn = sqlite3.connect(path, isolation_level=None)
+        for name, value in {**LOAD_PRAGMAS, **(self.config.get("pragmas") or {})}.items():
+            conn.execute(f"PRAGMA {name} = {value}")
+        return conn
+
+    def _prepare(self, df: pd.DataFrame) -> pd.DataFrame:
+        """The frame as it is written: index as columns if configured, packed IPv4 columns as dotted text"""
+        if self.config.get("index", False):
+            df = df.reset_index()
+        packed = [
+            col for col in self.config.get("inet_columns") or []
+            if col in df.columns and pd.api.types.is_integer_dtype(df[col].dtype)
+        ]
+        if packed:
+            df = df.assign(**{col: like(uint32_to_ipv4(df[col]), df) for col in packed})
+        return df
+
+    def _create(self, conn: sqlite3.Connection, table: str, df: pd.DataFrame, if_exists: str) -> None:
+        exists = conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = ?", (table,)
+        ).fetchone() is not None
+        if exists and if_exists == "fail":
+            raise ValueError(f"Table '{table}' already exists.")
+        if exists and if_exists == "append":
+            return
+        if exists:
+            conn.execute(f"DROP TABLE {_quote(table)}")
+        types = self._column_types(df)
+        columns = ", ".join(f"{_quote(str(col))} {types[col]}" for col in df.columns)
+        conn.execute(f"CREATE TABLE {_quote(table)} ({columns})")
+
+    def _insert(self, conn: sqlite3.Connection, table: str, df: pd.DataFrame) -> int:
+        if df.empty:
+            return 0
+        chunksize = max(1, int(self.config.get("chunksize", 10_000)))
+        columns = ", ".join(_quote(str(col)) for col in df.columns)
+        marks = ", ".join("?" for _ in df.columns)
+        sql = f"INSERT INTO {_quote(table)} ({columns}) VALUES ({marks})"
+        for start in range(0, len(df), chunksize):
+            part = df.iloc[start:start + chunksize]
+            conn.executemany(sql, zip(*(_values(part[col]) for col in part.columns)))
+        return int(len(df))
+
+    def _column_types(self, df: pd.DataFrame) -> Dict[Any, str]:
+        """Column -> declared SQLite type; SQLite stores by value, the declaration only sets the affinity"""
+        mapping: Dict[Any, str] = {}
+        for col, dtype in df.dtypes.items():
+            if pd.api.types.is_bool_dtype(dtype) or pd.api.types.is_integer_dtype(dtype):
+                mapping[col] = "INTEGER"
+            elif pd.api.types.is_float_dtype(dtype):
+                mapping[col] = "REAL"
+            else:
+                mapping[col] = "TEXT"
+        dtype_cfg = self.config.get("dtype")
+        if isinstance(dtype_cfg, dict):
+            from sqlalchemy.dialects import sqlite
+
+            for col, type_ in dtype_cfg.items():
+                if col in mapping:
+                    mapping[col] = type_ if isinstance(type_, str) else type_.compile(dialect=sqlite.dialect())
+        return mapping
+
+    def _path(self) -> str:
+        path = self.config.get("path")
+        if path in (None, ""):
+            dsn = self.config.get("dsn") or ""
+            if not dsn.startswith("sqlite:///"):
+                raise ValueError("Missing required config key: path (or a sqlite:/// dsn)")
+            path = dsn[len("sqlite:///"):]
+        return str(path)
+
+    def _require(self, key: str) -> Any:
+        val = self.config.get(key)
+        if val in (None, ""):
+            raise ValueError(f"Missing required config key: {key}")
+        return val
+
+
+def _values(values: pd.Series) -> List[Any]:
+    """Column as Python objects sqlite3 can bind: ints, floats, bools and str, missing values (NaN, NA, NaT,
+    None) as None, timestamps as ISO text"""
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        values = values.map(lambda v: v.isoformat(sep=" "), na_action="ignore")
+    objects = values.astype(object)
+    return objects.where(values.notna(), None).tolist()
+
+
+def _quote(name: str) -> str:
+    return '"' + name.replace('"', '""') + '"'
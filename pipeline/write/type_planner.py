@@ -0,0 +1,414 @@
+from __future__ import annotations
+import ipaddress
+import math
+import re
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import numpy as np
+import pandas as pd
+
+from sqlalchemy.dialects.postgresql import (
+    BIGINT, BOOLEAN, DOUBLE_PRECISION, ENUM, INET, INTEGER, NUMERIC, REAL, SMALLINT, VARCHAR,
+)
+
+from pipeline.dtypes import as_text, float_values
+
+"""Compact PostgreSQL column types for PostgreSQLStorage (config type_planner). Instead of the fixed mapping of
+_infer_types (BIGINT, NUMERIC(38,10), VARCHAR), every column gets the narrowest type that holds its values exactly:
+0/1 flags become BOOLEAN, integers SMALLINT/INTEGER/BIGINT by range, floats REAL when every value survives the
+round trip through float32 and DOUBLE PRECISION otherwise, IP address text INET, and low-cardinality text an ENUM.
+Columns are reordered widest alignment first so the fixed-width ones pack without padding, and the plan reports
+the estimated bytes per row before and after.
+
+Types are chosen from the values of one frame. Later chunks of the same load (and existing tables appended to)
+only ever widen a column, through ALTER TABLE / ALTER TYPE ... ADD VALUE, never narrow it."""
+
+INT_LADDER = ("flag", "smallint", "integer", "bigint")
+FLOAT_LADDER = ("real", "double")
+TEXT_KINDS = ("enum", "inet", "text")
+
+_TYPES = {
+    "boolean": BOOLEAN, "flag": BOOLEAN, "smallint": SMALLINT, "integer": INTEGER, "bigint": BIGINT,
+    "real": REAL, "double": DOUBLE_PRECISION, "inet": INET, "text": VARCHAR,
+}
+_DDL = {
+    "boolean": "BOOLEAN", "flag": "BOOLEAN", "smallint": "SMALLINT", "integer": "INTEGER", "bigint": "BIGINT",
+    "real": "REAL", "double": "DOUBLE PRECISION", "inet": "INET", "text": "VARCHAR",
+}
+# on-disk width and alignment of the fixed-width types; everything else is a (short, unaligned) varlena
+_FIXED = {
+    "boolean": (1, 1), "flag": (1, 1), "smallint": (2, 2), "integer": (4, 4), "enum": (4, 4),
+    "bigint": (8, 8), "real": (4, 4), "double": (8, 8),
+}
+# information_schema.columns.data_type -> kind, for tables that already exist
+_EXISTING = {
+    "boolean": "boolean", "smallint": "smallint", "integer": "integer", "bigint": "bigint", "real": "real",
+    "double precision": "double", "numeric": "numeric", "inet": "inet", "character varying": "text", "text": "text",
+}
+# kind -> (information_schema data_type, udt_name) of the column it creates
+_CREATED = {
+    "boolean": ("boolean", "bool"), "flag": ("boolean", "bool"), "smallint": ("smallint", "int2"),
+    "integer": ("integer", "int4"), "bigint": ("bigint", "int8"), "real": ("real", "float4"),
+    "double": ("double precision", "float8"), "numeric": ("numeric", "numeric"), "inet": ("inet", "inet"),
+    "text": ("character varying", "varchar"),
+}
+# rows sampled for the width estimates of variable-width columns
+_SAMPLE_ROWS = 10_000
+# distinct IPv6-shaped values parsed with ipaddress before a column is planned as INET
+_INET_SAMPLE = 1_000
+# characters of an IPv4/IPv6 address; a value with anything else (most text) rules the column out at once
+_ADDRESS_SHAPE = r"[0-9A-Fa-f:.]{2,45}"
+_IPV4 = r"^(\d{1,3})\.(\d{1,3})\.(\d{1,3})\.(\d{1,3})$"
+
+
+def enum_name(table: str, column: str) -> str:
+    return re.sub(r"\W+", "_", f"{table}_{column}".lower())[:63]
+
+
+def column_kind(
+    values: pd.Series,
+    inet: bool = False,
+    booleans: bool = True,
+    real: bool = True,
+    enum_max_values: int = 0,
+) -> Tuple[str, Optional[List[str]]]:
+    """(kind, enum values) of the narrowest type that holds every value of the column"""
+    dtype = values.dtype
+    if inet:
+        return "inet", None
+    if pd.api.types.is_bool_dtype(dtype):
+        return "boolean", None
+    if pd.api.types.is_integer_dtype(dtype):
+        present = values.dropna()
+        if present.empty:
+            return ("flag" if booleans else "smallint"), None
+        lo, hi = int(present.min()), int(present.max())
+        if booleans and lo >= 0 and hi <= 1:
+            return "flag", None
+        if -2**15 <= lo and hi < 2**15:
+            return "smallint", None
+        if -2**31 <= lo and hi < 2**31:
+            return "integer", None
+        return "bigint", None
+    if pd.api.types.is_float_dtype(dtype):
+        x = float_values(values)
+        x = x[~np.isnan(x)]
+        with np.errstate(over="ignore"):
+            exact = np.array_equal(x.astype(np.float32).astype(np.float64), x)
+        return ("real" if real and exact else "double"), None
+    present = values.dropna()
+    if pd.api.types.is_string_dtype(present):
+        uniques = [str(u) for u in present.unique()]
+        if uniques and _all_addresses(pd.Series(uniques, dtype="string")):
+            return "inet", None
+        if enum_max_values and 0 < len(uniques) <= enum_max_values:
+            return "enum", sorted(uniques)
+    return "text", None
+
+
+def _all_addresses(uniques: pd.Series) -> bool:
+    """Whether every distinct value is an IP address. Screened with vectorised regexes as in ip_address.py, so a
+    text column costs one pass over its distinct values; dotted quads are checked in full, IPv6 on a sample"""
+    if not uniques.str.fullmatch(_ADDRESS_SHAPE).all():
+        return False
+    octets = uniques.str.extract(_IPV4)
+    v4 = octets.notna().all(axis=1).to_numpy()
+    if (octets[v4].astype("int64") > 255).any(axis=None):
+        return False
+    v6 = uniques[~v4]
+    if not v6.str.contains(":", regex=False).all():
+        return False
+    return all(_is_ip(u) for u in v6.head(_INET_SAMPLE))
+
+
+def _is_ip(value: str) -> bool:
+    try:
+        ipaddress.ip_address(value)
+    except ValueError:
+        return False
+    return True
+
+
+def kind_of(sqltype: Any) -> str:
+    """Kind of a SQLAlchemy type from _infer_types, for the before side of the report"""
+    for kind, cls in (("boolean", BOOLEAN), ("smallint", SMALLINT), ("integer", INTEGER), ("bigint", BIGINT),
+                      ("real", REAL), ("double", DOUBLE_PRECISION), ("numeric", NUMERIC), ("inet", INET)):
+        if isinstance(sqltype, cls):
+            return kind
+    return "text"
+
+
+def join(a: str, b: str) -> Optional[str]:
+    """Narrowest kind that holds the values of both, None if there is no such kind"""
+    if a == b:
+        return a
+    numeric = INT_LADDER + FLOAT_LADDER
+    if "numeric" in (a, b) and {a, b} <= {"numeric", *numeric}:
+        return "numeric"
+    for ladder in (INT_LADDER, FLOAT_LADDER):
+        if a in ladder and b in ladder:
+            return max(a, b, key=ladder.index)
+    if a in numeric and b in numeric:
+        return "double"
+    if a in TEXT_KINDS and b in TEXT_KINDS:
+        return "text"
+    return None
+
+
+def value_width(kind: str, values: pd.Series) -> int:
+    """Estimated average on-disk bytes of one non-null value"""
+    if kind in _FIXED:
+        return _FIXED[kind][0]
+    sample = values.dropna().head(_SAMPLE_ROWS)
+    if sample.empty:
+        return 1
+    if kind == "inet":
+        # 1 byte varlena header, family, netmask bits, 4 or 16 address bytes
+        return 3 + (16 if as_text(sample).str.contains(":", regex=False).any() else 4)
+    if kind == "numeric":
+        return math.ceil(float(np.mean([_numeric_width(v) for v in float_values(sample)])))
+    return 1 + math.ceil(float(as_text(sample).str.len().mean()))
+
+
+def _numeric_width(value: float) -> int:
+    """Bytes of one NUMERIC(38,10) value: short header, 2-byte numeric header, one 2-byte word per 4 digits"""
+    if not math.isfinite(value):
+        return 3
+    whole, _, frac = f"{abs(value):.10f}".partition(".")
+    whole, frac = whole.lstrip("0"), frac.rstrip("0")
+    return 3 + 2 * (math.ceil(len(whole) / 4) + math.ceil(len(frac) / 4))
+
+
+def layout(columns: Iterable[Tuple[str, int]]) -> Tuple[int, int]:
+    """(data bytes, alignment padding bytes) of a row whose columns have these (kind, width)"""
+    offset = padding = 0
+    for kind, width in columns:
+        if kind in _FIXED:
+            pad = -offset % _FIXED[kind][1]
+            padding += pad
+            offset += pad
+        offset += width
+    return offset, padding
+
+
+def alignment(kind: str) -> int:
+    return _FIXED[kind][1] if kind in _FIXED else 0
+
+
+class TypePlan:
+    """Column kinds of one target table, the SQLAlchemy dtype mapping for to_sql, and the DDL that keeps an
+    existing table (or enum type) in step with them"""
+
+    def __init__(self, table: str, schema: Optional[str], options: Dict[str, Any]) -> None:
+        self.table = table
+        self.schema = schema or None
+        self.options = options
+        self.kinds: Dict[str, str] = {}
+        self.enum_values: Dict[str, List[str]] = {}
+        self.order: List[str] = []
+        self.report: Dict[str, Any] = {}
+        self._declared: Dict[str, set] = {}
+
+    @property
+    def dtype(self) -> Dict[str, Any]:
+        mapping: Dict[str, Any] = {}
+        for col, kind in self.kinds.items():
+            if kind == "enum":
+                mapping[col] = ENUM(
+                    *self.enum_values[col], name=enum_name(self.table, col), schema=self.schema, create_type=False
+                )
+            elif kind == "numeric":
+                mapping[col] = NUMERIC(precision=38, scale=10)
+            else:
+                mapping[col] = _TYPES[kind]()
+        return mapping
+
+    def apply(self, df: pd.DataFrame) -> pd.DataFrame:
+        """The frame with 0/1 flag columns as booleans and the columns in the planned order"""
+        flags = [c for c, k in self.kinds.items() if k == "flag" and c in df.columns]
+        if flags:
+            df = df.assign(**{c: _to_bool(df[c]) for c in flags})
+        if self.order:
+            ordered = [c for c in self.order if c in df.columns]
+            df = df[ordered + [c for c in df.columns if c not in self.kinds]]
+        return df
+
+    def extend(self, df: pd.DataFrame) -> List[Tuple[str, str, str]]:
+        """Widen the plan so it also holds df (a later chunk); returns the (column, old, new) kind changes"""
+        changes: List[Tuple[str, str, str]] = []
+        for col in df.columns:
+            old = self.kinds.get(col)
+            if old is None or not df[col].notna().any():
+                continue
+            kind, values = self._column_kind(col, df[col])
+            new = join(old, kind)
+            if new is None:
+                raise ValueError(f"Column '{col}' changed from {_DDL.get(old, old)} to {_DDL.get(kind, kind)} between chunks")
+            if new == "enum":
+                merged = sorted(set(self.enum_values[col]) | set(values or ()))
+                if len(merged) > int(self.options.get("enum_max_values", 0)):
+                    new = "text"
+                else:
+                    self.enum_values[col] = merged
+            if new != old:
+                changes.append((col, old, new))
+                self.kinds[col] = new
+        return changes
+
+    def adopt(self, existing: Dict[str, Tuple[str, str]]) -> List[Tuple[str, str, str]]:
+        """Reconcile the plan with a table that already exists, given {column: (data_type, udt_name)} from
+        information_schema: columns stay at least as wide as they are and are widened where the plan needs more"""
+        changes: List[Tuple[str, str, str]] = []
+        for col, planned in list(self.kinds.items()):
+            if col not in existing:
+                continue
+            data_type, udt_name = existing[col]
+            if data_type == "USER-DEFINED" and udt_name == enum_name(self.table, col):
+                current: Optional[str] = "enum"
+            else:
+                current = _EXISTING.get(data_type)
+            if current == "boolean" and planned in INT_LADDER:
+                current = "flag"
+            if current is None:
+                continue
+            new = join(current, planned)
+            if new is None:
+                # let PostgreSQL cast (or reject) the values as it would without the planner
+                self.kinds[col] = current
+                continue
+            if new != current:
+                changes.append((col, current, new))
+            self.kinds[col] = new
+        return changes
+
+    def columns(self) -> Dict[str, Tuple[str, str]]:
+        """{column: (data_type, udt_name)} of the table this plan writes, in the shape adopt() takes"""
+        return {
+            col: ("USER-DEFINED", enum_name(self.table, col)) if kind == "enum" else _CREATED[kind]
+            for col, kind in self.kinds.items()
+        }
+
+    def ddl(self, changes: Sequence[Tuple[str, str, str]] = (), table: Optional[str] = None) -> List[str]:
+        """Statements to run before writing: enum types and values not declared yet, then column widenings
+        (of table, default the planned table)"""
+        statements: List[str] = []
+        for col, kind in self.kinds.items():
+            if kind != "enum":
+                continue
+            qualified = self._qualify(enum_name(self.table, col))
+            declared = self._declared.get(col)
+            if declared is None:
+                declared = self._declared[col] = set()
+                statements.append(
+                    f"DO $$ BEGIN CREATE TYPE {qualified} AS ENUM (); "
+                    f"EXCEPTION WHEN duplicate_object THEN NULL; END $$"
+                )
+            for value in self.enum_values[col]:
+                if value not in declared:
+                    statements.append(f"ALTER TYPE {qualified} ADD VALUE IF NOT EXISTS {sql_literal(value)}")
+                    declared.add(value)
+        target = self._qualify(table or self.table)
+        for col, old, new in changes:
+            if new == "enum":
+                continue  # new enum values were added above
+            if old == "flag":
+                using = f'"{col}"::int'
+            elif old == "inet":
+                using = f'host("{col}")'
+            else:
+                using = f'"{col}"::{_DDL[new]}'
+            statements.append(f'ALTER TABLE {target} ALTER COLUMN "{col}" TYPE {_DDL[new]} USING {using}')
+        return statements
+
+    def _column_kind(self, col: str, values: pd.Series) -> Tuple[str, Optional[List[str]]]:
+        return column_kind(
+            values,
+            inet=col in (self.options.get("inet_columns") or ()),
+            booleans=bool(self.options.get("booleans", True)),
+            real=bool(self.options.get("real", True)),
+            enum_max_values=int(self.options.get("enum_max_values", 0)),
+        )
+
+    def _qualify(self, name: str) -> str:
+        return f'"{self.schema}"."{name}"' if self.schema else f'"{name}"'
+
+
+def _to_bool(values: pd.Series) -> pd.Series:
+    if isinstance(values.dtype, pd.ArrowDtype):
+        import pyarrow as pa
+
+        return values.astype(pd.ArrowDtype(pa.bool_()))
+    return values.astype("boolean" if values.isna().any() else "bool")
+
+
+def _label(kind: str) -> str:
+    return {"numeric": "NUMERIC(38,10)", "enum": "ENUM"}.get(kind) or _DDL[kind]
+
+
+def sql_literal(value: Any) -> str:
+    """value as an SQL literal for sqlalchemy.text; colons are escaped, text() would read ":name" as a bind
+    parameter"""
+    if value is None:
+        return "NULL"
+    if isinstance(value, (bool, np.bool_)):
+        return "TRUE" if value else "FALSE"
+    if isinstance(value, (int, float, np.integer, np.floating)):
+        return repr(value.item() if isinstance(value, np.generic) else value)
+    return "'" + str(value).replace("'", "''").replace(":", "\\:") + "'"
+
+
+def plan_types(
+    df: pd.DataFrame,
+    table: str,
+    schema: Optional[str] = None,
+    baseline: Optional[Dict[str, Any]] = None,
+    inet_columns: Sequence[str] = (),
+    booleans: bool = True,
+    real: bool = True,
+    enum_max_values: int = 0,
+    reorder: bool = True,
+) -> TypePlan:
+    """
+    Plan the column types of df for table.
+
+    baseline: the dtype mapping the table would get otherwise (_infer_types); the report compares against it
+    inet_columns: columns stored as INET whatever their values look like
+    booleans: 0/1 integer columns become BOOLEAN and are written as booleans (default True)
+    real: floats that are exact in float32 become REAL (default True)
+    enum_max_values: text columns with at most this many distinct values become an ENUM named <table>_<column>
+                     (default 0: off). New values of later loads are added to the type.
+    reorder: order the columns by alignment, widest first, to avoid padding (default True)
+    """
+    options = {
+        "inet_columns": list(inet_columns), "booleans": booleans, "real": real,
+        "enum_max_values": enum_max_values, "reorder": reorder,
+    }
+    plan = TypePlan(table, schema, options)
+    for col in df.columns:
+        kind, values = plan._column_kind(col, df[col])
+        plan.kinds[col] = kind
+        if values is not None:
+            plan.enum_values[col] = values
+
+    columns = list(df.columns)
+    plan.order = sorted(columns, key=lambda c: -alignment(plan.kinds[c])) if reorder else columns
+
+    before_kinds = {c: kind_of(t) for c, t in (baseline or {}).items()}
+    per_column: Dict[str, Any] = {}
+    for col in columns:
+        old = before_kinds.get(col, "text")
+        new = plan.kinds[col]
+        per_column[col] = {
+            "before": _label(old), "after": _label(new),
+            "bytes_before": value_width(old, df[col]), "bytes_after": value_width(new, df[col]),
+        }
+    before, padding_before = layout((before_kinds.get(c, "text"), per_column[c]["bytes_before"]) for c in columns)
+    after, padding_after = layout((plan.kinds[c], per_column[c]["bytes_after"]) for c in plan.order)
+    plan.report = {
+        "bytes_per_row_before": before,
+        "bytes_per_row_after": after,
+        "bytes_saved_per_row": before - after,
+        "padding_before": padding_before,
+        "padding_after": padding_after,
+        "columns": per_column,
+    }
+    return plan
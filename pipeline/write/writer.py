@@ -1,6 +1,6 @@
 from __future__ import annotations
 from abc import ABC, abstractmethod
-from typing import Any, Dict
+from typing import Any, Dict, Iterable
 import pandas as pd
 from pipeline.task import Task
 
@@ -19,3 +19,15 @@ class Writer(Task, ABC):
         rows = self.write(df)
         self.log("Writer.run() -> done")
         return rows
+
+    def write_chunks(self, chunks: Iterable[pd.DataFrame]) -> int:
+        """Persist a stream of frames and return the total rows; writers that need to treat the first chunk
+        differently (e.g. replace the table once, then append) override this"""
+        return sum(int(self.write(chunk) or 0) for chunk in chunks)
+
+    # adapter for Orchestrator.run_chunked()
+    def run_chunks(self, chunks: Iterable[pd.DataFrame]) -> int:
+        self.log("Writer.run_chunks() -> delegating to write_chunks()")
+        rows = self.write_chunks(chunks)
+        self.log("Writer.run_chunks() -> done")
+        return rows
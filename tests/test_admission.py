@@ -0,0 +1,94 @@
+import threading
+import time
+
+from pipeline.admission import AdmissionController, sample_csv
+
+
+def _csv(tmp_path, rows=2000):
+    path = tmp_path / "data.csv"
+    lines = ["ip_address,state,time_spent_seconds"]
+    lines += [f"10.0.{i % 256}.{i % 200},Ohio,{i}" for i in range(rows)]
+    path.write_text("\n".join(lines) + "\n")
+    return str(path)
+
+
+def test_sample_detects_column_kinds_and_row_width(tmp_path):
+    sample = sample_csv(_csv(tmp_path))
+
+    assert sample["columns"] == 3
+    assert sample["kinds"] == ["string", "string", "numeric"]
+    assert sample["bytes_per_line"] > 20
+    assert sample["row_bytes"] > 2 * 57
+
+
+def test_small_file_is_planned_full_and_reserves_its_estimate(tmp_path):
+    plan = AdmissionController(budget_bytes=64 * 2**20).plan(_csv(tmp_path))
+
+    assert plan["mode"] == "full"
+    assert 1900 <= plan["rows"] <= 2100
+    assert plan["reserve"] == plan["estimate"] > 0
+    assert plan["read_chunksize"] is None
+
+
+def test_file_larger_than_budget_is_planned_chunked(tmp_path):
+    controller = AdmissionController(budget_bytes=200_000, min_chunk_rows=10)
+    plan = controller.plan(_csv(tmp_path))
+
+    assert plan["mode"] == "chunked"
+    assert plan["reserve"] == 20_000
+    assert 10 <= plan["read_chunksize"] < plan["rows"]
+
+
+def test_unknown_sources_and_disabled_budget_reserve_nothing(tmp_path):
+    assert AdmissionController(1000).plan(object())["reserve"] == 0
+    assert AdmissionController(0).plan(_csv(tmp_path))["reserve"] == 0
+
+
+def test_second_load_waits_until_first_releases(tmp_path):
+    path = _csv(tmp_path)
+    controller = AdmissionController(budget_bytes=64 * 2**20)
+    controller.budget_bytes = controller.plan(path)["estimate"] + 1
+    first = controller.admit(path)
+    admitted = threading.Event()
+
+    def second():
+        with controller.admitted(path):
+            admitted.set()
+
+    t = threading.Thread(target=second)
+    t.start()
+    time.sleep(0.1)
+    assert not admitted.is_set()
+    assert controller.snapshot()["waiting"] == 1
+
+    controller.release(first)
+    t.join(5)
+    assert admitted.is_set()
+    assert controller.snapshot()["in_use"] == 0
+
+
+def test_load_that_waited_too_long_falls_back_to_chunked(tmp_path):
+    path = _csv(tmp_path)
+    controller = AdmissionController(budget_bytes=64 * 2**20, wait_timeout=0.05, min_chunk_rows=10)
+    controller.budget_bytes = int(controller.plan(path)["estimate"] * 1.5)
+    first = controller.admit(path)
+
+    second = controller.admit(path)
+
+    assert first["mode"] == "full"
+    assert second["mode"] == "chunked"
+    assert second["reserve"] < first["reserve"]
+    assert controller.in_use == first["reserve"] + second["reserve"]
+
+
+def test_observed_frames_calibrate_later_estimates(tmp_path):
+    path = _csv(tmp_path)
+    controller = AdmissionController(budget_bytes=64 * 2**20, alpha=0.5)
+    plan = controller.plan(path)
+
+    controller.observe(plan, frame_bytes=int(plan["row_bytes"] * 2 * 100), frame_rows=100)
+    assert controller.calibration == 2.0
+    controller.observe(plan, frame_bytes=int(plan["row_bytes"] * 100), frame_rows=100)
+    assert abs(controller.calibration - 1.5) < 1e-6
+
+    assert abs(controller.plan(path)["estimate"] / plan["estimate"] - 1.5) < 0.01
@@ -10,6 +10,14 @@ def client():
     return TestClient(api.app)
 
 
+@pytest.fixture(autouse=True)
+def isolated_fingerprints(tmp_path, monkeypatch):
+    from pipeline.fingerprint import FingerprintStore
+    store = FingerprintStore(str(tmp_path / "fingerprints.json"))
+    monkeypatch.setattr(api, "fingerprints", store)
+    return store
+
+
 def test_health_ok(client):
     r = client.get("/health")
     assert r.status_code == 200
@@ -106,3 +114,442 @@ def test_ingest_error_bubbles_as_500(client, monkeypatch):
     assert r.status_code == 500
     body = r.json()
     assert body["detail"] == "boom"
+
+
+@pytest.fixture
+def thread_jobs(monkeypatch):
+    from pipeline.jobs import JobManager
+    manager = JobManager(max_workers=1, mode="thread")
+    monkeypatch.setattr(api, "jobs", manager)
+    yield manager
+    manager.shutdown()
+
+
+def test_submit_job_returns_id_and_status_endpoint_reports_stages(client, monkeypatch, thread_jobs):
+    import time
+
+    class FakeOrchestrator:
+        def __init__(self, progress):
+            self.progress = progress
+            self.stage_rows = {}
+
+        def run(self):
+            self.progress({"event": "stage_finished", "stage": "CSV", "index": 1, "total": 2, "rows": 10})
+            self.stage_rows = {"CSV": 10, "PostgresWriter": 10}
+            return 10
+
+    monkeypatch.setattr(api, "build_pipeline", lambda progress=None, **kw: FakeOrchestrator(progress))
+
+    r = client.post("/jobs", json={"table": "t"})
+    assert r.status_code == 202
+    job_id = r.json()["job_id"]
+    assert r.json()["status_url"] == f"/jobs/{job_id}"
+
+    for _ in range(500):
+        body = client.get(f"/jobs/{job_id}").json()
+        if body["status"] == "succeeded":
+            break
+        time.sleep(0.01)
+    assert body["status"] == "succeeded"
+    assert body["result"]["rows"] == 10
+    assert body["stages"] == {"CSV": 10, "PostgresWriter": 10}
+
+
+def test_unknown_job_is_404(client):
+    assert client.get("/jobs/does-not-exist").status_code == 404
+
+
+def test_job_queue_full_is_429(client, monkeypatch):
+    from pipeline.jobs import JobQueueFull
+
+    class FullJobs:
+        def submit(self, fn, params):
+            raise JobQueueFull("2 jobs already waiting for a worker")
+
+    monkeypatch.setattr(api, "jobs", FullJobs())
+
+    r = client.post("/jobs", json={})
+    assert r.status_code == 429
+
+
+def test_unchanged_replay_is_skipped_without_building_pipeline(client, monkeypatch, tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("a\n1\n", encoding="utf-8")
+    builds = []
+
+    class FakeOrchestrator:
+        def run(self):
+            return 1
+
+    def spy_build_pipeline(**kwargs):
+        builds.append(kwargs)
+        return FakeOrchestrator()
+
+    monkeypatch.setattr(api, "build_pipeline", spy_build_pipeline, raising=True)
+    payload = {"path": str(src), "dsn": "postgresql://u:p@h/db", "if_exists": "append"}
+
+    first = client.post("/ingest", json=payload).json()
+    second = client.post("/ingest", json=payload).json()
+    forced = client.post("/ingest", json={**payload, "force": True}).json()
+    other_table = client.post("/ingest", json={**payload, "table": "other"}).json()
+
+    assert first["status"] == "ok" and first["rows"] == 1
+    assert second["status"] == "skipped" and second["rows"] == 0
+    assert forced["status"] == "ok"
+    assert other_table["status"] == "ok"
+    assert len(builds) == 3
+
+    src.write_text("a\n1\n2\n", encoding="utf-8")
+    assert client.post("/ingest", json=payload).json()["status"] == "ok"
+
+
+def test_file_replaced_during_a_load_is_not_recorded_as_loaded(client, monkeypatch, tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("a\n1\n", encoding="utf-8")
+
+    class ReplacingOrchestrator:
+        def run(self):
+            # the load read the old contents; a new file lands before it finishes
+            src.write_text("a\n1\n2\n", encoding="utf-8")
+            return 1
+
+    monkeypatch.setattr(api, "build_pipeline", lambda **kw: ReplacingOrchestrator(), raising=True)
+    payload = {"path": str(src), "dsn": "postgresql://u:p@h/db", "if_exists": "append"}
+
+    assert client.post("/ingest", json=payload).json()["status"] == "ok"
+    assert client.post("/ingest", json=payload).json()["status"] == "ok", "the new contents were never loaded"
+
+
+def test_upload_or_failed_load_into_the_table_forgets_its_fingerprint(client, monkeypatch, tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("a\n1\n", encoding="utf-8")
+    runs = []
+
+    class FakeOrchestrator:
+        def run(self):
+            runs.append(1)
+            if fail:
+                raise RuntimeError("db down")
+            return 1
+
+    fail = False
+    monkeypatch.setattr(api, "build_pipeline", lambda **kw: FakeOrchestrator(), raising=True)
+    payload = {"path": str(src), "dsn": "postgresql://u:p@h/db", "if_exists": "replace", "table": "t"}
+    assert client.post("/ingest", json=payload).json()["status"] == "ok"
+
+    with monkeypatch.context() as m:
+        m.setattr(api, "build_pipeline", _streaming_pipeline([]), raising=True)
+        assert client.post("/ingest/upload?table=t", content=b"a\n2\n").status_code == 200
+    assert client.post("/ingest", json=payload).json()["status"] == "ok", "the upload changed the table"
+
+    fail = True
+    assert client.post("/ingest", json={**payload, "force": True}).status_code == 500
+    fail = False
+    assert client.post("/ingest", json=payload).json()["status"] == "ok", "the failed load may have changed it"
+    assert client.post("/ingest", json=payload).json()["status"] == "skipped"
+    assert len(runs) == 4
+
+
+def test_concurrent_identical_ingests_share_one_run(client, monkeypatch):
+    import threading
+    import time
+
+    started = threading.Event()
+    release = threading.Event()
+    runs = []
+
+    class SlowOrchestrator:
+        def run(self):
+            runs.append(1)
+            started.set()
+            release.wait(5)
+            return 5
+
+    monkeypatch.setattr(api, "build_pipeline", lambda **kw: SlowOrchestrator(), raising=True)
+    payload = {"path": "data/missing.csv", "dsn": "postgresql://u:p@h/db"}
+    results = []
+
+    def call():
+        results.append(client.post("/ingest", json=payload).json())
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert started.wait(5)
+    follower = threading.Thread(target=call)
+    follower.start()
+    deadline = time.time() + 5
+    while api.inflight._calls and not any(c.waiters for c in api.inflight._calls.values()):
+        assert time.time() < deadline, "the second request never joined the in-flight load"
+        time.sleep(0.001)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(runs) == 1
+    assert sorted(r["coalesced"] for r in results) == [False, True]
+    assert all(r["rows"] == 5 for r in results)
+
+
+def _streaming_pipeline(sink, processors=()):
+    processors = list(processors)
+    from pipeline.orchestrator import Orchestrator
+    from pipeline.read.csvreader import CSVReader
+
+    class SinkWriter:
+        def run(self, df):
+            sink.append(df)
+            return len(df)
+
+        def run_chunks(self, chunks):
+            rows = 0
+            for chunk in chunks:
+                sink.append(chunk)
+                rows += len(chunk)
+            return rows
+
+    def build(**kw):
+        sink.append(kw)
+        reader = CSVReader(name="CSV", config={"path": kw["csv_path"], "chunksize": kw["read_chunksize"]})
+        return Orchestrator(reader=reader, processors=processors, writer=SinkWriter(),
+                            memory_limit=kw.get("memory_limit"))
+
+    return build
+
+
+def test_upload_streams_body_into_chunked_pipeline(client, monkeypatch):
+    sink = []
+    monkeypatch.setattr(api, "build_pipeline", _streaming_pipeline(sink), raising=True)
+    body = "a,b\n" + "".join(f"{i},{i * 2}\n" for i in range(5))
+
+    def pieces():
+        for i in range(0, len(body), 7):
+            yield body[i:i + 7].encode()
+
+    r = client.post("/ingest/upload?table=t&read_chunksize=2", content=pieces(),
+                    headers={"X-Pipeline-DSN": "postgresql://u:p@h/db"})
+
+    assert r.status_code == 200
+    data = r.json()
+    assert data["rows_parsed"] == 5
+    assert data["rows_written"] == 5
+    assert data["bytes_received"] == len(body)
+    assert data["written_to"] == "public.t"
+    assert data["mode"] == "chunked"
+    kwargs, chunks = sink[0], sink[1:]
+    assert kwargs["if_exists"] == "append"
+    assert kwargs["memory_limit"] is None, "a plain upload is streamed, never buffered"
+    assert kwargs["dsn"] == "postgresql://u:p@h/db", "the DSN comes from the header, not the URL"
+    assert [len(c) for c in chunks] == [2, 2, 1]
+
+
+def test_upload_ignores_a_dsn_in_the_query_string(client, monkeypatch):
+    sink = []
+    monkeypatch.setattr(api, "build_pipeline", _streaming_pipeline(sink), raising=True)
+    monkeypatch.delenv("PIPELINE_DSN", raising=False)
+
+    r = client.post("/ingest/upload?dsn=postgresql://u:secret@h/db", content=b"a\n1\n")
+
+    assert r.status_code == 200
+    assert sink[0]["dsn"] is None
+
+
+@pytest.mark.parametrize("limit_mb", ["0.00001", "256"])
+def test_upload_statistics_match_a_whole_file_run(client, monkeypatch, limit_mb):
+    import pandas as pd
+    from pipeline.process.percentile import PercentileProcessor
+
+    sink = []
+    percentile = PercentileProcessor("Percentile", {"percentile": 0.85})
+    percentile.log = lambda msg: None
+    monkeypatch.setattr(api, "build_pipeline", _streaming_pipeline(sink, [percentile]), raising=True)
+    monkeypatch.setenv("UPLOAD_MEMORY_LIMIT_MB", limit_mb)
+    rows = [(f"S{i % 3}", (i * 37) % 101 / 7) for i in range(60)]
+    body = "state,purchase\n" + "".join(f"{st},{p!r}\n" for st, p in rows)
+
+    r = client.post("/ingest/upload?read_chunksize=7&exact_stats=true", content=body.encode())
+
+    assert r.status_code == 200
+    assert r.json()["mode"] == ("spilled" if limit_mb == "0.00001" else "full")
+    uploaded = pd.concat(sink[1:], ignore_index=True)
+    whole = PercentileProcessor("Percentile", {"percentile": 0.85})
+    whole.log = lambda msg: None
+    expected = whole.process(pd.DataFrame(rows, columns=["state", "purchase"]))
+    assert uploaded["85th_percentile_state"].tolist() == expected["85th_percentile_state"].tolist()
+    assert uploaded["85th_percentile_national"].tolist() == expected["85th_percentile_national"].tolist()
+
+
+def test_upload_accepts_gzip_body(client, monkeypatch):
+    import gzip
+
+    sink = []
+    monkeypatch.setattr(api, "build_pipeline", _streaming_pipeline(sink), raising=True)
+    body = gzip.compress(b"a,b\n1,2\n3,4\n")
+
+    r = client.post("/ingest/upload", content=body, headers={"Content-Encoding": "gzip"})
+
+    assert r.status_code == 200
+    assert r.json()["rows_written"] == 2
+
+
+def test_upload_pipeline_failure_is_500(client, monkeypatch):
+    from pipeline.orchestrator import Orchestrator
+    from pipeline.read.csvreader import CSVReader
+
+    class BoomWriter:
+        def run_chunks(self, chunks):
+            next(iter(chunks))
+            raise RuntimeError("db down")
+
+    monkeypatch.setattr(api, "build_pipeline", lambda **kw: Orchestrator(
+        reader=CSVReader(name="CSV", config={"path": kw["csv_path"], "chunksize": 1}),
+        processors=[], writer=BoomWriter(), memory_limit=kw["memory_limit"]))
+
+    r = client.post("/ingest/upload", content=b"a\n" + b"1\n" * 10_000)
+
+    assert r.status_code == 500
+    assert r.json()["detail"] == "db down"
+
+
+def test_job_events_stream_as_sse(client, monkeypatch, thread_jobs):
+    import json
+    from pipeline.events import EventBus
+
+    bus = EventBus()
+    monkeypatch.setattr(api, "events", bus)
+    thread_jobs.bus = bus
+
+    class FakeOrchestrator:
+        def __init__(self, progress):
+            self.progress = progress
+
+        def run(self):
+            self.progress({"event": "stage_finished", "stage": "CSV", "index": 1, "total": 2, "rows": 3})
+            return 3
+
+    monkeypatch.setattr(api, "build_pipeline", lambda progress=None, **kw: FakeOrchestrator(progress))
+    job_id = client.post("/jobs", json={"path": "data/none.csv"}).json()["job_id"]
+
+    with client.stream("GET", f"/jobs/{job_id}/events") as r:
+        assert r.headers["content-type"].startswith("text/event-stream")
+        body = "".join(r.iter_text())
+
+    frames = [f for f in body.split("\n\n") if f]
+    names = [f.splitlines()[0] for f in frames]
+    assert names[-1] == "event: job_finished"
+    last = json.loads(frames[-1].splitlines()[1][len("data: "):])
+    assert last["status"] == "succeeded" and last["job_id"] == job_id
+
+
+def test_synchronous_ingest_publishes_progress_under_its_run_id(client, monkeypatch):
+    from pipeline.events import EventBus
+
+    bus = EventBus()
+    monkeypatch.setattr(api, "events", bus)
+
+    class FakeOrchestrator:
+        def __init__(self, progress):
+            self.progress = progress
+
+        def run(self):
+            self.progress({"event": "stage_finished", "stage": "CSV", "index": 1, "total": 2, "rows": 3})
+            return 3
+
+    monkeypatch.setattr(api, "build_pipeline", lambda progress=None, **kw: FakeOrchestrator(progress))
+
+    with bus.subscribe() as sub:
+        body = client.post("/ingest", json={"path": "data/none.csv"}).json()
+        event = sub.get(timeout=1)
+
+    assert body["run_id"].startswith("ingest-")
+    assert event["event"] == "stage_finished" and event["job_id"] == body["run_id"]
+
+
+def test_job_events_for_unknown_job_is_404(client):
+    assert client.get("/jobs/nope/events").status_code == 404
+
+
+def test_aggregates_served_from_cache_with_etag(client, monkeypatch, tmp_path):
+    from pipeline.summary_cache import SummaryCache
+
+    monkeypatch.setattr(api, "summaries", SummaryCache())
+
+    class FakeOrchestrator:
+        summaries = {
+            "Percentile": {"percentile": 0.85, "national_cut": 42.0, "state_cuts": {"Ohio": 40.0}},
+            "Conversion": {"rows": 2, "conversion_rate": 0.5, "by_state": {}, "by_channel": {}},
+        }
+
+        def run(self):
+            return 2
+
+    monkeypatch.setattr(api, "build_pipeline", lambda **kw: FakeOrchestrator())
+
+    assert client.get("/aggregates/percentiles?table=agg").status_code == 404
+    client.post("/ingest", json={"table": "agg", "path": str(tmp_path / "x.csv")})
+
+    r = client.get("/aggregates/percentiles?table=agg")
+    assert r.status_code == 200
+    assert r.json()["percentiles"]["state_cuts"] == {"Ohio": 40.0}
+    etag = r.headers["etag"]
+
+    again = client.get("/aggregates/percentiles?table=agg", headers={"If-None-Match": etag})
+    assert again.status_code == 304
+
+    conv = client.get("/aggregates/conversion?table=agg")
+    assert conv.json()["conversion"]["conversion_rate"] == 0.5
+
+    FakeOrchestrator.summaries = {"Percentile": {"percentile": 0.85, "national_cut": 50.0, "state_cuts": {}}}
+    client.post("/ingest", json={"table": "agg", "path": str(tmp_path / "x.csv")})
+    fresh = client.get("/aggregates/percentiles?table=agg", headers={"If-None-Match": etag})
+    assert fresh.status_code == 200
+    assert fresh.json()["percentiles"]["national_cut"] == 50.0
+
+    # the cuts of an appended batch alone do not describe the table
+    client.post("/ingest", json={"table": "agg", "path": str(tmp_path / "x.csv"), "if_exists": "append"})
+    assert client.get("/aggregates/percentiles?table=agg").status_code == 404
+
+
+def test_cold_import_and_health_do_not_load_heavy_packages():
+    import subprocess
+    import sys
+
+    code = (
+        "import sys, api\n"
+        "from fastapi.testclient import TestClient\n"
+        "assert TestClient(api.app).get('/health').json() == {'status': 'ok'}\n"
+        "print(sorted(m for m in ('pandas', 'numpy', 'sqlalchemy', 'us') if m in sys.modules))\n"
+    )
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+
+    assert out.stdout.strip() == "[]"
+
+
+def test_ingest_over_memory_budget_reads_in_chunks_and_spills(client, monkeypatch, tmp_path):
+    from pipeline.admission import AdmissionController
+    src = tmp_path / "big.csv"
+    src.write_text("state,time_spent_seconds\n" + "".join(f"Ohio,{i}\n" for i in range(5000)), encoding="utf-8")
+    controller = AdmissionController(budget_bytes=100_000, min_chunk_rows=100)
+    monkeypatch.setattr(api, "admission", controller)
+    built = {}
+
+    class FakeOrchestrator:
+        frame_bytes, frame_rows = 13_000, 100
+        spilled = True
+
+        def run(self):
+            return 5000
+
+    def spy_build_pipeline(**kwargs):
+        built.update(kwargs)
+        return FakeOrchestrator()
+
+    monkeypatch.setattr(api, "build_pipeline", spy_build_pipeline, raising=True)
+
+    r = client.post("/ingest", json={"path": str(src), "dsn": "postgresql://u:p@h/db"})
+
+    assert r.json()["mode"] == "spilled"
+    assert r.json()["rows"] == 5000
+    assert 100 <= built["read_chunksize"] < 5000
+    assert 0 < built["memory_limit"] < 100_000
+    assert controller.snapshot()["in_use"] == 0
+    assert controller.runs_observed == 1
@@ -55,3 +55,40 @@ def test_process_raises_keyerror_when_purchase_missing_but_logs_first():
     # It should have logged before failing on missing column
     assert any("Creating converted column from purchase" in m for m in p._logs), \
         "Expected a log even when 'purchase' column is missing"
+
+
+def test_summary_holds_overall_state_and_channel_rates():
+    df = pd.DataFrame({
+        "purchase": [None, 10.0, 5.0, None],
+        "state": ["A", "A", "B", "B"],
+        "marketing_channel": ["x", "y", "y", "y"],
+    })
+    p = _processor_with_log_capture()
+
+    p.process(df)
+
+    assert p.summary["conversion_rate"] == 0.5
+    assert p.summary["by_state"] == {"A": {"rate": 0.5, "rows": 2}, "B": {"rate": 0.5, "rows": 2}}
+    assert p.summary["by_channel"]["y"] == {"rate": 2 / 3, "rows": 3}
+
+
+def test_summary_adds_up_over_chunks_until_rollback():
+    df = pd.DataFrame({
+        "purchase": [None, 10.0, 5.0, None, 7.0],
+        "state": ["A", "A", "B", "B", "C"],
+        "marketing_channel": ["x", "y", "y", "y", "x"],
+    })
+    whole = _processor_with_log_capture()
+    whole.process(df.copy())
+    chunked = _processor_with_log_capture()
+
+    for start in range(0, len(df), 2):
+        chunked.process(df.iloc[start:start + 2].copy())
+
+    assert chunked.summary == whole.summary
+    assert chunked.summary["rows"] == 5
+
+    chunked.rollback()
+    assert chunked.summary is None
+    chunked.process(df.iloc[:2].copy())
+    assert chunked.summary["rows"] == 2
@@ -96,3 +96,56 @@ def test_config_is_not_mutated_by_reader(tmp_path):
 
     # Reader should not inject defaults back into the user-provided config
     assert "sep" not in cfg, "Reader must not mutate the provided config dict"
+
+
+def test_iter_chunks_yields_frames_of_chunksize(tmp_path):
+    p = tmp_path / "data.csv"
+    p.write_text("a,b\n1,2\n3,4\n5,6\n", encoding="utf-8")
+
+    r = _reader_with_log_capture(config={"path": str(p), "chunksize": 2})
+    chunks = list(r.iter_chunks())
+
+    assert [len(c) for c in chunks] == [2, 1]
+    assert chunks[1]["a"].tolist() == [5]
+
+
+def test_read_accepts_file_like_objects():
+    import io
+
+    r = _reader_with_log_capture(config={"path": io.StringIO("a,b\n1,2\n")})
+
+    df = r.read()
+
+    pd.testing.assert_frame_equal(df, pd.DataFrame({"a": [1], "b": [2]}))
+    assert any("Reading CSV from <stream>" in m for m in r._logs)
+
+
+def test_iter_chunks_on_empty_stream_yields_nothing():
+    import io
+
+    r = _reader_with_log_capture(config={"path": io.StringIO("")})
+
+    assert list(r.iter_chunks()) == []
+
+
+@pytest.mark.parametrize("chunked", [False, True])
+def test_pyarrow_backend_keeps_arrow_dtypes(tmp_path, chunked):
+    p = tmp_path / "d.csv"
+    p.write_text("state,n\nOhio,1\n,\n", encoding="utf-8")
+    r = CSVReader(name="csv", config={"path": str(p), "dtype_backend": "pyarrow", "chunksize": 10})
+    r.log = lambda msg: None
+
+    df = next(r.iter_chunks()) if chunked else r.read()
+
+    assert [str(t) for t in df.dtypes] == ["string[pyarrow]", "int64[pyarrow]"]
+    assert df["n"].isna().tolist() == [False, True]
+
+
+def test_unknown_dtype_backend_is_rejected(tmp_path):
+    p = tmp_path / "d.csv"
+    p.write_text("a\n1\n", encoding="utf-8")
+    r = CSVReader(name="csv", config={"path": str(p), "dtype_backend": "polars"})
+    r.log = lambda msg: None
+
+    with pytest.raises(ValueError):
+        r.read()
@@ -0,0 +1,139 @@
+import multiprocessing
+import os
+
+import numpy as np
+import pandas as pd
+
+from pipeline.process.dedup import DedupProcessor
+
+
+def _proc(tmp_path, **config):
+    p = DedupProcessor(name="dedup", config={"index_path": str(tmp_path / "seen.npy"), **config})
+    p._logs = []
+    p.log = lambda msg: p._logs.append(str(msg))
+    return p
+
+
+def _frame():
+    return pd.DataFrame({
+        "ip_address": ["1.1.1.1", "2.2.2.2", "1.1.1.1", "3.3.3.3"],
+        "marketing_channel": ["A", "B", "A", "C"],
+        "purchase": [10.0, None, 10.0, 5.0],
+        "state": ["Ohio", "Utah", "Iowa", "Ohio"],
+    })
+
+
+def test_drops_duplicates_within_batch():
+    p = DedupProcessor(name="dedup", config={"index_path": "unused-not-created.npy"})
+    p.log = lambda msg: None
+
+    out = p.process(_frame())
+
+    assert out["ip_address"].tolist() == ["1.1.1.1", "2.2.2.2", "3.3.3.3"]
+
+
+def test_rows_from_committed_run_are_dropped_on_next_run(tmp_path):
+    first = _proc(tmp_path)
+    first.process(_frame())
+    first.commit()
+
+    second = _proc(tmp_path)
+    df = pd.concat([_frame(), pd.DataFrame({"ip_address": ["9.9.9.9"], "marketing_channel": ["A"],
+                                            "purchase": [1.0], "state": ["Ohio"]})], ignore_index=True)
+    out = second.process(df)
+
+    assert out["ip_address"].tolist() == ["9.9.9.9"]
+    assert any("Dropped 4 rows seen in earlier runs" in m for m in second._logs)
+
+
+def test_index_untouched_until_commit(tmp_path):
+    p = _proc(tmp_path)
+    p.process(_frame())
+
+    assert not (tmp_path / "seen.npy").exists()
+
+    p.commit()
+    index = np.load(tmp_path / "seen.npy")
+    assert len(index) == 3
+    assert (np.diff(index.astype("float64")) > 0).all()
+
+
+def test_hash_is_stable_across_inferred_dtypes():
+    as_int = pd.DataFrame({"k": [1, 2], "s": ["a", "b"]})
+    as_float = pd.DataFrame({"k": [1.0, 2.0], "s": pd.Series(["a", "b"], dtype="string")})
+
+    assert (DedupProcessor.hash_rows(as_int) == DedupProcessor.hash_rows(as_float)).all()
+
+
+def test_skips_when_key_column_missing(tmp_path):
+    p = _proc(tmp_path, keys=["nope"])
+    df = _frame()
+
+    assert p.process(df) is df
+    assert any("Key columns ['nope'] not found" in m for m in p._logs)
+
+
+def test_duplicates_in_different_chunks_of_one_run_are_dropped(tmp_path):
+    p = _proc(tmp_path)
+    df = _frame()
+
+    first, second = p.process(df.iloc[:2]), p.process(df.iloc[2:])
+
+    assert first["ip_address"].tolist() == ["1.1.1.1", "2.2.2.2"]
+    assert second["ip_address"].tolist() == ["3.3.3.3"], "row 3 repeats row 1 from the previous chunk"
+
+
+def test_failed_write_does_not_mark_its_rows_as_seen(tmp_path):
+    import pytest
+    from pipeline.orchestrator import Orchestrator
+
+    class _Reader:
+        def __init__(self, df):
+            self.df = df
+
+        def run(self):
+            return self.df.copy()
+
+    class _Writer:
+        def __init__(self, fail):
+            self.fail, self.rows = fail, None
+
+        def run(self, df):
+            if self.fail:
+                raise RuntimeError("db down")
+            self.rows = df["ip_address"].tolist()
+            return len(df)
+
+    p = _proc(tmp_path)
+    with pytest.raises(RuntimeError, match="db down"):
+        Orchestrator(_Reader(_frame()), [p], _Writer(fail=True)).run()
+
+    other = pd.DataFrame({"ip_address": ["9.9.9.9"], "marketing_channel": ["A"], "purchase": [1.0], "state": ["Ohio"]})
+    Orchestrator(_Reader(other), [p], _Writer(fail=False)).run()
+    retry = _Writer(fail=False)
+    Orchestrator(_Reader(_frame()), [p], retry).run()
+
+    assert retry.rows == ["1.1.1.1", "2.2.2.2", "3.3.3.3"], "rows of the failed run are loaded by the retry"
+
+
+def _commit_many(index_path, worker):
+    for i in range(10):
+        p = DedupProcessor(name="dedup", config={"index_path": index_path})
+        p.log = lambda msg: None
+        p.process(pd.DataFrame({"ip_address": [f"{worker}.{i}"], "marketing_channel": ["A"], "purchase": [1.0]}))
+        p.commit()
+
+
+def test_concurrent_commits_do_not_lose_hashes(tmp_path):
+    index_path = str(tmp_path / "seen.npy")
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_commit_many, args=(index_path, w)) for w in range(3)]
+    for w in workers:
+        w.start()
+    for w in workers:
+        w.join(60)
+        assert w.exitcode == 0
+
+    assert len(np.load(index_path)) == 30
+    assert not [f for f in os.listdir(tmp_path) if ".tmp" in f]
@@ -0,0 +1,92 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.dtypes import as_float, as_text, float_series, like, to_arrow_table, uses_arrow
+from pipeline.process.conversion import ConversionProcessor
+from pipeline.process.dedup import DedupProcessor
+from pipeline.process.ip_address import IPAddressProcessor
+from pipeline.process.missing_value import MissingValuesProcessor
+from pipeline.process.normalization import NormalizationProcessor
+from pipeline.process.percentile import PercentileProcessor
+from pipeline.process.state_abbreviation import StateAbbreviationProcessor
+from pipeline.process.validation import ValidationProcessor
+from pipeline.read.csvreader import CSVReader
+
+
+def _chain(tmp_path):
+    processors = [
+        IPAddressProcessor("IP"),
+        DedupProcessor("Dedup", {"index_path": str(tmp_path / "dedup.npy")}),
+        ValidationProcessor("Validate", {"rules": [
+            {"column": "time_spent_seconds", "check": "type", "type": "integer"},
+            {"column": "purchase", "check": "range", "min": 0, "max": 250},
+        ]}),
+        MissingValuesProcessor("MissingValue", {"strategy": "median", "group_by": "state"}),
+        ConversionProcessor("Conversion"),
+        StateAbbreviationProcessor("StateAbbrev"),
+        NormalizationProcessor("Norm", {"method": "z_score"}),
+        PercentileProcessor("Percentile", {"percentile": 0.85}),
+    ]
+    for p in processors:
+        p.log = lambda msg: None
+    return processors
+
+
+def _run(tmp_path, backend):
+    reader = CSVReader("CSV", {"path": "data/dataset.csv", "dtype_backend": backend})
+    reader.log = lambda msg: None
+    df = reader.read()
+    processors = _chain(tmp_path / backend)
+    (tmp_path / backend).mkdir()
+    for p in processors:
+        df = p.process(df)
+    return df, processors
+
+
+def test_every_processor_gives_the_same_results_under_both_backends(tmp_path):
+    numpy_df, numpy_procs = _run(tmp_path, "numpy")
+    arrow_df, arrow_procs = _run(tmp_path, "pyarrow")
+
+    assert list(arrow_df.columns) == list(numpy_df.columns)
+    assert all(isinstance(t, pd.ArrowDtype) for t in arrow_df.dtypes)
+    for col in numpy_df.columns:
+        expected, got = numpy_df[col], arrow_df[col]
+        if pd.api.types.is_numeric_dtype(expected.dtype):
+            assert np.array_equal(float_series(got).to_numpy(), float_series(expected).to_numpy(), equal_nan=True), col
+        else:
+            assert got.astype(object).where(got.notna(), None).tolist() == \
+                expected.astype(object).where(expected.notna(), None).tolist(), col
+    assert arrow_procs[-1].summary == numpy_procs[-1].summary
+    assert arrow_procs[4].summary == numpy_procs[4].summary
+
+
+def test_like_follows_the_frame_backend():
+    arrow_frame = pd.DataFrame({"a": pd.array([1], dtype="int64[pyarrow]")})
+    numpy_frame = pd.DataFrame({"a": [1]})
+    flags = pd.Series([1, 0], dtype="int8")
+
+    assert uses_arrow(arrow_frame) and not uses_arrow(numpy_frame)
+    assert str(like(flags, arrow_frame).dtype) == "int8[pyarrow]"
+    assert like(flags, numpy_frame) is flags
+    assert str(like(pd.Series(["x", None], dtype=object), arrow_frame).dtype) == "string[pyarrow]"
+
+
+def test_as_float_and_as_text_keep_the_backend():
+    ints = pd.Series([1, None], dtype="int64[pyarrow]")
+    text = pd.Series(["x"], dtype="string[pyarrow]")
+
+    assert str(as_float(ints).dtype) == "double[pyarrow]"
+    assert as_float(pd.Series([1, 2])).dtype == "int64"
+    assert as_text(text) is text
+    assert as_text(pd.Series(["x"], dtype=object)).dtype == "string"
+
+
+def test_arrow_table_reuses_arrow_columns():
+    df = pd.DataFrame({"s": pd.array(["x", None], dtype="string[pyarrow]"), "f": [1.0, np.nan]})
+
+    table = to_arrow_table(df)
+
+    assert table.column("s").null_count == 1
+    assert table.column("f").null_count == 1
+    assert table.column_names == ["s", "f"]
@@ -0,0 +1,41 @@
+from pipeline.events import EventBus
+
+
+def test_publish_without_subscribers_is_a_noop():
+    bus = EventBus()
+    bus.publish({"event": "x"})  # must not raise or buffer anything
+
+
+def test_subscribers_receive_stamped_events_filtered_by_predicate():
+    bus = EventBus()
+    everything = bus.subscribe()
+    only_job = bus.subscribe(lambda e: e.get("job_id") == "a")
+
+    bus.publish({"event": "stage_started", "job_id": "a"})
+    bus.publish({"event": "stage_started", "job_id": "b"})
+
+    got = [everything.get(), everything.get()]
+    assert [e["job_id"] for e in got] == ["a", "b"]
+    assert "ts" in got[0]
+    assert only_job.get()["job_id"] == "a"
+    assert only_job.get() is None
+
+
+def test_slow_subscriber_drops_instead_of_blocking():
+    bus = EventBus()
+    sub = bus.subscribe(maxsize=2)
+
+    for i in range(5):
+        bus.publish({"event": "chunk_written", "chunk": i})
+
+    assert sub.dropped == 3
+    assert sub.get()["chunk"] == 0
+
+
+def test_closed_subscription_stops_receiving():
+    bus = EventBus()
+    with bus.subscribe() as sub:
+        pass
+
+    bus.publish({"event": "x"})
+    assert sub.get() is None
@@ -0,0 +1,126 @@
+import threading
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.write.fanout import FanOutAborted, FanOutWriter
+from pipeline.write.writer import Writer
+
+
+class _Recorder(Writer):
+    def __init__(self, name, fail_on=None, barrier=None):
+        super().__init__(name=name)
+        self.log = lambda msg: None
+        self.frames = []
+        self.fail_on = fail_on
+        self.barrier = barrier
+
+    def write(self, data):
+        if self.barrier is not None:
+            self.barrier.wait()
+        if self.fail_on is not None and self.fail_on in data["a"].tolist():
+            raise RuntimeError(f"{self.name} cannot write {self.fail_on}")
+        self.frames.append(data)
+        return len(data)
+
+
+def _fanout(*writers, **config):
+    f = FanOutWriter("fanout", list(writers), config)
+    f._logs = []
+    f.log = lambda msg: f._logs.append(str(msg))
+    return f
+
+
+def test_write_hands_every_sink_the_same_data_concurrently():
+    barrier = threading.Barrier(2, timeout=5)  # both sinks must be inside write() at the same time
+    pg, parquet = _Recorder("pg", barrier=barrier), _Recorder("parquet", barrier=barrier)
+    df = pd.DataFrame({"a": [1.0, 2.0, 3.0]})
+
+    assert _fanout(pg, parquet).write(df) == 3
+
+    for sink in (pg, parquet):
+        (seen,) = sink.frames
+        assert np.shares_memory(seen["a"].to_numpy(), df["a"].to_numpy()), "no copy of the column data"
+
+
+def test_write_chunks_streams_every_chunk_to_every_sink_and_reports_per_sink():
+    pg, parquet = _Recorder("pg"), _Recorder("pg")
+    f = _fanout(pg, parquet)
+
+    assert f.write_chunks(pd.DataFrame({"a": [i, i + 1]}) for i in range(0, 10, 2)) == 10
+
+    assert [c["a"].tolist() for c in pg.frames] == [c["a"].tolist() for c in parquet.frames] == \
+        [[0, 1], [2, 3], [4, 5], [6, 7], [8, 9]]
+    assert [r["sink"] for r in f.report] == ["pg", "pg#2"]
+    assert all(r["status"] == "ok" and r["rows"] == 10 and r["seconds"] >= 0 for r in f.report)
+
+
+def test_abort_stops_the_other_sinks_and_the_source():
+    read = []
+
+    def source():
+        for i in range(10_000):
+            read.append(i)
+            yield pd.DataFrame({"a": [i]})
+
+    healthy, broken = _Recorder("pg"), _Recorder("parquet", fail_on=3)
+    f = _fanout(healthy, broken)
+
+    with pytest.raises(RuntimeError, match="parquet cannot write 3"):
+        f.write_chunks(source())
+
+    assert len(read) < 100, "the source stops being read once a sink failed"
+    status = {r["sink"]: r["status"] for r in f.report}
+    assert status == {"pg": "aborted", "parquet": "failed"}
+    assert not any(r["committed"] for r in f.report)
+
+
+def test_continue_lets_healthy_sinks_finish():
+    healthy, broken = _Recorder("pg"), _Recorder("parquet", fail_on=3)
+    f = _fanout(healthy, broken, on_error="continue")
+
+    assert f.write_chunks(pd.DataFrame({"a": [i]}) for i in range(6)) == 6
+
+    assert len(healthy.frames) == 6
+    assert {r["sink"]: r["status"] for r in f.report} == {"pg": "ok", "parquet": "failed"}
+    assert "parquet cannot write 3" in f.report[1]["error"]
+
+
+def test_report_says_which_sinks_committed_when_a_whole_frame_write_fails():
+    pg, parquet = _Recorder("pg"), _Recorder("parquet", fail_on=2)
+    f = _fanout(pg, parquet)
+
+    with pytest.raises(RuntimeError, match="parquet cannot write 2"):
+        f.write(pd.DataFrame({"a": [1, 2]}))
+
+    assert {r["sink"]: r["committed"] for r in f.report} == {"pg": True, "parquet": False}
+    assert any("WARN: pg committed before parquet failed" in m for m in f._logs)
+
+
+def test_continue_still_raises_when_every_sink_failed():
+    f = _fanout(_Recorder("a", fail_on=1), _Recorder("b", fail_on=1), on_error="continue")
+
+    with pytest.raises(RuntimeError):
+        f.write(pd.DataFrame({"a": [1]}))
+
+
+def test_failing_source_aborts_every_sink():
+    def source():
+        yield pd.DataFrame({"a": [1]})
+        raise OSError("truncated file")
+
+    sink = _Recorder("pg")
+    f = _fanout(sink)
+
+    with pytest.raises(OSError):
+        f.write_chunks(source())
+
+    assert f.report[0]["status"] == "aborted"
+
+
+def test_rejects_unknown_policy_and_empty_sink_list():
+    with pytest.raises(ValueError):
+        FanOutWriter("f", [_Recorder("a")], {"on_error": "retry"})
+    with pytest.raises(ValueError):
+        FanOutWriter("f", [])
@@ -0,0 +1,97 @@
+import json
+import multiprocessing
+import os
+
+from pipeline.fingerprint import FingerprintStore, config_digest
+
+
+def test_unchanged_file_and_config_detected(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("a\n1\n", encoding="utf-8")
+    store = FingerprintStore(str(tmp_path / "fp.json"))
+    cfg = {"table": "t", "if_exists": "append"}
+
+    assert not store.is_unchanged("t", str(src), cfg)
+    store.record("t", str(src), cfg)
+
+    assert store.is_unchanged("t", str(src), cfg)
+    assert not store.is_unchanged("t", str(src), {**cfg, "if_exists": "replace"})
+    assert not store.is_unchanged("other", str(src), cfg)
+
+
+def test_touched_file_with_same_content_still_unchanged(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("a\n1\n", encoding="utf-8")
+    store = FingerprintStore(str(tmp_path / "fp.json"))
+    store.record("t", str(src), {})
+
+    st = os.stat(src)
+    os.utime(src, ns=(st.st_atime_ns, st.st_mtime_ns + 10_000_000))
+    assert store.is_unchanged("t", str(src), {})
+
+    src.write_text("a\n2\n", encoding="utf-8")
+    assert not store.is_unchanged("t", str(src), {})
+
+
+def test_missing_source_is_never_unchanged_nor_recorded(tmp_path):
+    store = FingerprintStore(str(tmp_path / "fp.json"))
+
+    assert store.record("t", str(tmp_path / "nope.csv"), {}) is None
+    assert not store.is_unchanged("t", str(tmp_path / "nope.csv"), {})
+
+
+def test_invalidate_and_loads_under_another_dsn_forget_the_table(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("a\n1\n", encoding="utf-8")
+    store = FingerprintStore(str(tmp_path / "fp.json"))
+    store.record("s.t@db1", str(src), {})
+    store.record("s.other@db1", str(src), {})
+
+    store.record("s.t@db2", str(src), {"if_exists": "append"})
+    assert not store.is_unchanged("s.t@db1", str(src), {})
+
+    store.invalidate("s.t")
+    assert not store.is_unchanged("s.t@db2", str(src), {"if_exists": "append"})
+    assert store.is_unchanged("s.other@db1", str(src), {})
+
+
+def test_config_digest_ignores_key_order():
+    assert config_digest({"a": 1, "b": 2}) == config_digest({"b": 2, "a": 1})
+
+
+def test_record_keeps_the_snapshot_taken_before_the_load(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("a\n1\n", encoding="utf-8")
+    store = FingerprintStore(str(tmp_path / "fp.json"))
+    before = store.snapshot(str(src))
+
+    src.write_text("a\n2\n", encoding="utf-8")  # replaced while the load was reading it
+    store.record("t", str(src), {}, snapshot=before)
+
+    assert not store.is_unchanged("t", str(src), {})
+    src.write_text("a\n1\n", encoding="utf-8")
+    assert store.is_unchanged("t", str(src), {})
+
+
+def _record_many(path, source, worker):
+    store = FingerprintStore(path)
+    for i in range(20):
+        store.record(f"w{worker}-{i}", source, {})
+
+
+def test_concurrent_processes_do_not_lose_entries(tmp_path):
+    src = tmp_path / "in.csv"
+    src.write_text("a\n1\n", encoding="utf-8")
+    path = str(tmp_path / "fp.json")
+
+    ctx = multiprocessing.get_context("spawn")
+    workers = [ctx.Process(target=_record_many, args=(path, str(src), w)) for w in range(3)]
+    for p in workers:
+        p.start()
+    for p in workers:
+        p.join(60)
+        assert p.exitcode == 0
+
+    with open(path, encoding="utf-8") as fh:
+        assert len(json.load(fh)) == 60
+    assert not [f for f in os.listdir(tmp_path) if f.endswith(".tmp")]
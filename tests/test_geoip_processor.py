@@ -0,0 +1,95 @@
+import pandas as pd
+import pytest
+
+import pipeline.process.geoip as geoip
+from pipeline.process.geoip import GeoIPProcessor
+from pipeline.process.ip_address import ipv4_to_uint32
+
+
+@pytest.fixture
+def reference(tmp_path, monkeypatch):
+    monkeypatch.setattr(geoip, "_INDEX_CACHE", {})
+    path = tmp_path / "ranges.csv"
+    path.write_text(
+        "start,end,state\n"
+        "20.0.0.0,20.255.255.255,TX\n"
+        "10.0.0.0,10.255.255.255,WY\n"
+        f"{(30 << 24)},{(30 << 24) + 255},MD\n",
+        encoding="utf-8",
+    )
+    return path
+
+
+def _proc(reference, tmp_path, **config):
+    cfg = {"reference_path": str(reference), "cache_dir": str(tmp_path / "cache"), **config}
+    p = GeoIPProcessor(name="geo", config=cfg)
+    p._logs = []
+    p.log = lambda msg: p._logs.append(str(msg))
+    return p
+
+
+def test_inferred_state_and_mismatch_flag(reference, tmp_path):
+    df = pd.DataFrame({
+        "ip_address": ["10.1.2.3", "20.0.0.1", "30.0.0.7", "99.0.0.1", None],
+        "state_abbreviation": ["WY", "CA", "md", "TX", "TX"],
+    })
+    p = _proc(reference, tmp_path)
+
+    out = p.process(df)
+
+    assert out is df
+    assert df["inferred_state"].tolist()[:3] == ["WY", "TX", "MD"]
+    assert df["inferred_state"].iloc[3:].isna().all()
+    assert df["state_mismatch"].tolist() == [0, 1, 0, 0, 0]
+    assert any("Matched 3 of 5 addresses" in m for m in p._logs)
+
+
+def test_accepts_packed_uint32_column(reference, tmp_path):
+    df = pd.DataFrame({"ip_address": ipv4_to_uint32(pd.Series(["10.0.0.1", "1.1.1.1"]))})
+    p = _proc(reference, tmp_path)
+
+    p.process(df)
+
+    assert df["inferred_state"].iloc[0] == "WY"
+    assert pd.isna(df["inferred_state"].iloc[1])
+    assert "state_mismatch" not in df.columns
+
+
+def test_nested_ranges_resolve_to_the_narrowest_containing_range(tmp_path, monkeypatch):
+    monkeypatch.setattr(geoip, "_INDEX_CACHE", {})
+    path = tmp_path / "nested.csv"
+    path.write_text(
+        "start,end,state\n"
+        "10.0.0.0,10.255.255.255,WY\n"
+        "10.1.0.0,10.1.255.255,TX\n"
+        "10.1.2.0,10.1.2.255,MD\n"
+        "10.2.0.0,10.2.0.255,OH\n",
+        encoding="utf-8",
+    )
+    df = pd.DataFrame({"ip_address": ["10.0.0.1", "10.1.0.1", "10.1.2.3", "10.1.3.0", "10.2.0.9", "10.3.0.1"]})
+    p = _proc(path, tmp_path)
+
+    p.process(df)
+
+    # past the end of a nested range, the address falls back to the range around it
+    assert df["inferred_state"].tolist() == ["WY", "TX", "MD", "TX", "OH", "WY"]
+    assert any("overlap" in m for m in p._logs)
+
+
+def test_index_is_cached_on_disk_and_memory_mapped(reference, tmp_path, monkeypatch):
+    _proc(reference, tmp_path).process(pd.DataFrame({"ip_address": ["10.0.0.1"]}))
+    monkeypatch.setattr(geoip, "_INDEX_CACHE", {})
+    monkeypatch.setattr(pd, "read_csv", lambda *a, **k: pytest.fail("reference file re-parsed"))
+
+    p = _proc(reference, tmp_path)
+    df = pd.DataFrame({"ip_address": ["20.1.1.1"]})
+    p.process(df)
+
+    assert df["inferred_state"].iloc[0] == "TX"
+    assert any("Memory-mapping cached GeoIP index" in m for m in p._logs)
+
+
+def test_missing_reference_raises(tmp_path):
+    p = GeoIPProcessor(name="geo", config={"reference_path": str(tmp_path / "nope.csv")})
+    with pytest.raises(ValueError, match="GeoIP reference file not found"):
+        p.process(pd.DataFrame({"ip_address": ["10.0.0.1"]}))
@@ -0,0 +1,29 @@
+from pipeline.importtime import measure, parse, report
+
+
+SAMPLE = """import time: self [us] | cumulative | imported package
+import time:       100 |        100 |     _io
+import time:       300 |        300 |       numpy.core
+import time:      2000 |       2300 |     numpy
+import time:        50 |       2350 | mypkg
+"""
+
+
+def test_parse_reads_self_cumulative_and_depth():
+    rows = parse(SAMPLE)
+
+    assert rows[0] == ("_io", 100, 100, 2)
+    assert rows[-1] == ("mypkg", 50, 2350, 0)
+
+
+def test_report_lists_total_and_heaviest_modules():
+    text = report(parse(SAMPLE), top=2)
+
+    assert text.startswith("total import time: 2.5 ms across 4 modules")
+    assert "2.0 ms  numpy" in text
+
+
+def test_measure_runs_in_fresh_interpreter():
+    names = [r[0] for r in measure("json")]
+
+    assert "json" in names
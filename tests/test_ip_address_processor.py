@@ -0,0 +1,79 @@
+import pandas as pd
+import pytest
+
+from pipeline.process.ip_address import IPAddressProcessor, ipv4_to_uint32, uint32_to_ipv4
+
+
+def _proc(config=None):
+    p = IPAddressProcessor(name="ip", config=config or {})
+    p._logs = []
+    p.log = lambda msg: p._logs.append(str(msg))
+    return p
+
+
+def test_ipv4_to_uint32_packs_octets_and_masks_invalid():
+    s = pd.Series(["0.0.0.1", "149.18.157.125", "255.255.255.255", "256.1.1.1", "abc", None])
+
+    out = ipv4_to_uint32(s)
+
+    assert str(out.dtype) == "UInt32"
+    assert out.iloc[0] == 1
+    assert out.iloc[1] == (149 << 24) | (18 << 16) | (157 << 8) | 125
+    assert out.iloc[2] == 2**32 - 1
+    assert out.iloc[3:].isna().all()
+
+
+def test_uint32_round_trips_to_dotted_text():
+    s = pd.Series(["149.18.157.125", "10.0.0.1", None])
+
+    back = uint32_to_ipv4(ipv4_to_uint32(s))
+
+    assert back.tolist()[:2] == ["149.18.157.125", "10.0.0.1"]
+    assert back.isna().iloc[2]
+
+
+def test_process_replaces_column_with_uint32_and_returns_same_df():
+    df = pd.DataFrame({"ip_address": ["149.18.157.125", "108.29.170.186"], "x": [1, 2]})
+    p = _proc()
+
+    out = p.process(df)
+
+    assert out is df
+    assert str(df["ip_address"].dtype) == "UInt32"
+    assert df["ip_address_v6"].isna().all(), "the IPv6 column exists even without IPv6 addresses"
+    assert any("Packing IPv4 addresses in ip_address" in m for m in p._logs)
+
+
+def test_process_moves_ipv6_to_separate_column_and_warns_on_garbage():
+    df = pd.DataFrame({"ip_address": ["10.0.0.1", "2001:0db8:0000:0000:0000:0000:0000:0001", "not-an-ip"]})
+    p = _proc()
+
+    p.process(df)
+
+    assert df["ip_address"].iloc[0] == (10 << 24) + 1
+    assert df["ip_address"].iloc[1:].isna().all()
+    assert df["ip_address_v6"].iloc[1] == "2001:db8::1"
+    assert df["ip_address_v6"].isna().iloc[[0, 2]].all()
+    assert any("1 values in ip_address are not valid" in m for m in p._logs)
+
+
+def test_unparsable_ipv6_counts_as_invalid():
+    df = pd.DataFrame({"ip_address": ["2001:db8::1", "2001:db8:::zz", "1:2"]})
+    p = _proc()
+
+    p.process(df)
+
+    assert df["ip_address_v6"].tolist()[0] == "2001:db8::1"
+    assert df["ip_address_v6"].isna().iloc[1:].all()
+    assert any("Moved 1 IPv6 addresses" in m for m in p._logs)
+    assert any("2 values in ip_address are not valid" in m for m in p._logs)
+
+
+def test_process_skips_when_column_missing():
+    df = pd.DataFrame({"other": [1]})
+    p = _proc({"column": "ip"})
+
+    out = p.process(df)
+
+    assert out is df
+    assert any("Column ip not found" in m for m in p._logs)
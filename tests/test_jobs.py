@@ -0,0 +1,188 @@
+import threading
+import time
+
+import pytest
+
+from pipeline.jobs import JobManager, JobQueueFull
+
+
+def _wait(manager, job_id, timeout=10.0):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = manager.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError(f"job {job_id} did not finish")
+
+
+def fake_pipeline(params, progress):
+    progress({"event": "stage_started", "stage": "CSV", "index": 1, "total": 2})
+    progress({"event": "stage_finished", "stage": "CSV", "index": 1, "total": 2, "rows": params["rows"]})
+    return {"rows": params["rows"], "stages": {"CSV": params["rows"], "Writer": params["rows"]}}
+
+
+def failing_pipeline(params, progress):
+    raise RuntimeError("boom")
+
+
+@pytest.fixture
+def thread_jobs():
+    manager = JobManager(max_workers=2, mode="thread")
+    yield manager
+    manager.shutdown()
+
+
+def test_thread_job_reports_result_and_stage_rows(thread_jobs):
+    job_id = thread_jobs.submit(fake_pipeline, {"rows": 7})
+
+    job = _wait(thread_jobs, job_id)
+
+    assert job["status"] == "succeeded"
+    assert job["result"]["rows"] == 7
+    assert job["stages"] == {"CSV": 7, "Writer": 7}
+    assert job["finished_at"] is not None
+
+
+def test_failed_job_keeps_error(thread_jobs):
+    job = _wait(thread_jobs, thread_jobs.submit(failing_pipeline, {}))
+
+    assert job["status"] == "failed"
+    assert job["error"] == "boom"
+
+
+def test_progress_visible_while_running(thread_jobs):
+    release = threading.Event()
+
+    def slow(params, progress):
+        progress({"event": "stage_finished", "stage": "CSV", "index": 1, "total": 3, "rows": 5})
+        release.wait(5)
+        return {"rows": 5}
+
+    job_id = thread_jobs.submit(slow, {})
+    deadline = time.time() + 5
+    while thread_jobs.get(job_id)["progress"]["completed_stages"] != 1 and time.time() < deadline:
+        time.sleep(0.01)
+
+    job = thread_jobs.get(job_id)
+    assert job["status"] == "running"
+    assert job["progress"] == {"stage": None, "completed_stages": 1, "total_stages": 3}
+    assert job["stages"] == {"CSV": 5}
+    release.set()
+    assert _wait(thread_jobs, job_id)["status"] == "succeeded"
+
+
+def test_max_pending_rejects_when_pool_is_saturated():
+    manager = JobManager(max_workers=1, mode="thread", max_pending=1)
+    release = threading.Event()
+    blocker = lambda params, progress: release.wait(5) and {}
+    try:
+        manager.submit(blocker, {})
+        time.sleep(0.05)
+        manager.submit(blocker, {})
+        with pytest.raises(JobQueueFull):
+            manager.submit(blocker, {})
+    finally:
+        release.set()
+        manager.shutdown()
+
+
+def test_finished_jobs_are_capped_oldest_first():
+    manager = JobManager(max_workers=1, mode="thread", max_finished=2)
+    try:
+        ids = []
+        for rows in range(4):
+            ids.append(manager.submit(fake_pipeline, {"rows": rows}))
+            _wait(manager, ids[-1])
+    finally:
+        manager.shutdown()
+
+    assert [manager.get(job_id) is None for job_id in ids] == [True, True, False, False]
+
+
+def test_finished_jobs_expire_after_the_ttl(monkeypatch):
+    manager = JobManager(max_workers=1, mode="thread", finished_ttl=60)
+    try:
+        old = manager.submit(fake_pipeline, {"rows": 1})
+        _wait(manager, old)
+        later = time.time() + 61
+        monkeypatch.setattr(time, "time", lambda: later)
+        new = manager.submit(fake_pipeline, {"rows": 2})
+        assert manager.get(old) is None
+        assert manager.get(new) is not None, "queued and running jobs are never pruned"
+    finally:
+        manager.shutdown()
+
+
+def test_unknown_job_and_mode():
+    assert JobManager(mode="thread").get("nope") is None
+    with pytest.raises(ValueError, match="Unknown job mode"):
+        JobManager(mode="fiber")
+
+
+def test_process_pool_runs_job_in_worker_process():
+    manager = JobManager(max_workers=1, mode="process")
+    try:
+        job = _wait(manager, manager.submit(fake_pipeline, {"rows": 3}), timeout=30)
+    finally:
+        manager.shutdown()
+
+    assert job["status"] == "succeeded"
+    assert job["stages"]["CSV"] == 3
+
+
+def test_job_events_are_republished_on_bus_and_end_with_job_finished():
+    from pipeline.events import EventBus
+
+    bus = EventBus()
+    sub = bus.subscribe()
+    manager = JobManager(max_workers=1, mode="thread", bus=bus)
+    try:
+        job_id = manager.submit(fake_pipeline, {"rows": 2})
+        seen = []
+        deadline = time.time() + 5
+        while time.time() < deadline and (not seen or seen[-1]["event"] != "job_finished"):
+            event = sub.get(timeout=0.1)
+            if event:
+                seen.append(event)
+    finally:
+        manager.shutdown()
+
+    assert [e["event"] for e in seen] == ["job_started", "stage_started", "stage_finished", "job_finished"]
+    assert all(e["job_id"] == job_id for e in seen)
+    assert seen[-1]["status"] == "succeeded"
+
+
+def test_gate_can_hold_jobs_and_adjust_params():
+    opened = threading.Event()
+    ended = []
+
+    def gate(params):
+        opened.wait(5)
+        return {**params, "rows": params["rows"] * 2}, ended.append
+
+    manager = JobManager(max_workers=1, mode="thread", gate=gate)
+    try:
+        job_id = manager.submit(fake_pipeline, {"rows": 3})
+        time.sleep(0.05)
+        assert manager.get(job_id)["status"] == "queued"
+
+        opened.set()
+        job = _wait(manager, job_id)
+        assert job["result"]["rows"] == 6
+        assert ended == [job["result"]]
+    finally:
+        manager.shutdown()
+
+
+def test_gate_failure_fails_the_job():
+    def gate(params):
+        raise MemoryError("no budget")
+
+    manager = JobManager(max_workers=1, mode="thread", gate=gate)
+    try:
+        job = _wait(manager, manager.submit(fake_pipeline, {"rows": 1}))
+        assert job["status"] == "failed"
+        assert job["error"] == "no budget"
+    finally:
+        manager.shutdown()
@@ -81,3 +81,108 @@ def test_process_raises_on_unknown_strategy_and_logs_first():
     assert any("Filling missing time_spent_seconds using mode strategy" in m for m in p._logs)
     # No "Filled..." log should be present
     assert not any(m.startswith("Filled missing values with") for m in p._logs)
+
+
+def _grouped_frame():
+    return pd.DataFrame({
+        "time_spent_seconds": [10.0, None, 30.0, 100.0, None, None, 7.0],
+        "state": ["A", "A", "A", "B", "B", "C", None],
+        "marketing_channel": ["x", "x", "y", "x", "x", "x", "y"],
+    })
+
+
+def test_group_by_fills_per_group_median_with_global_fallback():
+    df = _grouped_frame()
+    p = MissingValuesProcessor(name="mv", config={"strategy": "median", "group_by": "state"})
+    p._logs = []
+    p.log = lambda msg: p._logs.append(str(msg))
+
+    out = p.process(df)
+
+    assert out is df
+    # A -> median(10, 30) = 20; B -> 100; C has no values -> global median(10, 30, 100, 7) = 20
+    assert df["time_spent_seconds"].tolist() == [10.0, 20.0, 30.0, 100.0, 100.0, 20.0, 7.0]
+    assert any("using median strategy per ['state']" in m for m in p._logs)
+
+
+def test_group_by_multiple_keys_mean():
+    df = _grouped_frame()
+    p = MissingValuesProcessor(name="mv", config={"group_by": ["state", "marketing_channel"]})
+    p.log = lambda msg: None
+
+    p.process(df)
+
+    # (A, x) only has 10 -> 10
+    assert df.loc[1, "time_spent_seconds"] == 10.0
+    assert df.loc[4, "time_spent_seconds"] == 100.0
+
+
+def test_exported_group_values_are_reused_on_another_chunk():
+    first = MissingValuesProcessor(name="mv", config={"strategy": "median", "group_by": "state"})
+    first.log = lambda msg: None
+    first.process(_grouped_frame())
+    exported = first.export_fill_values()
+
+    chunk = pd.DataFrame({"time_spent_seconds": [float("nan")] * 3, "state": ["A", "B", "Z"]})
+    second = MissingValuesProcessor(name="mv", config={
+        "strategy": "median", "group_by": "state", "fill_values": exported,
+    })
+    second.log = lambda msg: None
+    second.process(chunk)
+
+    assert chunk["time_spent_seconds"].tolist() == [20.0, 100.0, 20.0]
+
+
+def test_group_by_fills_rows_with_a_missing_key_from_the_global_value():
+    df = pd.DataFrame({
+        "time_spent_seconds": [10.0, None, None, 30.0],
+        "state": ["A", "A", None, None],
+    })
+    p = MissingValuesProcessor(name="mv", config={"strategy": "mean", "group_by": "state"})
+    p.log = lambda msg: None
+
+    p.process(df)
+
+    assert df["time_spent_seconds"].tolist() == [10.0, 10.0, 20.0, 30.0]
+    assert p.export_fill_values()["groups"] == [{"key": ["A"], "value": 10.0}]
+
+
+@pytest.mark.parametrize("group_by", [None, "marketing_channel", ["state", "marketing_channel"]])
+def test_fill_values_of_another_grouping_are_refused(group_by):
+    first = MissingValuesProcessor(name="mv", config={"strategy": "median", "group_by": "state"})
+    first.log = lambda msg: None
+    first.process(_grouped_frame())
+
+    config = {"strategy": "median", "fill_values": first.export_fill_values()}
+    if group_by:
+        config["group_by"] = group_by
+    second = MissingValuesProcessor(name="mv", config=config)
+    second.log = lambda msg: None
+
+    with pytest.raises(ValueError, match="fill_values were computed per"):
+        second.process(_grouped_frame())
+
+
+def test_export_before_process_raises():
+    with pytest.raises(ValueError, match="No fill values computed yet"):
+        _proc().export_fill_values()
+
+
+def test_observe_and_finalize_install_exact_median_of_all_chunks(tmp_path):
+    from pipeline.spill import SpillStore
+    p = MissingValuesProcessor(name="mv", config={"strategy": "median", "group_by": "state"})
+    p.log = lambda msg: None
+    chunks = [
+        pd.DataFrame({"state": ["A", "B", "A"], "time_spent_seconds": [1.0, 10.0, float("nan")]}),
+        pd.DataFrame({"state": ["A", "B", "B"], "time_spent_seconds": [4.0, 20.0, 30.0]}),
+    ]
+    store = SpillStore(str(tmp_path))
+
+    for chunk in chunks:
+        p.observe(chunk, store)
+    p.finalize(store)
+    store.cleanup()
+
+    fill = p.config["fill_values"]
+    assert fill["global"] == pd.concat(chunks)["time_spent_seconds"].median()
+    assert {g["key"][0]: g["value"] for g in fill["groups"]} == {"A": 2.5, "B": 20.0}
@@ -114,3 +114,91 @@ def test_unknown_method_falls_back_to_z_score_behavior_and_logs_error():
     pd.testing.assert_series_equal(df["normalized_purchases"], expected, check_names=False)
 
     assert any("ERROR: Unknown normalization method 'weird'" in m for m in p._logs)
+
+
+def _grouped_frame():
+    return pd.DataFrame({
+        "purchase": [10.0, 20.0, 30.0, 5.0, 5.0, 100.0, None, 50.0],
+        "state": ["A", "A", "A", "B", "B", "C", "A", None],
+    })
+
+
+def test_group_by_min_max_scales_within_each_group():
+    df = _grouped_frame()
+    p = _proc({"method": "min_max", "group_by": "state"})
+
+    out = p.process(df)
+
+    assert out is df
+    got = df["normalized_purchases"].tolist()
+    assert got[:3] == [0.0, 0.5, 1.0]
+    # B and C have a single distinct value -> 0 like the global path
+    assert got[3:6] == [0.0, 0.0, 0.0]
+    assert math.isnan(got[6])
+    # missing group key falls back to the global min/max (5..100)
+    assert got[7] == pytest.approx((50 - 5) / 95)
+    assert any("groups have identical purchases" in m for m in p._logs)
+
+
+def test_group_by_z_score_matches_pandas_groupby():
+    df = _grouped_frame()
+    expected = df.groupby("state")["purchase"].transform(lambda s: (s - s.mean()) / s.std())
+    p = _proc({"method": "z_score", "group_by": ["state"]})
+
+    p.process(df)
+
+    a_rows = df["state"] == "A"
+    np.testing.assert_allclose(df.loc[a_rows, "normalized_purchases"], expected[a_rows])
+    assert (df.loc[df["state"].isin(["B", "C"]), "normalized_purchases"] == 0).all()
+
+
+def test_exported_stats_reused_for_next_chunk():
+    first = _proc({"method": "min_max", "group_by": "state"})
+    first.process(_grouped_frame())
+    stats = first.export_stats()
+
+    chunk = pd.DataFrame({"purchase": [20.0, 5.0, 60.0], "state": ["A", "B", "Z"]})
+    second = _proc({"method": "min_max", "group_by": "state", "stats": stats})
+    second.process(chunk)
+
+    got = chunk["normalized_purchases"].tolist()
+    assert got[0] == 0.5
+    assert got[1] == 0.0
+    # unseen group uses global stats
+    assert got[2] == pytest.approx((60 - 5) / 95)
+
+
+def test_stats_preset_of_another_grouping_is_rejected():
+    first = _proc({"method": "min_max", "group_by": "state"})
+    first.process(_grouped_frame())
+
+    for config in ({"group_by": ["state", "marketing_channel"]}, {}):
+        other = _proc({"method": "min_max", "stats": first.export_stats(), **config})
+        with pytest.raises(ValueError, match=r"computed per \['state'\]"):
+            other.process(pd.DataFrame({"purchase": [1.0], "state": ["A"], "marketing_channel": ["x"]}))
+
+
+def test_global_stats_exported_and_reused_without_group_by():
+    first = _proc({"method": "min_max"})
+    first.process(pd.DataFrame({"purchase": [10.0, 30.0]}))
+    stats = first.export_stats()
+    assert stats["group_by"] == [] and stats["global"]["min"] == 10.0 and stats["global"]["max"] == 30.0
+
+    chunk = pd.DataFrame({"purchase": [20.0]})
+    _proc({"method": "min_max", "stats": stats}).process(chunk)
+
+    assert chunk["normalized_purchases"].tolist() == [0.5]
+
+
+def test_group_by_multiple_keys():
+    df = pd.DataFrame({
+        "purchase": [1.0, 3.0, 10.0, 30.0],
+        "state": ["A", "A", "A", "A"],
+        "marketing_channel": ["x", "x", "y", "y"],
+    })
+    p = _proc({"method": "min_max", "group_by": ["state", "marketing_channel"]})
+
+    p.process(df)
+
+    assert df["normalized_purchases"].tolist() == [0.0, 1.0, 0.0, 1.0]
+    assert [g["key"] for g in p.export_stats()["groups"]] == [["A", "x"], ["A", "y"]]
@@ -101,3 +101,164 @@ def test_exception_in_processor_bubbles_and_writer_not_called():
 
     assert writer.calls == 0
     assert writer.received is None
+
+
+class CommittingProcessor(AddProcessor):
+    def __init__(self, inc: int) -> None:
+        super().__init__(inc)
+        self.commits = 0
+
+    def commit(self) -> None:
+        self.commits += 1
+
+
+class BoomWriter(FakeWriter):
+    def run(self, data: List[int]) -> int:
+        raise RuntimeError("write failed")
+
+
+def test_commit_called_on_processors_only_after_successful_write():
+    p = CommittingProcessor(inc=1)
+    orch = Orchestrator(reader=FakeReader([1]), processors=[p], writer=FakeWriter())
+
+    orch.run()
+
+    assert p.commits == 1
+
+
+def test_commit_not_called_when_writer_fails():
+    p = CommittingProcessor(inc=1)
+    orch = Orchestrator(reader=FakeReader([1]), processors=[p], writer=BoomWriter())
+
+    with pytest.raises(RuntimeError, match="write failed"):
+        orch.run()
+
+    assert p.commits == 0
+
+
+class ChunkReader(FakeReader):
+    def __init__(self, chunks: List[List[int]]) -> None:
+        super().__init__([])
+        self.chunks = chunks
+
+    def iter_chunks(self):
+        for chunk in self.chunks:
+            yield list(chunk)
+
+
+class ChunkWriter(FakeWriter):
+    def __init__(self) -> None:
+        super().__init__()
+        self.chunks: list[list[int]] = []
+
+    def run_chunks(self, chunks) -> int:
+        for chunk in chunks:
+            self.chunks.append(chunk)
+        return sum(len(c) for c in self.chunks)
+
+
+def test_run_chunked_streams_each_chunk_through_processors_and_reports_progress():
+    events = []
+    reader = ChunkReader([[1, 2], [3]])
+    writer = ChunkWriter()
+    p = CommittingProcessor(inc=10)
+
+    orch = Orchestrator(reader=reader, processors=[p], writer=writer, progress=events.append)
+    rows = orch.run_chunked()
+
+    assert rows == 3
+    assert writer.chunks == [[11, 12], [13]]
+    assert p.inputs == [[1, 2], [3]]
+    assert p.commits == 1
+    assert orch.stage_rows["ChunkReader"] == 3
+    assert orch.stage_rows["ChunkWriter"] == 3
+    assert [e["chunk"] for e in events if e["event"] == "chunk_processed"] == [1, 2]
+
+
+def test_run_chunked_emits_read_and_written_events_with_throughput():
+    events = []
+    orch = Orchestrator(reader=ChunkReader([[1, 2], [3]]), processors=[], writer=ChunkWriter(),
+                        progress=events.append)
+
+    orch.run_chunked()
+
+    written = [e for e in events if e["event"] == "chunk_written"]
+    assert [e["total_rows"] for e in written] == [2, 3]
+    assert all(e["rows_per_sec"] is None or e["rows_per_sec"] > 0 for e in written)
+    assert [e["rows"] for e in events if e["event"] == "chunk_read"] == [2, 1]
+    assert events[-1]["event"] == "run_finished"
+    assert events[-1]["rows"] == 3
+
+
+def test_measure_memory_records_frame_footprint():
+    import pandas as pd
+    frame = pd.DataFrame({"a": range(10), "s": ["x" * 20] * 10})
+
+    class FrameReader:
+        def run(self):
+            return frame
+
+    orch = Orchestrator(FrameReader(), [], FakeWriter(), measure_memory=True)
+    orch.run()
+
+    assert orch.frame_rows == 10
+    assert orch.frame_bytes == int(frame.memory_usage(deep=True).sum())
+    assert Orchestrator(FrameReader(), [], FakeWriter()).frame_bytes is None
+
+
+def test_memory_limit_spills_and_matches_in_memory_results(tmp_path, capsys):
+    import numpy as np
+    import pandas as pd
+    from pipeline.process.conversion import ConversionProcessor
+    from pipeline.process.missing_value import MissingValuesProcessor
+    from pipeline.process.percentile import PercentileProcessor
+
+    rng = np.random.default_rng(3)
+    frame = pd.DataFrame({
+        "state": rng.choice(["Ohio", "Iowa", "Utah"], 600),
+        "purchase": np.where(rng.random(600) < 0.3, np.nan, rng.gamma(2.0, 50.0, 600)),
+        "time_spent_seconds": np.where(rng.random(600) < 0.2, np.nan, rng.integers(1, 2000, 600)),
+    })
+
+    class ChunkReader:
+        def run(self):
+            return frame.copy()
+
+        def iter_chunks(self):
+            for start in range(0, len(frame), 50):
+                yield frame.iloc[start:start + 50].copy()
+
+    class SinkWriter:
+        def __init__(self):
+            self.frames = []
+
+        def run(self, df):
+            self.frames.append(df)
+            return len(df)
+
+        def run_chunks(self, chunks):
+            return sum(self.run(c) for c in chunks)
+
+    def pipeline(memory_limit):
+        processors = [
+            MissingValuesProcessor("MV", {"strategy": "median", "group_by": "state"}),
+            PercentileProcessor("Pct", {"percentile": 0.85}),
+            ConversionProcessor("Conv"),
+        ]
+        sink = SinkWriter()
+        orch = Orchestrator(ChunkReader(), processors, sink, memory_limit=memory_limit, spill_dir=str(tmp_path))
+        return orch, orch.run(), pd.concat(sink.frames, ignore_index=True)
+
+    in_memory, rows, expected = pipeline(memory_limit=10**9)
+    spilled, spilled_rows, got = pipeline(memory_limit=2000)
+
+    assert not in_memory.spilled and spilled.spilled
+    assert spilled_rows == rows == 600
+    pd.testing.assert_frame_equal(got, expected)
+    assert spilled.summaries["Pct"] == in_memory.summaries["Pct"]
+    assert spilled.summaries["Conv"] == in_memory.summaries["Conv"], "rates cover every chunk, not the last one"
+    assert spilled.summaries["Conv"]["rows"] == 600
+    assert spilled.stage_rows == in_memory.stage_rows
+    # presets installed for the spilled run do not leak into the next one
+    assert "cuts" not in spilled.processors[1].config
+    assert list(tmp_path.iterdir()) == []
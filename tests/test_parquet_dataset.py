@@ -0,0 +1,134 @@
+import os
+
+import pandas as pd
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+import pytest
+
+from pipeline.write.parquet_dataset import NULL_PARTITION, ParquetDatasetWriter
+
+
+def _writer(path, **config):
+    w = ParquetDatasetWriter("Parquet", {"path": str(path), **config})
+    w._logs = []
+    w.log = lambda msg: w._logs.append(str(msg))
+    return w
+
+
+def _frame(n=6, start=0):
+    states = ["OH", "TX", None]
+    return pd.DataFrame({
+        "purchase": [float(i) for i in range(start, start + n)],
+        "state_abbreviation": [states[i % 3] for i in range(start, start + n)],
+        "channel": ["A" if i % 2 else "B" for i in range(start, start + n)],
+    })
+
+
+def _read(path, by="purchase"):
+    table = ds.dataset(str(path), format="parquet", partitioning="hive").to_table()
+    return table.to_pandas().sort_values(by).reset_index(drop=True)
+
+
+def _files(path):
+    return sorted(os.path.relpath(os.path.join(d, f), path) for d, _, fs in os.walk(path) for f in fs)
+
+
+def test_writes_a_hive_partitioned_dataset(tmp_path):
+    root = tmp_path / "out"
+
+    assert _writer(root, partition_by="state_abbreviation").write(_frame()) == 6
+
+    files = _files(root)
+    assert {f.split(os.sep)[0] for f in files} == {"state_abbreviation=OH", "state_abbreviation=TX",
+                                                   f"state_abbreviation={NULL_PARTITION}"}
+    one = pq.read_table(os.path.join(root, files[0]))
+    assert one.column_names == ["purchase", "channel"], "partition values live in the directory names"
+    back = _read(root)
+    assert back["purchase"].tolist() == [float(i) for i in range(6)]
+    assert back["state_abbreviation"].astype(object).where(back["state_abbreviation"].notna(), None).tolist() == \
+        ["OH", "TX", None, "OH", "TX", None]
+    assert [p for p in os.listdir(tmp_path) if p != "out"] == [], "no staging directory is left behind"
+
+
+def test_row_groups_compression_and_dictionary_follow_the_config(tmp_path):
+    root = tmp_path / "out"
+    chunks = (_frame(10, start) for start in range(0, 50, 10))
+
+    _writer(root, row_group_size=20, compression="zstd", use_dictionary=["channel"]).write_chunks(chunks)
+
+    (name,) = _files(root)
+    meta = pq.ParquetFile(os.path.join(root, name)).metadata
+    assert [meta.row_group(i).num_rows for i in range(meta.num_row_groups)] == [20, 20, 10]
+    columns = {meta.row_group(0).column(i).path_in_schema: meta.row_group(0).column(i) for i in range(3)}
+    assert columns["purchase"].compression == "ZSTD"
+    assert any("DICT" in e for e in columns["channel"].encodings)
+    assert not any("DICT" in e for e in columns["purchase"].encodings)
+
+
+def test_replace_swaps_the_whole_dataset(tmp_path):
+    root = tmp_path / "out"
+    _writer(root, partition_by="state_abbreviation").write(_frame(6))
+
+    _writer(root, partition_by="state_abbreviation").write(_frame(2, start=100))
+
+    assert _read(root)["purchase"].tolist() == [100.0, 101.0]
+    assert sorted(os.listdir(tmp_path)) == ["out"]
+
+
+def test_append_adds_new_files_and_keeps_the_old_ones(tmp_path):
+    root = tmp_path / "out"
+    _writer(root, partition_by="state_abbreviation").write(_frame(3))
+    before = _files(root)
+
+    _writer(root, partition_by="state_abbreviation", if_exists="append").write(_frame(3, start=3))
+
+    after = _files(root)
+    assert set(before) < set(after) and len(after) == 2 * len(before)
+    assert _read(root)["purchase"].tolist() == [float(i) for i in range(6)]
+
+
+def test_failed_stream_leaves_the_dataset_untouched(tmp_path):
+    root = tmp_path / "out"
+    _writer(root).write(_frame(3))
+    before = _files(root)
+
+    def chunks():
+        yield _frame(3, start=10)
+        raise OSError("source went away")
+
+    with pytest.raises(OSError):
+        _writer(root).write_chunks(chunks())
+
+    assert _files(root) == before
+    assert sorted(os.listdir(tmp_path)) == ["out"]
+
+
+def test_open_writers_are_bounded_and_partitions_continue_in_new_files(tmp_path):
+    root = tmp_path / "out"
+    chunks = (_frame(3, start) for start in range(0, 12, 3))
+
+    w = _writer(root, partition_by="state_abbreviation", max_open_writers=1)
+    assert w.write_chunks(chunks) == 12
+
+    per_partition = {}
+    for f in _files(root):
+        per_partition.setdefault(f.split(os.sep)[0], []).append(f)
+    assert all(len(files) > 1 for files in per_partition.values())
+    assert _read(root)["purchase"].tolist() == [float(i) for i in range(12)]
+
+
+def test_later_chunks_are_cast_to_the_first_schema(tmp_path):
+    root = tmp_path / "out"
+    chunks = [pd.DataFrame({"x": [1.5, 2.5]}), pd.DataFrame({"x": [3, 4]})]
+
+    _writer(root).write_chunks(chunks)
+
+    assert _read(root, by="x")["x"].tolist() == [1.5, 2.5, 3.0, 4.0]
+
+
+def test_fail_refuses_an_existing_dataset(tmp_path):
+    root = tmp_path / "out"
+    _writer(root).write(_frame(1))
+
+    with pytest.raises(FileExistsError):
+        _writer(root, if_exists="fail").write(_frame(1))
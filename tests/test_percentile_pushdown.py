@@ -0,0 +1,234 @@
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+import sqlalchemy
+
+from pipeline.process.percentile import PercentileProcessor
+
+
+class _FakeResult:
+    def __init__(self, row=None, scalars=(), rowcount=0, rows=()):
+        self._row, self._scalars, self.rowcount, self._rows = row, list(scalars), rowcount, list(rows)
+
+    def one(self):
+        return self._row
+
+    def all(self):
+        return self._rows
+
+    def scalars(self):
+        return iter(self._scalars)
+
+
+class _FakeConn:
+    def __init__(self, engine):
+        self.engine = engine
+
+    def execute(self, clause, params=None):
+        sql = str(clause)
+        self.engine.statements.append((sql, params))
+        if sql.startswith("WITH"):
+            return _FakeResult(row=self.engine.row)
+        if "information_schema.columns" in sql and "data_type" in sql:
+            return _FakeResult(rows=self.engine.types.items())
+        if "information_schema.columns" in sql:
+            return _FakeResult(scalars=self.engine.columns)
+        if sql.startswith("CREATE TABLE"):
+            return _FakeResult(rowcount=self.engine.created)
+        return _FakeResult()
+
+
+class _FakeEngine:
+    def __init__(self, row=None, columns=(), created=0, types=None):
+        self.row, self.columns, self.created = row, list(columns), created
+        self.types = dict(types or {})
+        self.statements = []
+        self.disposed = False
+
+    def begin(self):
+        engine = self
+
+        class _Tx:
+            def __enter__(self):
+                return _FakeConn(engine)
+
+            def __exit__(self, *exc):
+                return False
+
+        return _Tx()
+
+    def dispose(self):
+        self.disposed = True
+
+
+def _proc(monkeypatch, engine, **pushdown):
+    monkeypatch.setattr(sqlalchemy, "create_engine", lambda dsn, **kw: engine)
+    p = PercentileProcessor("pct", {
+        "percentile": 0.85, "pushdown": {"dsn": "postgresql://localhost/db", "table": "marketing_data", **pushdown},
+    })
+    p._logs = []
+    p.log = lambda msg: p._logs.append(str(msg))
+    return p
+
+
+def test_in_memory_summary_keeps_national_and_state_cuts():
+    # the summary pushdown() reports has the shape process() gives it
+    df = pd.DataFrame({
+        "purchase": [10, 20, 50, 5, 30, 40],
+        "state":    ["A", "A", "A", "B", "B", "B"],
+    })
+    p = PercentileProcessor("pct", {"percentile": 0.85})
+    p.log = lambda msg: None
+
+    _ = p.process(df)
+
+    assert p.summary == {"percentile": 0.85, "national_cut": 42.5, "state_cuts": {"A": 41.0, "B": 37.0}}
+
+
+def test_update_mode_refreshes_the_flags_in_one_statement(monkeypatch):
+    row = SimpleNamespace(updated=42, national_cut=95.5, states=["OH", "TX"], cuts=[90.0, 101.25])
+    engine = _FakeEngine(row=row)
+    p = _proc(monkeypatch, engine, schema="analytics")
+
+    assert p.pushdown() == 42
+
+    ddl, (statement, params) = engine.statements[1:-1], engine.statements[-1]
+    assert engine.statements[0][1]["columns"] == ["85th_percentile_state", "85th_percentile_national"]
+    assert [sql for sql, _ in ddl] == [
+        'ALTER TABLE "analytics"."marketing_data" ADD COLUMN IF NOT EXISTS "85th_percentile_state" smallint',
+        'ALTER TABLE "analytics"."marketing_data" ADD COLUMN IF NOT EXISTS "85th_percentile_national" smallint',
+    ]
+    assert "percentile_cont(CAST(:q AS float8)) WITHIN GROUP (ORDER BY purchase)" in statement
+    assert statement.count('UPDATE "analytics"."marketing_data" AS d') == 2
+    assert 'IS DISTINCT FROM' in statement, "rows whose flags do not change are not rewritten"
+    assert params == {"q": 0.85, "q100": float(np.float64(0.85 * 100))}
+    assert p.summary == {"percentile": 0.85, "national_cut": 95.5, "state_cuts": {"OH": 90.0, "TX": 101.25}}
+    assert engine.disposed
+
+
+@pytest.mark.parametrize("existing, flag", [
+    ("boolean", '"85th_percentile_state" = COALESCE('),
+    ("integer", '"85th_percentile_state" = (COALESCE('),
+])
+def test_update_mode_keeps_the_type_of_existing_flag_columns(monkeypatch, existing, flag):
+    engine = _FakeEngine(
+        row=SimpleNamespace(updated=0, national_cut=None, states=None, cuts=None),
+        types={"85th_percentile_state": existing, "85th_percentile_national": existing},
+    )
+    _proc(monkeypatch, engine).pushdown()
+
+    sqls = [sql for sql, _ in engine.statements]
+    assert not any(sql.startswith("ALTER TABLE") for sql in sqls), "the columns are there already"
+    statement = sqls[-1]
+    assert flag in statement
+    if existing == "integer":
+        assert "::int::integer" in statement and "0::integer" in statement
+    else:
+        assert "smallint" not in statement, "a 0/1 smallint cannot be assigned to a BOOLEAN column"
+
+
+def test_update_mode_refuses_flag_columns_of_another_type(monkeypatch):
+    engine = _FakeEngine(types={"85th_percentile_state": "text"})
+
+    with pytest.raises(ValueError, match="not a flag type"):
+        _proc(monkeypatch, engine).pushdown()
+
+
+def test_update_mode_reports_no_cuts_for_an_empty_table(monkeypatch):
+    engine = _FakeEngine(row=SimpleNamespace(updated=0, national_cut=None, states=None, cuts=None))
+    p = _proc(monkeypatch, engine)
+
+    assert p.pushdown() == 0
+    assert p.summary == {"percentile": 0.85, "national_cut": None, "state_cuts": {}}
+
+
+def test_national_cut_follows_numpy_interpolation(monkeypatch):
+    engine = _FakeEngine(row=SimpleNamespace(updated=0, national_cut=None, states=None, cuts=None))
+    _proc(monkeypatch, engine).pushdown()
+
+    statement = engine.statements[-1][0]
+    # Series.quantile interpolates from the upper neighbour past the midpoint; percentile_cont would not
+    assert "CASE WHEN t >= 0.5 THEN b - (b - a) * (1 - t) ELSE a + (b - a) * t END" in statement
+    assert "(count(*) - 1) * (CAST(:q100 AS float8) / 100)" in statement
+    assert "<> 'NaN'::float8" in statement, "NaN purchases are left out as pandas leaves them out"
+
+
+def test_create_mode_builds_the_target_without_the_old_flags(monkeypatch):
+    engine = _FakeEngine(
+        columns=["state", "purchase", "85th_percentile_state", "85th_percentile_national"], created=1000
+    )
+    p = PercentileProcessor("pct", {"output_dtype": "bool"})
+    p.config["pushdown"] = {"dsn": "postgresql://localhost/db", "table": "marketing_data", "mode": "create",
+                            "target": "marketing_flags"}
+    p.log = lambda msg: None
+    monkeypatch.setattr(sqlalchemy, "create_engine", lambda dsn, **kw: engine)
+
+    assert p.pushdown() == 1000
+
+    sqls = [sql for sql, _ in engine.statements]
+    assert sqls[1] == 'DROP TABLE IF EXISTS "public"."marketing_flags"'
+    create = sqls[2]
+    assert create.startswith('CREATE TABLE "public"."marketing_flags" AS')
+    assert 'SELECT d."state", d."purchase", COALESCE(' in create
+    assert 'AS "85th_percentile_state"' in create and 'AS "85th_percentile_national"' in create
+    assert "::smallint" not in create, "output_dtype bool keeps the flags boolean"
+    assert 'LEFT JOIN state_cuts AS s ON s.state = d."state" CROSS JOIN national AS n' in create
+    assert p.summary == {"percentile": 0.85}
+
+
+@pytest.mark.parametrize("pushdown, message", [
+    ({"table": "t"}, "dsn"),
+    ({"dsn": "postgresql://localhost/db", "table": "t", "mode": "merge"}, "Unknown pushdown mode"),
+    ({"dsn": "postgresql://localhost/db", "table": "t", "mode": "create", "target": "t"}, "target"),
+])
+def test_invalid_pushdown_config(monkeypatch, pushdown, message):
+    monkeypatch.setattr(sqlalchemy, "create_engine", lambda dsn, **kw: _FakeEngine())
+    p = PercentileProcessor("pct", {"pushdown": pushdown})
+    p.log = lambda msg: None
+
+    with pytest.raises(ValueError, match=message):
+        p.pushdown()
+
+
+# Pure-Python mirror of the cut CTEs in _cuts_sql, step by step in float8, checked against pandas
+
+
+def _national_cut_sql(values, q):
+    """ranks, ends and national"""
+    v = sorted(values)
+    n = len(v)
+    pos = (n - 1) * (float(np.float64(q * 100)) / 100)
+    i = int(np.floor(pos))
+    j = min(i + 1, n - 1)
+    t = pos - np.floor(pos)
+    a, b = v[i], v[j]
+    return b - (b - a) * (1 - t) if t >= 0.5 else a + (b - a) * t
+
+
+def _percentile_cont(values, q):
+    """Postgres' percentile_cont (orderedsetaggs.c): first + (second - first) * (pos - floor(pos))"""
+    v = sorted(values)
+    pos = q * (len(v) - 1)
+    first, second = v[int(np.floor(pos))], v[int(np.ceil(pos))]
+    return first + (second - first) * (pos - np.floor(pos))
+
+
+_QS = [0.0, 0.01, 0.1, 0.25, 1 / 3, 0.5, 0.85, 0.9, 0.95, 0.99, 1.0]
+
+
+@pytest.mark.parametrize("ties", [False, True])
+@pytest.mark.parametrize("n", [1, 2, 3, 4, 5, 7, 10, 17, 100, 1001])
+def test_sql_cut_formulas_match_pandas(n, ties):
+    rng = np.random.default_rng(n)
+    values = rng.gamma(2.0, 50.0, n)
+    if ties:
+        values = np.round(values / 25) * 25
+    states = rng.choice(["OH", "TX", "UT"], n)
+
+    for q in _QS:
+        assert _national_cut_sql(values, q) == pd.Series(values).quantile(q), q
+        by_state = pd.Series(values).groupby(states).quantile(q)
+        for state, cut in by_state.items():
+            assert _percentile_cont(values[states == state], q) == cut, (q, state)
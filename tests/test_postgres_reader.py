@@ -0,0 +1,192 @@
+import sqlite3
+import threading
+
+import pandas as pd
+import pytest
+
+import pipeline.read.postgres_reader as postgres_reader
+from pipeline.orchestrator import Orchestrator
+from pipeline.read.postgres_reader import PostgresReader
+from pipeline.write.sqlite_storage import SQLiteStorage
+
+
+def _reader(**config):
+    r = PostgresReader("Postgres", {"chunksize": 2, **config})
+    r._logs = []
+    r.log = lambda msg: r._logs.append(str(msg))
+    return r
+
+
+def _database(path, n=5):
+    with sqlite3.connect(str(path)) as conn:
+        conn.execute("CREATE TABLE events (id INTEGER, purchase REAL, state_abbreviation TEXT)")
+        conn.executemany("INSERT INTO events VALUES (?, ?, ?)",
+                         [(i, i * 1.5, "OH" if i % 2 else "TX") for i in range(n)])
+    return f"sqlite:///{path}"
+
+
+def test_iter_chunks_streams_the_table_in_chunks(tmp_path):
+    r = _reader(dsn=_database(tmp_path / "db.sqlite"), table="events", schema="")
+
+    chunks = list(r.iter_chunks())
+
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    assert pd.concat(chunks)["id"].tolist() == [0, 1, 2, 3, 4]
+    assert any("server-side cursor" in m for m in r._logs)
+
+
+def test_columns_project_tables_and_queries(tmp_path):
+    dsn = _database(tmp_path / "db.sqlite")
+
+    table = _reader(dsn=dsn, table="events", schema="", columns=["state_abbreviation", "id"]).read()
+    query = _reader(
+        dsn=dsn, query="SELECT * FROM events WHERE id >= :low;", params={"low": 3}, columns=["id"]
+    ).read()
+
+    assert list(table.columns) == ["state_abbreviation", "id"]
+    assert len(table) == 5
+    assert query["id"].tolist() == [3, 4]
+
+
+def test_select_statement_for_a_qualified_table():
+    r = _reader(dsn="postgresql://localhost/db", table="marketing_data", schema="analytics", columns=["a", 'b"c'])
+
+    assert r._select() == 'SELECT "a", "b""c" FROM "analytics"."marketing_data"'
+
+
+def test_table_or_query_is_required():
+    with pytest.raises(ValueError, match="table or query"):
+        _reader(dsn="sqlite://").read()
+
+
+def test_plugs_into_the_chunked_orchestrator(tmp_path):
+    dsn = _database(tmp_path / "db.sqlite", n=7)
+    writer = SQLiteStorage("SQLite", {"path": str(tmp_path / "out.db"), "table": "reprocessed"})
+    writer.log = lambda msg: None
+
+    rows = Orchestrator(_reader(dsn=dsn, table="events", schema=""), [], writer).run_chunked()
+
+    assert rows == 7
+    with sqlite3.connect(str(tmp_path / "out.db")) as conn:
+        assert conn.execute("SELECT count(*), sum(id) FROM reprocessed").fetchone() == (7, 21)
+
+
+# COPY fast path, against fake psycopg2 / psycopg 3 connections
+
+_CSV = "id,purchase,active\n" + "".join(f"{i},{i * 1.5},{'t' if i % 2 else 'f'}\n" for i in range(5))
+
+
+class _Psycopg2Cursor:
+    def __init__(self, log, fail_after=None):
+        self.log, self.fail_after = log, fail_after
+
+    def copy_expert(self, statement, file):
+        self.log.append(statement)
+        data = _CSV.encode()
+        for n, start in enumerate(range(0, len(data), 7)):
+            if self.fail_after is not None and n == self.fail_after:
+                raise RuntimeError("server closed the connection")
+            file.write(data[start:start + 7])
+
+    def close(self):
+        pass
+
+
+class _Psycopg3Copy:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def __iter__(self):
+        data = _CSV.encode()
+        return (memoryview(data[i:i + 5]) for i in range(0, len(data), 5))
+
+
+class _Psycopg3Cursor:
+    def __init__(self, log):
+        self.log = log
+
+    def copy(self, statement):
+        self.log.append(statement)
+        return _Psycopg3Copy()
+
+    def close(self):
+        pass
+
+
+class _FakeEngine:
+    def __init__(self, cursor, driver="psycopg2"):
+        self.dialect = type("Dialect", (), {"name": "postgresql", "driver": driver})()
+        self.cursor = cursor
+        self.closed = False
+
+    def raw_connection(self):
+        engine = self
+
+        class _Raw:
+            def cursor(self):
+                return engine.cursor
+
+            def close(self):
+                engine.closed = True
+
+        return _Raw()
+
+    def dispose(self):
+        pass
+
+
+def _copy_reader(monkeypatch, engine, **config):
+    monkeypatch.setattr(postgres_reader, "create_engine", lambda dsn, **kw: engine)
+    return _reader(dsn="postgresql+psycopg2://localhost/db", table="events", copy=True, **config)
+
+
+@pytest.mark.parametrize("driver", ["psycopg2", "psycopg"])
+def test_copy_streams_csv_into_chunks(monkeypatch, driver):
+    statements = []
+    cursor = _Psycopg2Cursor(statements) if driver == "psycopg2" else _Psycopg3Cursor(statements)
+    engine = _FakeEngine(cursor, driver)
+    r = _copy_reader(monkeypatch, engine, columns=["id", "purchase", "active"])
+
+    chunks = list(r.iter_chunks())
+
+    assert statements == [
+        'COPY (SELECT "id", "purchase", "active" FROM "public"."events") TO STDOUT WITH (FORMAT csv, HEADER true)'
+    ]
+    assert [len(c) for c in chunks] == [2, 2, 1]
+    df = pd.concat(chunks, ignore_index=True)
+    assert df["purchase"].tolist() == [i * 1.5 for i in range(5)]
+    assert df["active"].tolist() == [False, True, False, True, False]
+    assert engine.closed
+
+
+def test_copy_failure_reaches_the_consumer(monkeypatch):
+    engine = _FakeEngine(_Psycopg2Cursor([], fail_after=3))
+    r = _copy_reader(monkeypatch, engine, chunksize=100)
+
+    with pytest.raises(RuntimeError, match="server closed"):
+        list(r.iter_chunks())
+    assert engine.closed
+
+
+def test_stopping_early_releases_the_copy(monkeypatch):
+    engine = _FakeEngine(_Psycopg2Cursor([]))
+    r = _copy_reader(monkeypatch, engine, chunksize=1)
+
+    chunks = r.iter_chunks()
+    first = next(chunks)
+    chunks.close()
+
+    assert first["id"].tolist() == [0]
+    assert engine.closed
+    assert not [t for t in threading.enumerate() if t.name == "Postgres-copy"]
+
+
+def test_copy_falls_back_to_the_cursor_with_bind_parameters(tmp_path):
+    dsn = _database(tmp_path / "db.sqlite")
+    r = _reader(dsn=dsn, query="SELECT id FROM events WHERE id < :n", params={"n": 2}, copy=True)
+
+    assert r.read()["id"].tolist() == [0, 1]
+    assert any("bind parameters" in m for m in r._logs)
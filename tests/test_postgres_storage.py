@@ -9,13 +9,39 @@ from sqlalchemy.dialects.postgresql import BIGINT, NUMERIC, BOOLEAN, VARCHAR
 
 # ------------------- Test doubles for SQLAlchemy engine/connection -------------------
 
+class _FakeResult(list):
+    rowcount = 0
+
+    def __init__(self, scalar=None):
+        super().__init__()
+        self._scalar = scalar
+
+    def scalar(self):
+        return self._scalar
+
+
 class _FakeConn:
     def __init__(self, engine):
         self._engine = engine
 
-    def execute(self, clause):
-        # record executed SQL text
+    def execute(self, clause, params=None):
+        # record executed SQL text (and bind parameters, if any)
         self._engine.executes.append(str(clause))
+        if params is not None:
+            self._engine.params.append(params)
+        return _FakeResult(self._engine.scalar)
+
+    def begin_nested(self):
+        self._engine.savepoints += 1
+        return _NestedCtx()
+
+
+class _NestedCtx:
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        return False
 
 
 class _BeginCtx:
@@ -33,8 +59,12 @@ class _BeginCtx:
 class _FakeEngine:
     def __init__(self):
         self.begin_calls = 0
+        self.savepoints = 0
         self.executes = []
+        self.params = []
         self.disposed = False
+        # what .scalar() of any statement returns, e.g. the relkind of a partitioned parent
+        self.scalar = None
 
     def begin(self):
         return _BeginCtx(self)
@@ -213,3 +243,643 @@ def test_no_schema_when_empty(fake_engine, capture_to_sql):
     # began twice: write() + ensure_schema? When schema empty, only write() begin should happen.
     assert fake_engine["engine"].begin_calls == 1
     assert fake_engine["engine"].executes == []  # no CREATE SCHEMA executed
+
+
+def test_inet_columns_are_typed_inet_and_written_as_dotted_text(fake_engine, monkeypatch):
+    from sqlalchemy.dialects.postgresql import INET
+    from pipeline.process.ip_address import ipv4_to_uint32
+
+    seen = {}
+
+    def _fake_to_sql(self, name, con, schema, if_exists, index, chunksize, method, dtype):
+        seen["df"] = self.copy()
+        seen["dtype"] = dtype
+
+    monkeypatch.setattr(pd.DataFrame, "to_sql", _fake_to_sql, raising=True)
+    df = pd.DataFrame({"ip_address": ipv4_to_uint32(pd.Series(["10.0.0.1", "149.18.157.125"]))})
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "inet_columns": ["ip_address"]})
+
+    s.write(df)
+
+    assert isinstance(seen["dtype"]["ip_address"], INET)
+    assert seen["df"]["ip_address"].tolist() == ["10.0.0.1", "149.18.157.125"]
+    # caller's frame keeps the packed representation
+    assert str(df["ip_address"].dtype) == "UInt32"
+
+
+def test_packed_ip_column_maps_to_bigint_without_inet_option():
+    from pipeline.process.ip_address import ipv4_to_uint32
+
+    df = pd.DataFrame({"ip_address": ipv4_to_uint32(pd.Series(["255.255.255.255"]))})
+
+    mapping = _storage({})._infer_types(df)
+
+    assert isinstance(mapping["ip_address"], BIGINT)
+
+
+def test_write_chunks_replaces_once_then_appends_on_one_engine(fake_engine, capture_to_sql):
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "if_exists": "replace"})
+    chunks = iter([pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [3]}), pd.DataFrame({"a": [4]})])
+
+    n = s.write_chunks(chunks)
+
+    assert n == 4
+    assert [c["if_exists"] for c in capture_to_sql["calls"]] == ["replace", "append", "append"]
+    assert fake_engine["engine"].begin_calls == 2, "schema, then one transaction for the whole stream"
+    assert fake_engine["engine"].savepoints == 3
+    assert fake_engine["engine"].disposed is True
+    assert any("Done  writing 4 rows to s.t" in m for m in s._logs)
+
+
+def test_write_chunks_failure_mid_stream_rolls_back_every_chunk(fake_engine, capture_to_sql, monkeypatch):
+    import pipeline.write.postgres_storage as mod
+
+    rolled_back = []
+    monkeypatch.setattr(_BeginCtx, "__exit__", lambda self, exc_type, exc, tb: rolled_back.append(exc_type) or False)
+    monkeypatch.setattr(mod, "_TABLES", {})
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "", "if_exists": "replace",
+                  "cache_metadata": True})
+
+    def chunks():
+        yield pd.DataFrame({"a": [1, 2]})
+        raise RuntimeError("reader failed")
+
+    with pytest.raises(RuntimeError, match="reader failed"):
+        s.write_chunks(chunks())
+
+    assert rolled_back == [RuntimeError], "the replace of chunk 1 is undone together with the failed stream"
+    assert fake_engine["engine"].begin_calls == 1
+    assert mod._TABLES == {}, "nothing learned from rolled-back chunks is cached"
+
+
+def test_reuse_engine_shares_one_engine_per_dsn_and_keeps_it_open(fake_engine, capture_to_sql, monkeypatch):
+    import pipeline.write.postgres_storage as mod
+    monkeypatch.setattr(mod, "_ENGINES", {})
+    cfg = {"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "", "reuse_engine": True}
+
+    first, second = _storage(cfg), _storage(cfg)
+    first.write(pd.DataFrame({"a": [1]}))
+    engine = fake_engine["engine"]
+    second.write(pd.DataFrame({"a": [2]}))
+
+    assert fake_engine["engine"] is engine, "second writer must not create a new engine"
+    assert engine.disposed is False
+    assert mod._ENGINES["postgresql://u:p@h/db"] is engine
+    assert not any("Connecting via DSN" in m for m in second._logs)
+
+
+class _Psycopg2Cursor:
+    def __init__(self):
+        self.copies = []
+
+    def copy_expert(self, sql, fh):
+        self.copies.append((sql, fh.read()))
+
+
+class _Psycopg3Cursor:
+    def __init__(self):
+        self.copies = []
+
+    def copy(self, sql):
+        cursor = self
+
+        class _Copy:
+            def __enter__(self):
+                return self
+
+            def __exit__(self, *exc):
+                return False
+
+            def write(self, data):
+                cursor.copies.append((sql, bytes(data)))
+
+        return _Copy()
+
+
+@pytest.mark.parametrize("cursor_cls", [_Psycopg2Cursor, _Psycopg3Cursor])
+def test_bulk_load_copy_creates_table_then_streams_arrow_csv(fake_engine, capture_to_sql, monkeypatch, cursor_cls):
+    cursor = cursor_cls()
+    monkeypatch.setattr(_FakeConn, "connection", property(lambda self: type("Raw", (), {"cursor": lambda _: cursor})()),
+                        raising=False)
+    df = pd.DataFrame({
+        "state": pd.array(["Ohio", None, 'Say "hi"'], dtype="string[pyarrow]"),
+        "purchase": [1.5, float("nan"), 3.0],
+    })
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "bulk_load": "copy", "chunksize": 2})
+
+    assert s.write(df) == 3
+
+    create = capture_to_sql["calls"][0]
+    assert create["name"] == "t" and create["if_exists"] == "append" and isinstance(create["dtype"]["purchase"], NUMERIC)
+    assert [sql for sql, _ in cursor.copies] == ['COPY "s"."t" ("state", "purchase") FROM STDIN WITH (FORMAT csv)'] * 2
+    assert b"".join(data for _, data in cursor.copies) == b'"Ohio",1.5\n,\n"Say ""hi""",3\n'
+
+
+def test_type_planner_sizes_columns_and_widens_them_between_chunks(fake_engine, capture_to_sql):
+    from sqlalchemy.dialects.postgresql import SMALLINT, INTEGER
+
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "if_exists": "replace",
+                  "type_planner": True})
+    chunks = iter([pd.DataFrame({"n": [1, 2], "flag": [0, 1]}), pd.DataFrame({"n": [70000], "flag": [1]})])
+
+    assert s.write_chunks(chunks) == 3
+
+    first, second = capture_to_sql["calls"]
+    assert isinstance(first["dtype"]["n"], SMALLINT) and isinstance(first["dtype"]["flag"], BOOLEAN)
+    assert isinstance(second["dtype"]["n"], INTEGER)
+    assert 'ALTER TABLE "s"."t" ALTER COLUMN "n" TYPE INTEGER USING "n"::INTEGER' in fake_engine["engine"].executes
+    assert s.type_report["bytes_saved_per_row"] == 13
+    assert any("Type plan for s.t" in m for m in s._logs)
+
+
+def test_type_planner_appends_keep_existing_column_types(fake_engine, capture_to_sql, monkeypatch):
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "type_planner": {"real": False}})
+    monkeypatch.setattr(s, "_existing_columns", lambda table, schema: {"n": ("bigint", "int8")})
+
+    s.write(pd.DataFrame({"n": [1, 2], "x": [0.5, 1.5]}))
+
+    dtype = capture_to_sql["calls"][0]["dtype"]
+    assert isinstance(dtype["n"], BIGINT)
+    assert type(dtype["x"]).__name__ == "DOUBLE_PRECISION"
+    assert not any("ALTER" in sql for sql in fake_engine["engine"].executes)
+
+
+@pytest.fixture
+def metadata_cache(monkeypatch):
+    import pipeline.write.postgres_storage as mod
+    monkeypatch.setattr(mod, "_TABLES", {})
+    monkeypatch.setattr(mod, "_SCHEMAS", set())
+    inserts = []
+    monkeypatch.setattr(PostgreSQLStorage, "_insert", lambda self, conn, df, *args: inserts.append(df.copy()))
+    return mod, inserts
+
+
+_CACHED = {"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "cache_metadata": True}
+
+
+def test_cached_metadata_skips_schema_ddl_and_table_check_on_repeat_appends(fake_engine, capture_to_sql, metadata_cache):
+    mod, inserts = metadata_cache
+
+    _storage(_CACHED).write(pd.DataFrame({"a": [1]}))
+    first_engine = fake_engine["engine"]
+    second = _storage(_CACHED)
+    second.write(pd.DataFrame({"a": [2, 3]}))
+
+    assert len(capture_to_sql["calls"]) == 1, "only the first write goes through to_sql"
+    assert [df["a"].tolist() for df in inserts] == [[2, 3]]
+    assert any("CREATE SCHEMA" in sql for sql in first_engine.executes)
+    assert fake_engine["engine"].executes == []
+    assert not any("Ensuring schema" in m for m in second._logs)
+    assert ("postgresql://u:p@h/db", "s", "t") in mod._TABLES
+
+
+def test_changed_column_types_bypass_the_cache(fake_engine, capture_to_sql, metadata_cache):
+    _, inserts = metadata_cache
+
+    _storage(_CACHED).write(pd.DataFrame({"a": [1]}))
+    _storage(_CACHED).write(pd.DataFrame({"a": ["text now"]}))
+
+    assert len(capture_to_sql["calls"]) == 2 and inserts == []
+
+
+def test_stale_cache_is_dropped_and_the_write_retried(fake_engine, capture_to_sql, metadata_cache, monkeypatch):
+    from sqlalchemy.exc import ProgrammingError
+
+    _storage(_CACHED).write(pd.DataFrame({"a": [1]}))
+
+    def _missing(self, *args):
+        raise ProgrammingError("INSERT", {}, Exception('relation "s.t" does not exist'))
+
+    monkeypatch.setattr(PostgreSQLStorage, "_insert", _missing)
+    s = _storage(_CACHED)
+    assert s.write(pd.DataFrame({"a": [2]})) == 1
+
+    assert len(capture_to_sql["calls"]) == 2
+    assert any("is stale" in m for m in s._logs)
+
+
+def test_failed_write_invalidates_the_cache(fake_engine, capture_to_sql, metadata_cache):
+    mod, _ = metadata_cache
+    _storage(_CACHED).write(pd.DataFrame({"a": [1]}))
+    capture_to_sql["raise"] = SQLAlchemyError("boom")
+
+    with pytest.raises(SQLAlchemyError):
+        _storage({**_CACHED, "if_exists": "replace"}).write(pd.DataFrame({"a": [1]}))
+
+    assert mod._TABLES == {} and mod._SCHEMAS == set()
+
+
+def test_insert_appends_without_creating_the_table():
+    from sqlalchemy import create_engine as real_create_engine
+
+    engine = real_create_engine("sqlite://")
+    with engine.begin() as conn:
+        pd.DataFrame({"a": [1], "b": ["x"]}).to_sql("t", conn, index=False)
+        _storage({})._insert(conn, pd.DataFrame({"a": [2, 3], "b": ["y", None]}), "t", "", {}, 1, False)
+        rows = conn.exec_driver_sql("SELECT a, b FROM t ORDER BY a").fetchall()
+
+    assert rows == [(1, "x"), (2, "y"), (3, None)]
+
+
+def test_cached_metadata_skips_planner_reflection_and_enum_ddl(fake_engine, capture_to_sql, metadata_cache, monkeypatch):
+    _, inserts = metadata_cache
+    reflections = []
+    monkeypatch.setattr(PostgreSQLStorage, "_existing_columns", lambda self, t, s: reflections.append(t) or {})
+    cfg = {**_CACHED, "type_planner": {"enum_max_values": 4}}
+    frame = pd.DataFrame({"state": ["Ohio", "Utah"], "n": [1, 2]})
+
+    _storage(cfg).write(frame)
+    first_ddl = list(fake_engine["engine"].executes)
+    _storage(cfg).write(frame)
+
+    assert reflections == ["t"]
+    assert any("CREATE TYPE" in sql for sql in first_ddl)
+    assert fake_engine["engine"].executes == []
+    assert len(inserts) == 1
+
+
+def test_parallel_load_stages_slices_concurrently_then_publishes_in_one_step(fake_engine, capture_to_sql, monkeypatch):
+    import threading
+
+    barrier = threading.Barrier(3, timeout=5)
+    loaded = []
+
+    def _insert(self, conn, df, table, schema, dtype, chunksize, include_index):
+        barrier.wait()  # only passes if all three slices are loading at the same time
+        loaded.append((table, df["a"].tolist()))
+
+    monkeypatch.setattr(PostgreSQLStorage, "_insert", _insert)
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "if_exists": "replace", "parallel": 3})
+
+    assert s.write(pd.DataFrame({"a": range(7)})) == 7
+
+    (stage_call,) = capture_to_sql["calls"]
+    stage = stage_call["name"]
+    assert stage.startswith("t__stage_") and stage_call["if_exists"] == "fail"
+    assert sorted(rows for _, rows in loaded) == [[0, 1, 2], [3, 4], [5, 6]]
+    assert {table for table, _ in loaded} == {stage}
+    executes = fake_engine["engine"].executes
+    assert executes[-4:] == [
+        f'ALTER TABLE "s"."{stage}" SET UNLOGGED',
+        f'ALTER TABLE "s"."{stage}" SET LOGGED',
+        'DROP TABLE IF EXISTS "s"."t"',
+        f'ALTER TABLE "s"."{stage}" RENAME TO "t"',
+    ]
+    assert not any(sql.startswith("INSERT INTO") for sql in executes), "replace does not copy the rows again"
+
+
+def test_parallel_append_moves_the_staged_rows_into_the_target(fake_engine, capture_to_sql, monkeypatch):
+    monkeypatch.setattr(PostgreSQLStorage, "_insert", lambda self, *args: None)
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "parallel": 2})
+
+    assert s.write(pd.DataFrame({"a": range(4)})) == 4
+
+    stage_call, target_call = capture_to_sql["calls"]
+    stage = stage_call["name"]
+    assert target_call["name"] == "t" and target_call["if_exists"] == "append"
+    assert fake_engine["engine"].executes[-2:] == [
+        f'INSERT INTO "s"."t" ("a") SELECT "a" FROM "s"."{stage}"',
+        f'DROP TABLE "s"."{stage}"',
+    ]
+
+
+def test_parallel_chunks_widen_the_stage_and_replay_it_on_the_target(fake_engine, capture_to_sql, monkeypatch):
+    monkeypatch.setattr(PostgreSQLStorage, "_insert", lambda self, *args: None)
+    monkeypatch.setattr(PostgreSQLStorage, "_existing_columns", lambda self, t, s: {"n": ("smallint", "int2")})
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "parallel": 2, "type_planner": True})
+
+    assert s.write_chunks(iter([pd.DataFrame({"n": [1, 2]}), pd.DataFrame({"n": [90000]})])) == 3
+
+    stage = capture_to_sql["calls"][0]["name"]
+    executes = fake_engine["engine"].executes
+    assert f'ALTER TABLE "s"."{stage}" ALTER COLUMN "n" TYPE INTEGER USING "n"::INTEGER' in executes
+    assert executes.index('ALTER TABLE "s"."t" ALTER COLUMN "n" TYPE INTEGER USING "n"::INTEGER') > \
+        executes.index(f'ALTER TABLE "s"."{stage}" ALTER COLUMN "n" TYPE INTEGER USING "n"::INTEGER')
+
+
+def test_failed_parallel_append_leaves_the_target_columns_alone(fake_engine, capture_to_sql, monkeypatch):
+    def _insert(self, conn, df, *args):
+        raise SQLAlchemyError("connection lost")
+
+    monkeypatch.setattr(PostgreSQLStorage, "_insert", _insert)
+    monkeypatch.setattr(PostgreSQLStorage, "_existing_columns", lambda self, t, s: {"n": ("smallint", "int2")})
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "parallel": 2, "type_planner": True})
+
+    with pytest.raises(SQLAlchemyError):
+        s.write_chunks(iter([pd.DataFrame({"n": [1, 90000]})]))
+
+    assert capture_to_sql["calls"][0]["dtype"]["n"].__class__.__name__ == "INTEGER", "the stage has the wider type"
+    assert not any(sql.startswith('ALTER TABLE "s"."t" ') for sql in fake_engine["engine"].executes)
+
+
+def test_parallel_append_widens_the_target_only_when_publishing(fake_engine, capture_to_sql, monkeypatch):
+    monkeypatch.setattr(PostgreSQLStorage, "_insert", lambda self, *args: None)
+    monkeypatch.setattr(PostgreSQLStorage, "_existing_columns", lambda self, t, s: {"n": ("smallint", "int2")})
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "parallel": 2, "type_planner": True})
+
+    s.write_chunks(iter([pd.DataFrame({"n": [1, 90000]})]))
+
+    stage = capture_to_sql["calls"][0]["name"]
+    executes = fake_engine["engine"].executes
+    widen = 'ALTER TABLE "s"."t" ALTER COLUMN "n" TYPE INTEGER USING "n"::INTEGER'
+    assert executes.count(widen) == 1
+    assert executes.index(widen) == executes.index(f'INSERT INTO "s"."t" ("n") SELECT "n" FROM "s"."{stage}"') - 1
+
+
+def test_failed_parallel_load_drops_the_stage_and_leaves_the_target_alone(fake_engine, capture_to_sql, monkeypatch):
+    def _insert(self, conn, df, *args):
+        if 0 in df["a"].tolist():
+            raise SQLAlchemyError("connection lost")
+
+    monkeypatch.setattr(PostgreSQLStorage, "_insert", _insert)
+    s = _storage({"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "parallel": 2})
+
+    with pytest.raises(SQLAlchemyError):
+        s.write(pd.DataFrame({"a": range(4)}))
+
+    stage = capture_to_sql["calls"][0]["name"]
+    executes = fake_engine["engine"].executes
+    assert executes[-1] == f'DROP TABLE IF EXISTS "s"."{stage}"'
+    assert not any(sql.startswith("INSERT INTO") for sql in executes)
+    assert [c["name"] for c in capture_to_sql["calls"]] == [stage]
+    assert any("parallel load into s.t failed" in m for m in s._logs)
+
+
+def _routed(monkeypatch):
+    loaded = []
+    monkeypatch.setattr(PostgreSQLStorage, "_insert",
+                        lambda self, conn, df, table, *args: loaded.append((table, df["n"].tolist())))
+    return loaded
+
+
+_PARTITIONED = {"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "partition_by": "state_abbreviation"}
+
+
+def test_partitioned_append_creates_list_partitions_and_routes_rows_to_children(fake_engine, capture_to_sql, monkeypatch):
+    loaded = _routed(monkeypatch)
+    df = pd.DataFrame({"n": [1, 2, 3, 4], "state_abbreviation": ["OH", "TX", "OH", None]})
+
+    assert _storage(_PARTITIONED).write(df) == 4
+
+    executes = fake_engine["engine"].executes
+    parent = next(sql for sql in executes if "PARTITION BY" in sql)
+    assert "CREATE TABLE IF NOT EXISTS s.t" in parent and 'PARTITION BY LIST ("state_abbreviation")' in parent
+    assert 'CREATE TABLE IF NOT EXISTS "s"."t_oh_184460" PARTITION OF "s"."t" FOR VALUES IN (\'OH\')' in executes
+    assert 'CREATE TABLE IF NOT EXISTS "s"."t_null_5ba93c" PARTITION OF "s"."t" FOR VALUES IN (NULL)' in executes
+    assert sorted(loaded) == [("t_null_5ba93c", [4]), ("t_oh_184460", [1, 3]), ("t_tx_00bd4d", [2])]
+    assert capture_to_sql["calls"] == [], "rows never go through the parent"
+
+
+def test_values_with_the_same_slug_get_their_own_partitions(fake_engine, capture_to_sql, monkeypatch):
+    loaded = _routed(monkeypatch)
+    df = pd.DataFrame({"n": [1, 2], "state_abbreviation": ["New York", "new-york"]})
+
+    assert _storage(_PARTITIONED).write(df) == 2
+
+    assert sorted(loaded) == [("t_new_york_3dddf7", [1]), ("t_new_york_5a561b", [2])]
+    assert len(PostgreSQLStorage._partition_name("t" * 63, "x" * 100)) == 63
+
+
+def test_partitioned_replace_swaps_only_the_loaded_partitions(fake_engine, capture_to_sql, monkeypatch):
+    loaded = _routed(monkeypatch)
+    s = _storage({**_PARTITIONED, "if_exists": "replace"})
+    chunks = iter([
+        pd.DataFrame({"n": [1, 2], "state_abbreviation": ["OH", "TX"]}),
+        pd.DataFrame({"n": [3], "state_abbreviation": ["OH"]}),
+    ])
+
+    assert s.write_chunks(chunks) == 3
+
+    oh = [table for table, _ in loaded if table.startswith("t_oh_184460__new_")]
+    assert len(set(oh)) == 1, "both OH chunks go into one standalone table"
+    assert sorted(rows for table, rows in loaded if table == oh[0]) == [[1], [3]]
+    executes = fake_engine["engine"].executes
+    assert f'CREATE TABLE "s"."{oh[0]}" (LIKE "s"."t" INCLUDING DEFAULTS)' in executes
+    swap = executes[-8:]
+    assert swap[:4] == [
+        f'ALTER TABLE "s"."{oh[0]}" ADD CONSTRAINT "t_oh_184460_bound" CHECK ("state_abbreviation" IS NOT NULL AND "state_abbreviation" = \'OH\')',
+        """DO $$ BEGIN IF to_regclass('"s"."t_oh_184460"') IS NOT NULL THEN ALTER TABLE "s"."t" DETACH PARTITION "s"."t_oh_184460"; DROP TABLE "s"."t_oh_184460"; END IF; END $$""",
+        f'ALTER TABLE "s"."{oh[0]}" RENAME TO "t_oh_184460"',
+        'ALTER TABLE "s"."t" ATTACH PARTITION "s"."t_oh_184460" FOR VALUES IN (\'OH\')',
+    ]
+    assert swap[-1] == 'ALTER TABLE "s"."t" ATTACH PARTITION "s"."t_tx_00bd4d" FOR VALUES IN (\'TX\')'
+    assert not any("PARTITION OF" in sql for sql in executes)
+
+
+def test_failed_partitioned_replace_drops_its_standalone_tables(fake_engine, capture_to_sql, monkeypatch):
+    def _insert(self, conn, df, table, *args):
+        if table.startswith("t_tx_00bd4d"):
+            raise SQLAlchemyError("disk full")
+
+    monkeypatch.setattr(PostgreSQLStorage, "_insert", _insert)
+    s = _storage({**_PARTITIONED, "if_exists": "replace"})
+
+    with pytest.raises(SQLAlchemyError):
+        s.write(pd.DataFrame({"n": [1, 2], "state_abbreviation": ["OH", "TX"]}))
+
+    drops = [sql for sql in fake_engine["engine"].executes if sql.startswith("DROP TABLE IF EXISTS")]
+    assert len(drops) == 2 and all('"s"."t_' in sql and "__new_" in sql for sql in drops)
+    assert not any("ATTACH PARTITION" in sql for sql in fake_engine["engine"].executes)
+
+
+def test_partitioned_load_into_a_plain_table_fails_before_loading(fake_engine, capture_to_sql, monkeypatch):
+    loaded = _routed(monkeypatch)
+    import pipeline.write.postgres_storage as mod
+
+    real = mod.create_engine
+
+    def _plain_table(dsn, pool_pre_ping=True):
+        engine = real(dsn, pool_pre_ping)
+        engine.scalar = "r"
+        return engine
+
+    monkeypatch.setattr(mod, "create_engine", _plain_table)
+
+    with pytest.raises(ValueError, match="not partitioned"):
+        _storage({**_PARTITIONED, "if_exists": "replace"}).write(
+            pd.DataFrame({"n": [1], "state_abbreviation": ["OH"]})
+        )
+
+    assert loaded == []
+    assert not any(sql.startswith(("CREATE TABLE", "ALTER")) for sql in fake_engine["engine"].executes)
+
+
+def test_partitioned_replace_widens_the_standalone_tables_too(fake_engine, capture_to_sql, monkeypatch):
+    _routed(monkeypatch)
+    s = _storage({**_PARTITIONED, "if_exists": "replace", "type_planner": True})
+    chunks = iter([
+        pd.DataFrame({"n": [1, 2], "state_abbreviation": ["OH", "TX"]}),
+        pd.DataFrame({"n": [70000], "state_abbreviation": ["OH"]}),
+    ])
+
+    s.write_chunks(chunks)
+
+    executes = fake_engine["engine"].executes
+    widened = [sql for sql in executes if 'ALTER COLUMN "n" TYPE' in sql]
+    assert any(sql.startswith('ALTER TABLE "s"."t" ') for sql in widened)
+    standalone = {sql.split('"')[3] for sql in executes if sql.startswith("CREATE TABLE") and "(LIKE" in sql}
+    assert len(standalone) == 2
+    for name in standalone:
+        assert any(sql.startswith(f'ALTER TABLE "s"."{name}" ALTER COLUMN "n" TYPE') for sql in widened), name
+
+
+def test_partition_column_must_be_in_the_frame(fake_engine, capture_to_sql):
+    with pytest.raises(ValueError, match="partition_by column 'state_abbreviation'"):
+        _storage(_PARTITIONED).write(pd.DataFrame({"n": [1]}))
+
+
+_RESUMABLE = {"dsn": "postgresql://u:p@h/db", "table": "t", "schema": "s", "if_exists": "replace",
+              "resumable": True, "source_fingerprint": "abc123"}
+
+
+def _frames_written(monkeypatch, fail_on=None):
+    written = []
+
+    def _fake_to_sql(self, name, con, schema, if_exists, index, chunksize, method, dtype):
+        if fail_on is not None and fail_on in self["a"].tolist():
+            raise SQLAlchemyError("connection reset")
+        written.append({"df": self.copy(), "if_exists": if_exists, "dtype": dtype})
+
+    monkeypatch.setattr(pd.DataFrame, "to_sql", _fake_to_sql, raising=True)
+    return written
+
+
+def _chunks():
+    return iter([pd.DataFrame({"a": [1, 2]}), pd.DataFrame({"a": [3]}), pd.DataFrame({"a": [4, 5]})])
+
+
+def test_resumable_run_commits_each_chunk_with_its_checkpoint(fake_engine, monkeypatch):
+    written = _frames_written(monkeypatch)
+    monkeypatch.setattr(PostgreSQLStorage, "_committed_chunks", lambda self, fp, t, s: set())
+    s = _storage(_RESUMABLE)
+
+    assert s.write_chunks(_chunks()) == 5
+
+    assert [w["if_exists"] for w in written] == ["replace", "append", "append"]
+    assert all(w["df"]["_load_batch"].eq(s.batch_id).all() for w in written)
+    assert isinstance(written[0]["dtype"]["_load_batch"], VARCHAR)
+    engine = fake_engine["engine"]
+    assert [(p["seq"], p["rows"], p["batch"]) for p in engine.params if "seq" in p] == [(0, 2, s.batch_id), (1, 1, s.batch_id)]
+    assert engine.params[-1] == {"fingerprint": "abc123", "target": "t"}, "the last chunk forgets the source"
+    assert engine.params[0] == {"target": "t"}, "the replace forgets every checkpoint of the table"
+    assert any('CREATE TABLE IF NOT EXISTS "s"."_pipeline_checkpoints"' in sql for sql in engine.executes)
+    assert sum("__load_batch_idx" in sql for sql in engine.executes) == 1
+    assert not any("ADD COLUMN" in sql for sql in engine.executes), "replace creates the table with the column"
+    assert engine.begin_calls == 5  # schema, checkpoint table, one per chunk
+
+
+def test_rerun_skips_committed_chunks_and_appends_the_rest(fake_engine, monkeypatch):
+    written = _frames_written(monkeypatch)
+    monkeypatch.setattr(PostgreSQLStorage, "_committed_chunks", lambda self, fp, t, s: {0, 1})
+    s = _storage(_RESUMABLE)
+
+    assert s.write_chunks(_chunks()) == 2
+
+    assert [w["df"]["a"].tolist() for w in written] == [[4, 5]]
+    assert written[0]["if_exists"] == "append", "the interrupted run already replaced the table"
+    assert s.skipped_chunks == 2
+    assert fake_engine["engine"].params == [{"fingerprint": "abc123", "target": "t"}]
+
+
+def test_appending_to_an_existing_table_adds_the_batch_column_first(fake_engine, monkeypatch):
+    written = _frames_written(monkeypatch)
+    monkeypatch.setattr(PostgreSQLStorage, "_committed_chunks", lambda self, fp, t, s: set())
+
+    assert _storage({**_RESUMABLE, "if_exists": "append"}).write_chunks(_chunks()) == 5
+
+    executes = fake_engine["engine"].executes
+    alter = 'ALTER TABLE IF EXISTS "s"."t" ADD COLUMN IF NOT EXISTS "_load_batch" varchar(32)'
+    assert executes.count(alter) == 1
+    assert executes.index(alter) < next(i for i, sql in enumerate(executes) if "__load_batch_idx" in sql)
+    assert [w["if_exists"] for w in written] == ["append", "append", "append"]
+
+
+def test_failed_chunk_leaves_earlier_checkpoints_committed(fake_engine, monkeypatch):
+    _frames_written(monkeypatch, fail_on=4)
+    monkeypatch.setattr(PostgreSQLStorage, "_committed_chunks", lambda self, fp, t, s: set())
+
+    with pytest.raises(SQLAlchemyError):
+        _storage(_RESUMABLE).write_chunks(_chunks())
+
+    assert [p["seq"] for p in fake_engine["engine"].params if "seq" in p] == [0, 1]
+
+
+def _checkpoint_rows(monkeypatch):
+    """Keep the rows of the checkpoint table in a set of (fingerprint, target, seq), as the fake engine forgets them"""
+    rows = set()
+    execute = _FakeConn.execute
+
+    def _execute(self, clause, params=None):
+        sql = str(clause)
+        if "_pipeline_checkpoints" in sql and sql.startswith("INSERT"):
+            rows.add((params["fingerprint"], params["target"], params["seq"]))
+        elif "_pipeline_checkpoints" in sql and sql.startswith("DELETE"):
+            rows.difference_update(
+                row for row in list(rows)
+                if row[1] == params["target"] and params.get("fingerprint", row[0]) == row[0]
+            )
+        return execute(self, clause, params)
+
+    monkeypatch.setattr(_FakeConn, "execute", _execute)
+    monkeypatch.setattr(
+        PostgreSQLStorage, "_committed_chunks", lambda self, fp, t, s: {seq for f, tt, seq in rows if (f, tt) == (fp, t)}
+    )
+    return rows
+
+
+def test_reloading_a_source_after_another_replace_writes_it_again(fake_engine, monkeypatch):
+    written = _frames_written(monkeypatch)
+    rows = _checkpoint_rows(monkeypatch)
+
+    for source in ("a", "b", "a"):
+        assert _storage({**_RESUMABLE, "source_fingerprint": source}).write_chunks(_chunks()) == 5
+        assert rows == set()
+
+    assert [w["if_exists"] for w in written] == ["replace", "append", "append"] * 3
+
+
+def test_replace_forgets_the_checkpoints_of_an_interrupted_load(fake_engine, monkeypatch):
+    _frames_written(monkeypatch, fail_on=4)
+    rows = _checkpoint_rows(monkeypatch)
+    with pytest.raises(SQLAlchemyError):
+        _storage({**_RESUMABLE, "source_fingerprint": "a"}).write_chunks(_chunks())
+    assert rows == {("a", "t", 0), ("a", "t", 1)}
+
+    written = _frames_written(monkeypatch)
+    assert _storage({**_RESUMABLE, "source_fingerprint": "b"}).write_chunks(_chunks()) == 5
+    assert rows == set()
+    s = _storage({**_RESUMABLE, "source_fingerprint": "a"})
+    assert s.write_chunks(_chunks()) == 5
+
+    assert s.skipped_chunks == 0
+    assert written[-3]["if_exists"] == "replace", "b replaced the table, so a is loaded in full"
+
+
+def test_write_commits_a_single_frame_in_chunksize_batches(fake_engine, monkeypatch):
+    written = _frames_written(monkeypatch)
+    monkeypatch.setattr(PostgreSQLStorage, "_committed_chunks", lambda self, fp, t, s: {0})
+
+    assert _storage({**_RESUMABLE, "chunksize": 2}).write(pd.DataFrame({"a": range(5)})) == 3
+
+    assert [w["df"]["a"].tolist() for w in written] == [[2, 3], [4]]
+
+
+def test_rollback_batch_deletes_rows_and_checkpoints_by_batch_id(fake_engine):
+    s = _storage(_RESUMABLE)
+
+    s.rollback_batch("deadbeef")
+
+    engine = fake_engine["engine"]
+    assert engine.executes == [
+        'DELETE FROM "s"."t" WHERE "_load_batch" = :batch',
+        'DELETE FROM "s"."_pipeline_checkpoints" WHERE batch_id = :batch AND target = :target',
+    ]
+    assert engine.params == [{"batch": "deadbeef"}, {"batch": "deadbeef", "target": "t"}]
+    assert engine.disposed is True
+
+
+def test_resumable_requires_a_source_fingerprint_and_plain_loads(fake_engine, capture_to_sql):
+    with pytest.raises(ValueError, match="source_fingerprint"):
+        _storage({**_RESUMABLE, "source_fingerprint": None}).write(pd.DataFrame({"a": [1]}))
+    with pytest.raises(ValueError, match="cannot be combined"):
+        _storage({**_RESUMABLE, "parallel": 2}).write(pd.DataFrame({"a": [1]}))
@@ -0,0 +1,56 @@
+import threading
+import time
+
+import pytest
+
+from pipeline.singleflight import SingleFlight
+
+
+def test_sequential_calls_each_run():
+    sf = SingleFlight()
+    calls = []
+
+    assert sf.do("k", lambda: calls.append(1) or "a") == ("a", False)
+    assert sf.do("k", lambda: calls.append(1) or "b") == ("b", False)
+    assert len(calls) == 2
+    assert sf.in_flight() == 0
+
+
+def test_concurrent_callers_share_result_and_errors():
+    sf = SingleFlight()
+    started, release = threading.Event(), threading.Event()
+    outcomes = []
+
+    def slow():
+        started.set()
+        release.wait(5)
+        raise RuntimeError("boom")
+
+    def call():
+        try:
+            sf.do("k", slow)
+        except RuntimeError as e:
+            outcomes.append(str(e))
+
+    leader = threading.Thread(target=call)
+    leader.start()
+    assert started.wait(5)
+    followers = [threading.Thread(target=call) for _ in range(3)]
+    for t in followers:
+        t.start()
+    deadline = time.time() + 5
+    while sf._calls["k"].waiters < 3:
+        assert time.time() < deadline, "followers never joined the call"
+        time.sleep(0.001)
+    release.set()
+    for t in [leader, *followers]:
+        t.join(5)
+
+    assert outcomes == ["boom"] * 4
+    assert sf.in_flight() == 0
+
+
+def test_different_keys_do_not_coalesce():
+    sf = SingleFlight()
+    assert sf.do("a", lambda: 1) == (1, False)
+    assert sf.do("b", lambda: 2) == (2, False)
@@ -0,0 +1,96 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.spill import GroupCodes, Moments, SpillStore, float_keys, key_floats
+
+
+@pytest.fixture
+def store(tmp_path):
+    s = SpillStore(str(tmp_path), run_rows=7)
+    yield s
+    s.cleanup()
+
+
+def _values(seed=0, n=250):
+    rng = np.random.default_rng(seed)
+    values = rng.normal(0, 1000, n)
+    values[rng.random(n) < 0.1] = np.nan
+    return values, rng.integers(0, 4, n)
+
+
+def test_float_keys_keep_order_and_round_trip():
+    values = np.array([-np.inf, -1e300, -5.5, -0.0, 0.0, 1e-300, 3.0, np.inf])
+    keys = float_keys(values)
+
+    assert (np.diff(keys) > 0).all()
+    assert np.array_equal(key_floats(keys), values)
+
+
+@pytest.mark.parametrize("q", [0.0, 0.1, 0.5, 0.85, 1 / 3, 1.0])
+def test_quantile_and_median_match_pandas_exactly(store, q):
+    values, _ = _values()
+    spill = store.values("x")
+    for part in np.array_split(values, 5):
+        spill.append(part)
+
+    assert spill.quantile(q) == pd.Series(values).quantile(q)
+    assert spill.median() == pd.Series(values).median()
+
+
+@pytest.mark.parametrize("q", [0.1, 0.5, 0.85])
+def test_grouped_quantile_and_median_match_groupby_exactly(store, q):
+    values, groups = _values(seed=1)
+    spill = store.values("x")
+    for part in np.array_split(np.arange(len(values)), 3):
+        spill.append(values[part], groups[part])
+
+    by_group = pd.Series(values).groupby(groups)
+    for code, expected in by_group.quantile(q).items():
+        assert spill.quantile(q, code, method="groupby") == expected
+    for code, expected in by_group.median().items():
+        assert spill.median(code) == expected
+    assert np.isnan(spill.quantile(q, code=9))
+
+
+def test_sealed_spill_rejects_appends(store):
+    spill = store.values("x")
+    spill.append(np.array([1.0]))
+    spill.median()
+
+    with pytest.raises(RuntimeError):
+        spill.append(np.array([2.0]))
+
+
+def test_moments_merge_to_pandas_statistics():
+    values, groups = _values(seed=2)
+    moments = Moments()
+    for part in np.array_split(np.arange(len(values)), 4):
+        moments.update(values[part], groups[part])
+
+    expected = pd.Series(values).groupby(groups).agg(["mean", "std", "min", "max"])
+    for code, row in expected.iterrows():
+        got = moments.stats(code)
+        assert got["mean"] == pytest.approx(row["mean"], rel=1e-12)
+        assert got["std"] == pytest.approx(row["std"], rel=1e-12)
+        assert (got["min"], got["max"]) == (row["min"], row["max"])
+
+
+def test_group_codes_are_stable_across_chunks_and_skip_missing_keys():
+    codes = GroupCodes()
+
+    first = codes.encode(pd.DataFrame({"state": ["Ohio", "Iowa", None]}))
+    second = codes.encode(pd.DataFrame({"state": ["Utah", "Ohio"]}))
+
+    assert first.tolist() == [0, 1, -1]
+    assert second.tolist() == [2, 0]
+    assert codes.items() == [("Ohio", 0), ("Iowa", 1), ("Utah", 2)]
+
+
+def test_frames_are_read_back_in_order_and_removed(store, tmp_path):
+    frames = store.frames("pass")
+    frames.append(pd.DataFrame({"a": [1]}))
+    frames.append(pd.DataFrame({"a": [2]}))
+
+    assert [df["a"].iloc[0] for df in frames] == [1, 2]
+    assert not [p for p in (tmp_path / store.path).iterdir() if p.suffix == ".pkl"]
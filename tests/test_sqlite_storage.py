@@ -0,0 +1,167 @@
+import sqlite3
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from pipeline.write.sqlite_storage import SQLiteStorage
+
+
+def _writer(path, **config):
+    w = SQLiteStorage("SQLite", {"path": str(path), "table": "events", **config})
+    w._logs = []
+    w.log = lambda msg: w._logs.append(str(msg))
+    return w
+
+
+def _frame(n=4, start=0):
+    return pd.DataFrame({
+        "id": list(range(start, start + n)),
+        "purchase": [float(i) / 2 for i in range(start, start + n)],
+        "state_abbreviation": ["OH" if i % 2 else "TX" for i in range(start, start + n)],
+        "flag": [bool(i % 2) for i in range(start, start + n)],
+    })
+
+
+def _rows(path, sql="SELECT * FROM events ORDER BY id"):
+    with sqlite3.connect(str(path)) as conn:
+        return conn.execute(sql).fetchall()
+
+
+def test_writes_the_frame_with_inferred_types(tmp_path):
+    db = tmp_path / "out.db"
+
+    assert _writer(db).write(_frame()) == 4
+
+    assert _rows(db) == [(0, 0.0, "TX", 0), (1, 0.5, "OH", 1), (2, 1.0, "TX", 0), (3, 1.5, "OH", 1)]
+    columns = _rows(db, "SELECT name, type FROM pragma_table_info('events')")
+    assert columns == [("id", "INTEGER"), ("purchase", "REAL"), ("state_abbreviation", "TEXT"), ("flag", "INTEGER")]
+
+
+def test_if_exists_replace_append_and_fail(tmp_path):
+    db = tmp_path / "out.db"
+    _writer(db).write(_frame(2))
+
+    _writer(db).write(_frame(2, start=2))
+    assert len(_rows(db)) == 4, "append is the default, as with PostgreSQLStorage"
+
+    _writer(db, if_exists="replace").write(_frame(1, start=10))
+    assert [r[0] for r in _rows(db)] == [10]
+
+    with pytest.raises(ValueError, match="already exists"):
+        _writer(db, if_exists="fail").write(_frame())
+
+
+def test_write_chunks_replaces_once_and_binds_in_batches(tmp_path):
+    db = tmp_path / "out.db"
+    _writer(db).write(_frame(3, start=100))
+
+    rows = _writer(db, if_exists="replace", chunksize=2).write_chunks(_frame(5, start) for start in range(0, 15, 5))
+
+    assert rows == 15
+    assert [r[0] for r in _rows(db)] == list(range(15))
+
+
+def test_missing_values_are_stored_as_null(tmp_path):
+    db = tmp_path / "out.db"
+    df = pd.DataFrame({
+        "id": [0, 1, 2],
+        "purchase": [1.5, np.nan, 3.0],
+        "count": pd.array([1, None, 3], dtype="Int64"),
+        "city": ["Columbus", None, "Austin"],
+        "seen": pd.to_datetime(["2024-01-02 03:04:05", None, "2024-02-01 00:00:00"]),
+    })
+
+    _writer(db).write(df)
+
+    assert _rows(db) == [
+        (0, 1.5, 1, "Columbus", "2024-01-02 03:04:05"),
+        (1, None, None, None, None),
+        (2, 3.0, 3, "Austin", "2024-02-01 00:00:00"),
+    ]
+
+
+def test_arrow_backed_frames_load_like_numpy_ones(tmp_path):
+    numpy_db, arrow_db = tmp_path / "numpy.db", tmp_path / "arrow.db"
+    df = _frame(6)
+    df.loc[2, "purchase"] = np.nan
+
+    _writer(numpy_db).write(df)
+    _writer(arrow_db).write(df.convert_dtypes(dtype_backend="pyarrow"))
+
+    assert _rows(arrow_db) == _rows(numpy_db)
+
+
+def test_a_failed_load_leaves_the_table_as_it_was(tmp_path):
+    db = tmp_path / "out.db"
+    _writer(db).write(_frame(2))
+
+    def chunks():
+        yield _frame(2, start=2)
+        raise RuntimeError("reader failed")
+
+    with pytest.raises(RuntimeError, match="reader failed"):
+        _writer(db, if_exists="replace").write_chunks(chunks())
+
+    assert [r[0] for r in _rows(db)] == [0, 1], "the DROP and the first chunk were rolled back"
+
+
+def test_postgres_style_config_keys(tmp_path):
+    from sqlalchemy import BIGINT
+
+    db = tmp_path / "out.db"
+    df = pd.DataFrame({"ip": np.array([3232235777, 167772161], dtype="uint32"), "n": [1, 2]},
+                      index=pd.Index([7, 8], name="row"))
+    w = SQLiteStorage("SQLite", {
+        "dsn": f"sqlite:///{db}", "schema": "analytics", "table": "events", "index": True,
+        "inet_columns": ["ip"], "dtype": {"n": BIGINT(), "ip": "TEXT"},
+    })
+    w.log = lambda msg: None
+
+    w.write(df)
+
+    assert _rows(db, "SELECT * FROM events ORDER BY row") == [(7, "192.168.1.1", 1), (8, "10.0.0.1", 2)]
+    columns = _rows(db, "SELECT name, type FROM pragma_table_info('events')")
+    assert columns == [("row", "INTEGER"), ("ip", "TEXT"), ("n", "BIGINT")]
+
+
+def test_load_connection_uses_the_bulk_load_pragmas(tmp_path):
+    w = _writer(tmp_path / "out.db", pragmas={"cache_size": -1024})
+
+    conn = w._connect(str(tmp_path / "out.db"))
+    try:
+        assert conn.execute("PRAGMA synchronous").fetchone() == (0,)
+        assert conn.execute("PRAGMA journal_mode").fetchone() == ("delete",), "a journal that survives a crash"
+        assert conn.execute("PRAGMA cache_size").fetchone() == (-1024,)
+    finally:
+        conn.close()
+
+
+def test_a_crashed_load_leaves_the_file_as_it_was(tmp_path):
+    import subprocess
+    import sys
+
+    db = tmp_path / "out.db"
+    _writer(db).write(pd.DataFrame({"id": range(20000), "state_abbreviation": "TX" * 20}))
+    # replace rewrites pages of the old table, and a small page cache makes SQLite write them to the file before
+    # the commit; only a journal that outlives the process can undo that
+    code = (
+        "import os, pandas as pd\n"
+        "from pipeline.write.sqlite_storage import SQLiteStorage\n"
+        f"w = SQLiteStorage('SQLite', {{'path': {str(db)!r}, 'table': 'events', 'if_exists': 'replace',\n"
+        "                               'pragmas': {'cache_size': 10}})\n"
+        "w.log = lambda msg: None\n"
+        "def chunks():\n"
+        "    yield pd.DataFrame({'id': range(50000), 'state_abbreviation': 'OH' * 50})\n"
+        "    os._exit(1)\n"
+        "w.write_chunks(chunks())\n"
+    )
+    assert subprocess.run([sys.executable, "-c", code], check=False).returncode == 1
+
+    assert _rows(db, "PRAGMA integrity_check") == [("ok",)]
+    assert _rows(db, "SELECT count(*), max(state_abbreviation) FROM events") == [(20000, "TX" * 20)]
+
+
+def test_missing_path_is_reported(tmp_path):
+    with pytest.raises(ValueError, match="path"):
+        SQLiteStorage("SQLite", {"table": "events", "dsn": "postgresql://localhost/db"}).write(_frame())
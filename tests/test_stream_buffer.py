@@ -0,0 +1,52 @@
+import io
+import threading
+
+import pandas as pd
+import pytest
+
+from pipeline.read.stream_buffer import StreamAborted, StreamBuffer
+
+
+def test_reader_sees_bytes_in_order_then_eof():
+    buf = StreamBuffer(max_pieces=2)
+
+    def produce():
+        for piece in (b"a,b\n", b"1,2\n3,", b"4\n"):
+            buf.feed(piece)
+        buf.finish()
+
+    t = threading.Thread(target=produce)
+    t.start()
+    df = pd.read_csv(io.BufferedReader(buf))
+    t.join(5)
+
+    pd.testing.assert_frame_equal(df, pd.DataFrame({"a": [1, 3], "b": [2, 4]}))
+    assert buf.bytes_fed == 12
+
+
+def test_feed_blocks_when_full_until_abort():
+    buf = StreamBuffer(max_pieces=1)
+    buf.feed(b"x")
+    errors = []
+
+    def produce():
+        try:
+            buf.feed(b"y")
+        except StreamAborted as e:
+            errors.append(e)
+
+    t = threading.Thread(target=produce)
+    t.start()
+    t.join(0.3)
+    assert t.is_alive(), "feed() should block while the buffer is full"
+
+    buf.abort()
+    t.join(5)
+    assert len(errors) == 1
+
+
+def test_read_after_abort_raises():
+    buf = StreamBuffer()
+    buf.abort()
+    with pytest.raises(StreamAborted):
+        buf.read(10)
@@ -0,0 +1,45 @@
+import json
+
+from pipeline.summary_cache import SummaryCache
+
+
+def test_update_and_get_returns_body_and_etag():
+    cache = SummaryCache()
+    cache.update("public.t", {"percentiles": {"national_cut": 4.5}, "conversion": None})
+
+    body, etag = cache.get("public.t", "percentiles")
+
+    assert json.loads(body) == {"target": "public.t", "percentiles": {"national_cut": 4.5}}
+    assert etag.startswith('"') and etag.endswith('"')
+    assert cache.get("public.t", "conversion") is None
+
+
+def test_new_load_replaces_entries_and_changes_etag():
+    cache = SummaryCache()
+    cache.update("public.t", {"percentiles": {"national_cut": 1.0}, "conversion": {"conversion_rate": 0.5}})
+    _, old = cache.get("public.t", "percentiles")
+
+    cache.update("public.t", {"percentiles": {"national_cut": 2.0}})
+
+    _, new = cache.get("public.t", "percentiles")
+    assert new != old
+    assert cache.get("public.t", "conversion") is None
+
+
+def test_targets_are_independent():
+    cache = SummaryCache()
+    cache.update("a.t", {"percentiles": {"x": 1}})
+    cache.update("b.t", {"percentiles": {"x": 2}})
+
+    assert json.loads(cache.get("a.t", "percentiles")[0])["percentiles"] == {"x": 1}
+
+
+def test_invalidate_drops_the_target_entries():
+    cache = SummaryCache()
+    cache.update("public.t", {"percentiles": {"national_cut": 1.0}})
+    cache.update("public.u", {"percentiles": {"national_cut": 2.0}})
+
+    cache.invalidate("public.t")
+
+    assert cache.get("public.t", "percentiles") is None
+    assert cache.get("public.u", "percentiles") is not None
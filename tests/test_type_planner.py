@@ -0,0 +1,157 @@
+import numpy as np
+import pandas as pd
+import pytest
+from sqlalchemy.dialects.postgresql import BIGINT, BOOLEAN, DOUBLE_PRECISION, ENUM, INET, INTEGER, NUMERIC, REAL, SMALLINT, VARCHAR
+
+from pipeline.write.type_planner import join, layout, plan_types
+
+
+def _frame():
+    return pd.DataFrame({
+        "state": ["Ohio", "Texas", "Ohio", None],
+        "ip_address": ["10.0.0.1", "149.18.157.125", "10.0.0.1", "2001:db8::1"],
+        "above_85th": pd.Series([0, 1, 0, 1], dtype="int8"),
+        "time_spent_seconds": [1745, 953, 12, 40000],
+        "visits": [1, 2, 3, 4],
+        "purchase": [12.5, 3.25, np.nan, 7.0],
+        "z": [0.1, -1.3, 0.7, 2.2],
+        "big": [1, 2, 3, 2**40],
+    })
+
+
+def _baseline(df):
+    return {c: (BIGINT() if pd.api.types.is_integer_dtype(t) else
+                NUMERIC(38, 10) if pd.api.types.is_float_dtype(t) else VARCHAR()) for c, t in df.dtypes.items()}
+
+
+def test_plan_picks_the_narrowest_exact_type_per_column():
+    df = _frame()
+
+    plan = plan_types(df, "events", "s", baseline=_baseline(df), enum_max_values=4)
+    dtype = plan.dtype
+
+    assert isinstance(dtype["state"], ENUM) and list(dtype["state"].enums) == ["Ohio", "Texas"]
+    assert dtype["state"].name == "events_state" and dtype["state"].schema == "s"
+    assert isinstance(dtype["ip_address"], INET)
+    assert isinstance(dtype["above_85th"], BOOLEAN)
+    assert isinstance(dtype["time_spent_seconds"], INTEGER)
+    assert isinstance(dtype["visits"], SMALLINT)
+    assert isinstance(dtype["purchase"], REAL)  # 12.5, 3.25 and 7.0 are exact in float32
+    assert isinstance(dtype["z"], DOUBLE_PRECISION)
+    assert isinstance(dtype["big"], BIGINT)
+
+
+def test_inet_detection_screens_values_before_parsing_them(monkeypatch):
+    import pipeline.write.type_planner as planner
+
+    parsed = []
+    is_ip = planner._is_ip
+    monkeypatch.setattr(planner, "_is_ip", lambda value: parsed.append(value) or is_ip(value))
+    df = pd.DataFrame({
+        "state": [f"state {i}" for i in range(5000)],
+        "v4": [f"10.0.{i // 256}.{i % 256}" for i in range(5000)],
+        "bad_v4": ["10.0.0.1", "10.0.0.300"] * 2500,
+        "v6": [f"2001:db8::{i:x}" for i in range(5000)],
+    })
+
+    kinds = plan_types(df, "t").kinds
+
+    assert kinds == {"state": "text", "v4": "inet", "bad_v4": "text", "v6": "inet"}
+    assert len(parsed) == planner._INET_SAMPLE, "only a sample of the IPv6 values goes through ipaddress"
+
+
+def test_apply_writes_flags_as_booleans_and_orders_by_alignment():
+    df = _frame()
+
+    plan = plan_types(df, "events")
+    out = plan.apply(df)
+
+    assert out["above_85th"].tolist() == [False, True, False, True]
+    assert list(out.columns) == ["z", "big", "time_spent_seconds", "purchase", "visits", "above_85th", "state", "ip_address"]
+    assert df["above_85th"].dtype == "int8", "the caller's frame is left alone"
+
+
+def test_report_counts_saved_bytes_and_padding():
+    df = pd.DataFrame({"flag": pd.Series([0, 1], dtype="int8"), "n": [1.5, 2.5], "count": [300, 7]})
+
+    report = plan_types(df, "t", baseline=_baseline(df)).report
+
+    # before: BIGINT(8) + NUMERIC(~7, unaligned) + BIGINT padded to 16 -> 8 + 7 + 1 + 8
+    assert report["bytes_per_row_before"] == 24 and report["padding_before"] == 1
+    # after: REAL(4) SMALLINT(2) BOOLEAN(1), no padding
+    assert report["bytes_per_row_after"] == 7 and report["padding_after"] == 0
+    assert report["bytes_saved_per_row"] == 17
+    assert report["columns"]["flag"] == {"before": "BIGINT", "after": "BOOLEAN", "bytes_before": 8, "bytes_after": 1}
+
+
+def test_layout_pads_fixed_width_columns_to_their_alignment():
+    assert layout([("flag", 1), ("double", 8), ("smallint", 2)]) == (18, 7)
+    assert layout([("double", 8), ("smallint", 2), ("flag", 1)]) == (11, 0)
+
+
+def test_join_only_widens():
+    assert join("flag", "integer") == "integer"
+    assert join("real", "double") == "double"
+    assert join("smallint", "real") == "double"
+    assert join("enum", "inet") == "text"
+    assert join("numeric", "smallint") == "numeric"
+    assert join("boolean", "text") is None
+
+
+def test_later_chunks_widen_the_plan_and_emit_alter_statements():
+    plan = plan_types(pd.DataFrame({"n": [1, 2], "flag": [0, 1], "state": ["Ohio", "Ohio"]}), "t", "s",
+                      enum_max_values=2)
+    assert plan.ddl() == [
+        'DO $$ BEGIN CREATE TYPE "s"."t_state" AS ENUM (); EXCEPTION WHEN duplicate_object THEN NULL; END $$',
+        """ALTER TYPE "s"."t_state" ADD VALUE IF NOT EXISTS 'Ohio'""",
+    ]
+
+    changes = plan.extend(pd.DataFrame({"n": [70000, 1], "flag": [0, 2], "state": ["Utah", None]}))
+
+    assert changes == [("n", "smallint", "integer"), ("flag", "flag", "smallint")]
+    assert plan.ddl(changes) == [
+        """ALTER TYPE "s"."t_state" ADD VALUE IF NOT EXISTS 'Utah'""",
+        'ALTER TABLE "s"."t" ALTER COLUMN "n" TYPE INTEGER USING "n"::INTEGER',
+        'ALTER TABLE "s"."t" ALTER COLUMN "flag" TYPE SMALLINT USING "flag"::int',
+    ]
+    assert plan.enum_values["state"] == ["Ohio", "Utah"]
+
+    # a third distinct value is over enum_max_values: the column falls back to text
+    assert plan.extend(pd.DataFrame({"state": ["Iowa"]})) == [("state", "enum", "text")]
+
+
+def test_chunks_with_only_missing_values_do_not_widen():
+    plan = plan_types(pd.DataFrame({"n": [1, 2]}), "t")
+
+    assert plan.extend(pd.DataFrame({"n": [np.nan, np.nan]})) == []
+    assert plan.kinds["n"] == "smallint"
+
+
+def test_incompatible_chunk_raises():
+    plan = plan_types(pd.DataFrame({"b": [True, False]}), "t")
+
+    with pytest.raises(ValueError, match="changed from BOOLEAN to VARCHAR"):
+        plan.extend(pd.DataFrame({"b": ["yes", "no"]}))
+
+
+def test_adopt_keeps_existing_columns_at_least_as_wide():
+    plan = plan_types(pd.DataFrame({"a": [1, 2], "b": [1.5, 2.0], "c": [0, 1], "d": [100000, 5]}), "t")
+
+    changes = plan.adopt({
+        "a": ("bigint", "int8"),
+        "b": ("numeric", "numeric"),
+        "c": ("boolean", "bool"),
+        "d": ("smallint", "int2"),
+    })
+
+    assert changes == [("d", "smallint", "integer")]
+    assert plan.kinds == {"a": "bigint", "b": "numeric", "c": "flag", "d": "integer"}
+
+
+def test_arrow_backed_flags_stay_arrow():
+    df = pd.DataFrame({"flag": pd.array([0, 1, None], dtype="int8[pyarrow]")})
+
+    out = plan_types(df, "t").apply(df)
+
+    assert str(out["flag"].dtype) == "bool[pyarrow]"
+    assert out["flag"].tolist()[:2] == [False, True]
@@ -0,0 +1,107 @@
+import pandas as pd
+import pytest
+
+from pipeline.process.validation import ValidationProcessor
+
+
+RULES = [
+    {"column": "purchase", "check": "range", "min": 0, "max": 1000},
+    {"column": "purchase", "check": "type", "type": "numeric", "code": "bad_purchase"},
+    {"column": "state", "check": "not_null"},
+    {"column": "marketing_channel", "check": "allowed", "values": ["Category A", "Category B"]},
+    {"column": "ip_address", "check": "regex", "pattern": r"\d+\.\d+\.\d+\.\d+"},
+]
+
+
+def _proc(**config):
+    p = ValidationProcessor(name="dq", config={"rules": RULES, **config})
+    p._logs = []
+    p.log = lambda msg: p._logs.append(str(msg))
+    return p
+
+
+def _frame():
+    return pd.DataFrame({
+        "ip_address": ["1.1.1.1", "2.2.2.2", "nope", "4.4.4.4", "5.5.5.5"],
+        "marketing_channel": ["Category A", "Category B", "Category A", "Category Z", "Category A"],
+        "purchase": [10, None, 5, 2000, "abc"],
+        "state": ["Ohio", "Utah", "Iowa", "Ohio", None],
+    })
+
+
+def test_passing_rows_returned_and_failures_quarantined_with_reasons(tmp_path):
+    sink = tmp_path / "quarantine.csv"
+    p = _proc(quarantine=str(sink))
+
+    out = p.process(_frame())
+
+    assert out["ip_address"].tolist() == ["1.1.1.1", "2.2.2.2"]
+    rejected = pd.read_csv(sink)
+    assert rejected["ip_address"].tolist() == ["nope", "4.4.4.4", "5.5.5.5"]
+    assert rejected["reject_reasons"].tolist() == [
+        "ip_address_regex",
+        "purchase_range;marketing_channel_allowed",
+        "purchase_range;bad_purchase;state_not_null",
+    ]
+    assert p.report["purchase_range"] == 2
+    assert any("Quarantined 3 rows" in m for m in p._logs)
+
+
+def test_quarantine_file_is_appended_across_runs(tmp_path):
+    sink = tmp_path / "quarantine.csv"
+    _proc(quarantine=str(sink)).process(_frame())
+    _proc(quarantine=str(sink)).process(_frame())
+
+    assert len(pd.read_csv(sink)) == 6
+
+
+def test_quarantine_accepts_writer_objects():
+    class Sink:
+        def __init__(self):
+            self.frames = []
+
+        def run(self, df):
+            self.frames.append(df)
+            return len(df)
+
+    sink = Sink()
+    _proc(quarantine=sink).process(_frame())
+
+    assert len(sink.frames) == 1
+    assert "reject_reasons" in sink.frames[0].columns
+
+
+def test_all_rows_pass_returns_same_df():
+    df = _frame().iloc[:2].copy()
+    p = _proc()
+
+    assert p.process(df) is df
+    assert any("All rows passed validation" in m for m in p._logs)
+
+
+def test_integer_and_string_types():
+    p = ValidationProcessor(name="dq", config={"rules": [
+        {"column": "n", "check": "type", "type": "integer"},
+        {"column": "s", "check": "type", "type": "string"},
+    ]})
+    p.log = lambda msg: None
+    df = pd.DataFrame({"n": [1, 2.5, None], "s": ["a", 3, "c"]})
+
+    out = p.process(df)
+
+    assert out.index.tolist() == [0, 2]
+
+
+def test_missing_column_skips_rule_and_logs():
+    p = ValidationProcessor(name="dq", config={"rules": [{"column": "zzz", "check": "not_null"}]})
+    p._logs = []
+    p.log = lambda msg: p._logs.append(str(msg))
+    df = _frame()
+
+    assert p.process(df) is df
+    assert any("column zzz not found, skipping rule zzz_not_null" in m for m in p._logs)
+
+
+def test_unknown_check_is_rejected_at_construction():
+    with pytest.raises(ValueError, match="Unknown check 'between'"):
+        ValidationProcessor(name="dq", config={"rules": [{"column": "a", "check": "between"}]})
@@ -68,3 +68,22 @@ def test_run_works_with_empty_dataframe_and_zero_rows_returned():
     assert out == 0, "run() should return 0 when write() returns 0"
     assert any("delegating" in m for m in w._logs)
     assert any("done" in m for m in w._logs)
+
+
+def test_write_chunks_default_writes_each_chunk_and_sums_rows():
+    class ListWriter(Writer):
+        def __init__(self):
+            super().__init__(name="list")
+            self.log = lambda msg: None
+            self.calls = []
+
+        def write(self, data: pd.DataFrame) -> int:
+            self.calls.append(len(data))
+            return len(data)
+
+    w = ListWriter()
+
+    out = w.run_chunks(iter([_dummy_df(), _dummy_df().iloc[:1]]))
+
+    assert out == 4
+    assert w.calls == [3, 1]